@@ -62,53 +62,29 @@ IF EXIST "%OUTPUT_PDF%" del "%OUTPUT_PDF%"
 IF EXIST "%OUTPUT_DOCX%" del "%OUTPUT_DOCX%"
 
 :: ----------------------------------------
-:: Phase 1: Python Solver Pipeline
+:: Phase 1-2: Python Solver Pipeline & Post-run Diagnostics
 :: ----------------------------------------
+:: One interpreter solves every stage, checks the result against the
+:: unavailability rules in memory and writes %OUTPUT_JSON% once.
 echo.
-echo --- Phase 1: Running Python Solver Pipeline ---
+echo --- Phase 1-2: Running Python Solver Pipeline ^& Diagnostics ---
 
-echo Step 1.1: Running 3rd Sem Solver (src\solver\solver_3rd.py)...
-python src\solver\solver_3rd.py
-IF %ERRORLEVEL% NEQ 0 (
-    echo [ERROR] 3rd Semester Solver failed.
-    goto :eof
-)
-IF NOT EXIST "%OUTPUT_JSON%" (
-    echo [ERROR] solver_3rd.py did not create %OUTPUT_JSON%
+echo Step 1.1: Running 3rd -^> 5th -^> 7th Sem Solvers (src\solver\pipeline.py)...
+python -m src.solver.pipeline
+IF %ERRORLEVEL% EQU 2 (
+    echo [ERROR] Unavailability test failed! The generated timetable has violations.
     goto :eof
 )
-echo [SUCCESS] 3rd Semester solved successfully.
-echo.
-
-echo Step 1.2: Running 5th Sem Solver (src\solver\solver_5th.py)...
-python src\solver\solver_5th.py
 IF %ERRORLEVEL% NEQ 0 (
-    echo [ERROR] 5th Semester Solver failed.
-    goto :eof
-)
-echo [SUCCESS] 5th Semester solved successfully.
-echo.
-
-echo Step 1.3: Running 7th Sem Solver (src\solver\solver_7th.py)...
-python src\solver\solver_7th.py
-IF %ERRORLEVEL% NEQ 0 (
-    echo [ERROR] 7th Semester Solver failed.
+    echo [ERROR] Solver pipeline failed.
     echo [TIP] Run 'python src\diagnostics\conflict_analyzer.py' to diagnose the issue.
     goto :eof
 )
-echo [SUCCESS] 7th Semester solved successfully.
-echo.
-
-:: ----------------------------------------
-:: Phase 2: Post-run Diagnostics
-:: ----------------------------------------
-echo --- Phase 2: Post-run Diagnostics ---
-echo Step 2.1: Testing final output against unavailability rules...
-python src\diagnostics\test_unavailability.py
-IF %ERRORLEVEL% NEQ 0 (
-    echo [ERROR] Unavailability test failed! The generated timetable has violations.
+IF NOT EXIST "%OUTPUT_JSON%" (
+    echo [ERROR] The solver pipeline did not create %OUTPUT_JSON%
     goto :eof
 )
+echo [SUCCESS] All semesters solved successfully.
 echo [SUCCESS] Unavailability test passed. No violations found.
 echo.
 
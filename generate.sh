@@ -63,49 +63,34 @@ echo -e "${YELLOW}🗑️  Cleaning up old output files from $OUTPUT_DIR/...${NC
 rm -f "$OUTPUT_JSON" "$OUTPUT_PDF" "$OUTPUT_DOCX"
 
 # ----------------------------------------
-# Phase 1: Python Solver Pipeline
+# Phase 1-2: Python Solver Pipeline & Post-run Diagnostics
 # ----------------------------------------
-echo -e "${CYAN}--- Phase 1: Running Python Solver Pipeline ---${NC}"
-
-echo -e "${BLUE}Step 1.1: Running 3rd Sem Solver (src/solver/solver_3rd.py)...${NC}"
-python3 src/solver/solver_3rd.py
-if [ $? -ne 0 ]; then
-    echo -e "${RED}❌ Error: 3rd Semester Solver failed.${NC}"
-    exit 1
+# One interpreter solves every stage (or the joint model with --joint), checks the
+# result against the unavailability rules in memory and writes $OUTPUT_JSON once.
+echo -e "${CYAN}--- Phase 1-2: Running Python Solver Pipeline & Diagnostics ---${NC}"
+
+if [ "$1" == "--joint" ]; then
+    echo -e "${BLUE}Step 1.1: Running Joint Solver for all sections (src/solver/pipeline.py --joint)...${NC}"
+    python3 -m src.solver.pipeline --joint
+else
+    echo -e "${BLUE}Step 1.1: Running 3rd -> 5th -> 7th Sem Solvers (src/solver/pipeline.py)...${NC}"
+    python3 -m src.solver.pipeline
 fi
-if [ ! -f "$OUTPUT_JSON" ]; then
-    echo -e "${RED}❌ Error: solver_3rd.py did not create $OUTPUT_JSON${NC}"
-    exit 1
-fi
-echo -e "${GREEN}✅ 3rd Semester solved successfully.${NC}\n"
-
-echo -e "${BLUE}Step 1.2: Running 5th Sem Solver (src/solver/solver_5th.py)...${NC}"
-python3 src/solver/solver_5th.py
-if [ $? -ne 0 ]; then
-    echo -e "${RED}❌ Error: 5th Semester Solver failed.${NC}"
+PIPELINE_STATUS=$?
+if [ $PIPELINE_STATUS -eq 2 ]; then
+    echo -e "${RED}❌ Error: Unavailability test failed! The generated timetable has violations.${NC}"
     exit 1
 fi
-echo -e "${GREEN}✅ 5th Semester solved successfully.${NC}\n"
-
-echo -e "${BLUE}Step 1.3: Running 7th Sem Solver (src/solver/solver_7th.py)...${NC}"
-python3 src/solver/solver_7th.py
-if [ $? -ne 0 ]; then
-    echo -e "${RED}❌ Error: 7th Semester Solver failed.${NC}"
+if [ $PIPELINE_STATUS -ne 0 ]; then
+    echo -e "${RED}❌ Error: Solver pipeline failed.${NC}"
     echo -e "${YELLOW}💡 Tip: Run 'python3 src/diagnostics/conflict_analyzer.py' to diagnose the issue.${NC}"
     exit 1
 fi
-echo -e "${GREEN}✅ 7th Semester solved successfully.${NC}\n"
-
-# ----------------------------------------
-# Phase 2: Post-run Diagnostics
-# ----------------------------------------
-echo -e "${CYAN}--- Phase 2: Post-run Diagnostics ---${NC}"
-echo -e "${BLUE}Step 2.1: Testing final output against unavailability rules...${NC}"
-python3 src/diagnostics/test_unavailability.py
-if [ $? -ne 0 ]; then
-    echo -e "${RED}❌ Error: Unavailability test failed! The generated timetable has violations.${NC}"
+if [ ! -f "$OUTPUT_JSON" ]; then
+    echo -e "${RED}❌ Error: The solver pipeline did not create $OUTPUT_JSON${NC}"
     exit 1
 fi
+echo -e "${GREEN}✅ All semesters solved successfully.${NC}"
 echo -e "${GREEN}✅ Unavailability test passed. No violations found.${NC}\n"
 
 # ----------------------------------------
@@ -0,0 +1,2 @@
+# This file intentionally left blank.
+# It tells Python that 'src' is a package.
\ No newline at end of file
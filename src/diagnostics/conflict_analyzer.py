@@ -5,8 +5,20 @@ This will show EXACTLY why the solver fails
 """
 
 import json
+import os
+import sys
 from collections import defaultdict
 
+# Run as a script (python3 src/diagnostics/conflict_analyzer.py): make `src` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.diagnostics.occupancy import OccupancyIndex
+
+LAB_SLOT_MAP = {
+    "9-11": ("9-10", "10-11"),
+    "11-1": ("11-12", "12-1"),
+    "3-5": ("3-4", "4-5")
+}
+
 def load_data():
     # UPDATED PATHS
     with open('data/config.json', 'r') as f:
@@ -24,11 +36,14 @@ def load_data():
     
     return config, data
 
-def main():
-    config, data = load_data()
-    
-    sections_7th = ["CSE-7", "IT-7"]
-    all_sections = config['sections']
+def analyze(config, data, sections_7th, stage="7th", occupancy=None):
+    """
+    Prints why the TBA cells and free lab slots of `sections_7th` cannot be
+    filled, and returns the same findings as a dict: per section its teacher
+    and room conflicts, free lab slots and blocked lab slots, plus the slot
+    count issues. Sections with no "To Be Assigned" cell left are already
+    solved and are skipped. `occupancy` is an OccupancyIndex of `data` to reuse.
+    """
     days = config['settings']['days']
     slots = config['settings']['all_slots']
     
@@ -39,40 +54,21 @@ def main():
             section_index_map[day][section_obj['section']] = i
     
     print("\n" + "="*80)
-    print("CONFLICT ANALYSIS FOR 7TH SEMESTER")
+    print(f"CONFLICT ANALYSIS FOR {stage.upper()} SEMESTER")
     print("="*80)
     
-    # Build teacher and room schedules from ASSIGNED slots
-    teacher_busy = defaultdict(lambda: defaultdict(list))  # teacher -> day -> [(slot, section)]
-    room_busy = defaultdict(lambda: defaultdict(list))      # room -> day -> [(slot, section)]
-    lab_room_busy = defaultdict(lambda: defaultdict(list))  # lab_room -> day -> [(slot, section)]
+    solved = [section for section in sections_7th
+              if not any(data[day][section_index_map[day][section]][slot][0]['status'] == "To Be Assigned"
+                         for day in days for slot in slots)]
+    if solved:
+        print(f"\nAlready solved (no 'To Be Assigned' cells), skipped: {', '.join(solved)}")
+    sections_7th = [section for section in sections_7th if section not in solved]
     
-    for day in days:
-        for section_obj in data[day]:
-            section = section_obj['section']
-            for slot in slots:
-                slot_info = section_obj[slot][0]
-                if slot_info['status'] == "Assigned":
-                    teacher = slot_info.get('teacher', '')
-                    room = slot_info.get('room', '')
-                    
-                    # Handle teachers
-                    if teacher and "/" not in str(teacher):
-                        if "TBD" not in str(teacher):
-                            teacher_busy[teacher][day].append((slot, section))
-                    elif teacher and "/" in str(teacher):
-                        for t in teacher.split('/'):
-                            t = t.strip()
-                            if "TBD" not in t:
-                                teacher_busy[t][day].append((slot, section))
-                    
-                    # Handle rooms
-                    if room and "/" not in str(room):
-                        room_busy[room][day].append((slot, section))
-                    elif room and "/" in str(room):
-                        for r in room.split('/'):
-                            r = r.strip()
-                            lab_room_busy[r][day].append((slot, section))
+    # Teacher and room occupancy of the ASSIGNED slots, one bitmask per day
+    if occupancy is None:
+        occupancy = OccupancyIndex(config, data)
+    findings = {section: {"teacher_conflicts": [], "room_conflicts": [], "free_lab_slots": 0, "blocked_lab_slots": []}
+                for section in sections_7th}
     
     # Check 1: Theory class conflicts
     print("\n1. CHECKING THEORY CLASS SCHEDULING:")
@@ -102,11 +98,11 @@ def main():
                     busy_teachers = []
                     for subj in core_subjects:
                         teacher = teacher_map.get(subj, '')
-                        if teacher in teacher_busy and day in teacher_busy[teacher]:
-                            for busy_slot, busy_sec in teacher_busy[teacher][day]:
-                                if busy_slot == slot:
-                                    busy_teachers.append(f"{teacher}({subj}) teaching {busy_sec}")
-                                    conflicts_found = True
+                        for busy_sec in occupancy.who("teacher", teacher, day, slot):
+                            busy_teachers.append(f"{teacher}({subj}) teaching {busy_sec}")
+                            findings[section]["teacher_conflicts"].append(
+                                {"day": day, "slot": slot, "teacher": teacher, "subject": subj, "busy_with": busy_sec})
+                            conflicts_found = True
                     
                     if busy_teachers:
                         print(f"    ✗ {slot}: CONFLICT - {'; '.join(busy_teachers)}")
@@ -118,15 +114,16 @@ def main():
         print(f"\n  Assigned room: {assigned_room}")
         room_conflicts = False
         for day in days:
-            if day in room_busy[assigned_room]:
-                idx = section_index_map[day][section]
-                section_obj = data[day][idx]
-                tba_slots = [slot for slot in slots if section_obj[slot][0]['status'] == "To Be Assigned"]
-                
-                for slot, other_sec in room_busy[assigned_room][day]:
-                    if slot in tba_slots:
-                        print(f"    ✗ {day} {slot}: Room occupied by {other_sec}")
-                        room_conflicts = True
+            idx = section_index_map[day][section]
+            section_obj = data[day][idx]
+            tba_slots = [slot for slot in slots if section_obj[slot][0]['status'] == "To Be Assigned"]
+            
+            for slot in tba_slots:
+                for other_sec in occupancy.who("room", assigned_room, day, slot):
+                    print(f"    ✗ {day} {slot}: Room occupied by {other_sec}")
+                    findings[section]["room_conflicts"].append(
+                        {"day": day, "slot": slot, "room": assigned_room, "busy_with": other_sec})
+                    room_conflicts = True
         
         if not room_conflicts:
             print(f"    ✓ Room available in all TBA slots")
@@ -135,11 +132,7 @@ def main():
     print("\n\n2. CHECKING LAB SCHEDULING:")
     print("-" * 80)
     
-    lab_slot_map = {
-        "9-11": ("9-10", "10-11"),
-        "11-1": ("11-12", "12-1"),
-        "3-5": ("3-4", "4-5")
-    }
+    lab_slot_map = LAB_SLOT_MAP
     
     all_lab_rooms = config['lab_rooms']
     
@@ -167,19 +160,7 @@ def main():
                     available_count += 1
                     
                     # Check if lab rooms are available
-                    rooms_available = []
-                    rooms_busy = []
-                    
-                    for room in all_lab_rooms:
-                        room_free = True
-                        for check_slot in [slot1, slot2]:
-                            if check_slot in [s for s, _ in lab_room_busy[room][day]]:
-                                room_free = False
-                                break
-                        if room_free:
-                            rooms_available.append(room)
-                        else:
-                            rooms_busy.append(room)
+                    rooms_available = occupancy.free("lab_room", all_lab_rooms, day, (slot1, slot2))
                     
                     # Check if teachers are available
                     teachers_available = []
@@ -190,15 +171,9 @@ def main():
                         theory_subj = lab.split(" ")[0]
                         teacher = teacher_map.get(theory_subj, teacher_map.get(lab, ''))
                         
-                        teacher_free = True
-                        if teacher and teacher in teacher_busy:
-                            for check_slot in [slot1, slot2]:
-                                if check_slot in [s for s, _ in teacher_busy[teacher][day]]:
-                                    teachers_busy.append(f"{teacher}({lab})")
-                                    teacher_free = False
-                                    break
-                        
-                        if teacher_free:
+                        if occupancy.is_busy("teacher", teacher, day, (slot1, slot2)):
+                            teachers_busy.append(f"{teacher}({lab})")
+                        else:
                             teachers_available.append(f"{teacher}({lab})")
                     
                     # We need 2 rooms and 2 teachers (for parallel groups)
@@ -211,7 +186,11 @@ def main():
                         if len(teachers_available) < len(labs):
                             conflict_msg += f"Teachers busy: {', '.join(teachers_busy)}"
                         conflicts_by_day[day].append(conflict_msg)
+                        findings[section]["blocked_lab_slots"].append(
+                            {"day": day, "lab_slot": lab_slot_name, "rooms_free": len(rooms_available),
+                             "teachers_busy": teachers_busy})
         
+        findings[section]["free_lab_slots"] = available_count
         print(f"  Total available 2-hour slots: {available_count}")
         for day in days:
             if conflicts_by_day[day]:
@@ -269,6 +248,11 @@ def main():
     print("\n" + "="*80)
     print("Run this to see the full picture of what's causing infeasibility.")
     print("="*80 + "\n")
+    return {"sections": findings, "issues": issues}
+
+def main():
+    config, data = load_data()
+    analyze(config, data, ["CSE-7", "IT-7"])
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,26 +1,37 @@
+#!/usr/bin/env python
+# diagnose_conflicts.py
+"""
+Teacher and room double-bookings of data/data.json.
+
+find_conflicts() walks the cells of every (day, slot). With --vectorized,
+find_conflicts_vectorized() counts the same demand in one array instead
+(see there); the report is identical. It also takes a Timetable, so callers
+that already hold the arrays skip the import. --benchmark checks and times
+both on copies of the shipped sections; the speed-up counts the import.
+
+Usage (from the repository root):
+    python3 src/diagnostics/diagnose_conflicts.py [--vectorized]
+    python3 src/diagnostics/diagnose_conflicts.py --benchmark [--factors 1 10 100] [--repeat 3]
+"""
+
+import argparse
 import json
+import os
+import sys
 
-def diagnose_all_conflicts():
-    """
-    Loads data and runs a comprehensive check for all types of conflicts:
-    1. "To Be Assigned" slots competing for the same room.
-    2. "Assigned" classes with teacher or room double-bookings.
-    3. "Assigned" classes violating the recess rule.
-    4. Conflicts between "Assigned" classes and "To Be Assigned" slots.
-    """
-    print("🩺 Running Comprehensive Timetable Diagnostics...")
+import numpy as np
+
+# Run as a script (python3 src/diagnostics/diagnose_conflicts.py): make `src` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.solver.timetable import Timetable
 
-    # --- 1. Load Data ---
-    try:
-        # UPDATED PATHS
-        with open('data/config.json', 'r') as f:
-            config = json.load(f)
-        with open('data/data.json', 'r') as f:
-            timetable = json.load(f)
-    except FileNotFoundError as e:
-        print(f"❌ Error: {e}. Make sure 'data/config.json' and 'data/data.json' are present.")
-        return
 
+def find_conflicts(config, timetable):
+    """
+    Every teacher or room that more than one "Assigned" class or "To Be
+    Assigned" slot needs at the same time, in day/slot order, as dicts:
+    {"kind": "teacher" | "room", "name", "day", "slot", "required_for": [...]}.
+    """
     days = config['settings']['days']
     slots = config['settings']['all_slots']
     section_rooms = config['section_theory_rooms']
@@ -31,9 +42,9 @@ def diagnose_all_conflicts():
         for sub_info in subs
     }
 
-    conflict_count = 0
+    conflicts = []
     
-    # --- 2. Iterate Through Every Time Slot ---
+    # --- Iterate Through Every Time Slot ---
     for day in days:
         for slot in slots:
             slot_teachers = {} # teacher -> [sections]
@@ -75,36 +86,210 @@ def diagnose_all_conflicts():
                            slot_teachers[teacher].append(f"{section} (Potential for {subject[1]})")
 
 
-            # --- 3. Report Conflicts for the Current Slot ---
+            # --- Collect Conflicts for the Current Slot ---
             for teacher, assignments in slot_teachers.items():
                 if len(assignments) > 1:
-                    conflict_count += 1
-                    print(f"""
-    🔴 Teacher Conflict!
-    ---------------------
-    Who:       Teacher {teacher}
-    When:      {day} at {slot}
-    Problem:   Is double-booked. Required for: {', '.join(assignments)}
-    ---------------------""")
+                    conflicts.append({"kind": "teacher", "name": teacher, "day": day, "slot": slot,
+                                      "required_for": assignments})
 
             for room, assignments in slot_rooms.items():
                 if len(assignments) > 1:
-                    conflict_count += 1
-                    print(f"""
+                    conflicts.append({"kind": "room", "name": room, "day": day, "slot": slot,
+                                      "required_for": assignments})
+    return conflicts
+
+
+def find_conflicts_vectorized(config, timetable):
+    """
+    find_conflicts() without the per-slot dicts. Every demand on a teacher
+    or room becomes one entry (day, slot, resource): the "Assigned" cells
+    with their teacher and room, and the "To Be Assigned" cells once per
+    teacher_map entry of their section plus once for the section's room.
+    Counting the entries per (day, slot, resource) in one bincount finds
+    every double-booking; only their entries are turned into messages, in
+    the order find_conflicts() appends them.
+    """
+    days = config['settings']['days']
+    slots = config['settings']['all_slots']
+    section_rooms = config['section_theory_rooms']
+    teacher_map = {
+        (sec, sub_info[0]): sub_info[1]
+        for sec, subs in config['subjects'].items()
+        for sub_info in subs
+    }
+    tt = timetable if isinstance(timetable, Timetable) else Timetable.from_json(timetable, slots)
+    config_days = [day for day in days if day in tt.day_index]
+    if tt.irregular or any(len(set(tt.order[day])) != len(tt.order[day]) for day in config_days):
+        return find_conflicts(config, tt.to_json())  # cells the arrays do not hold as plain fields
+    if not config_days or not slots:
+        return []
+
+    # Resource ids: teachers and rooms keep their own id ranges, so teachers sort first in a slot.
+    teachers, rooms = {}, {}
+    teacher_values, room_values = tt.tables['teacher'].values, tt.tables['room'].values
+    teacher_of_code = np.array([teachers.setdefault(v, len(teachers)) if v else -1 for v in teacher_values])
+    section_teachers = [[] for _ in tt.sections]  # section -> [(teacher id, subject)] in teacher_map order
+    for (sec, subject), teacher in teacher_map.items():
+        if sec in tt.section_index:
+            section_teachers[tt.section_index[sec]].append((teachers.setdefault(teacher, len(teachers)), subject))
+    room_of_code = np.array([rooms.setdefault(v, len(rooms)) if v else -1 for v in room_values]) + len(teachers)
+    room_of_code[np.array([not v for v in room_values])] = -1
+    section_room = np.array([rooms.setdefault(section_rooms[sec], len(rooms)) + len(teachers)
+                             if section_rooms.get(sec) else -1 for sec in tt.sections], dtype=np.int64)
+    num_resources = len(teachers) + len(rooms)
+
+    # Cells of the config days and slots, with the position of their section in the day's list.
+    day_rows = np.array([tt.day_index[day] for day in config_days])
+    num_days, num_slots = len(config_days), len(slots)
+    position = np.full((len(tt.days), len(tt.sections)), -1)
+    for day in config_days:
+        position[tt.day_index[day], tt.order[day]] = np.arange(len(tt.order[day]))
+    status = tt.codes['status'][day_rows][:, :, :num_slots]
+    listed = position[day_rows][:, :, None] >= 0
+    assigned_code, tba_code = tt.tables['status'].code("Assigned"), tt.tables['status'].code("To Be Assigned")
+    assigned = listed & (status == assigned_code) if assigned_code is not None else np.zeros(status.shape, bool)
+    tba = listed & (status == tba_code) if tba_code is not None else np.zeros(status.shape, bool)
+
+    # --- Entries: (day, slot, resource, position, order in the section, label) ---
+    parts = []
+    d, s, t = np.nonzero(assigned)
+    for codes, of_code in ((tt.codes['teacher'], teacher_of_code), (tt.codes['room'], room_of_code)):
+        resource = of_code[codes[day_rows[d], s, t]]
+        keep = resource >= 0
+        parts.append((d[keep], s[keep], t[keep], resource[keep], np.zeros(keep.sum(), dtype=np.int64),
+                      np.full(keep.sum(), -1)))
+    d, s, t = np.nonzero(tba)
+    per_section = np.array([len(entries) for entries in section_teachers])
+    entry_start = np.concatenate(([0], np.cumsum(per_section)))
+    entry_teacher = np.array([teacher for entries in section_teachers for teacher, _ in entries], dtype=np.int64)
+    entry_subject = [subject for entries in section_teachers for _, subject in entries]
+    repeats = per_section[s]
+    cell = np.repeat(np.arange(len(s)), repeats)
+    rank = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+    entry = entry_start[s[cell]] + rank
+    parts.append((d[cell], s[cell], t[cell], entry_teacher[entry], rank, entry))
+    keep = section_room[s] >= 0
+    parts.append((d[keep], s[keep], t[keep], section_room[s[keep]], np.zeros(keep.sum(), dtype=np.int64),
+                  np.full(keep.sum(), -2)))
+    d, s, t, resource, rank, label = (np.concatenate([part[i] for part in parts]) for i in range(6))
+
+    # --- One count per (day, slot, resource) ---
+    key = (d * num_slots + t) * num_resources + resource
+    counts = np.bincount(key, minlength=num_days * num_slots * num_resources)
+    double = counts[key] > 1
+    d, s, t, resource, rank, label, key = d[double], s[double], t[double], resource[double], rank[double], label[double], key[double]
+    # Append order of find_conflicts(): by slot, then section position and order within the section; a
+    # resource is reported where it first appears (teachers before rooms), with its entries in that order.
+    order = np.lexsort((rank, position[day_rows[d], s], resource >= len(teachers), t, d))
+    key = key[order]
+    _, first, group = np.unique(key, return_index=True, return_inverse=True)
+    order = order[np.argsort(first[group], kind='stable')]
+
+    names = {i: name for name, i in teachers.items()}
+    names.update((i + len(teachers), name) for name, i in rooms.items())
+    conflicts = []
+    previous = None
+    for d_, s_, t_, resource_, label_ in zip(d[order].tolist(), s[order].tolist(), t[order].tolist(),
+                                             resource[order].tolist(), label[order].tolist()):
+        section = tt.sections[s_]
+        if label_ == -1:
+            text = f"{section} (Assigned)"
+        elif label_ == -2:
+            text = f"{section} (To Be Assigned)"
+        else:
+            text = f"{section} (Potential for {entry_subject[label_]})"
+        if (d_, t_, resource_) != previous:
+            previous = (d_, t_, resource_)
+            conflicts.append({"kind": "teacher" if resource_ < len(teachers) else "room", "name": names[resource_],
+                              "day": config_days[d_], "slot": slots[t_], "required_for": []})
+        conflicts[-1]["required_for"].append(text)
+    return conflicts
+
+
+def print_conflicts(conflicts):
+    """Prints the conflicts of find_conflicts() and the final verdict."""
+    for conflict in conflicts:
+        if conflict['kind'] == "teacher":
+            print(f"""
+    🔴 Teacher Conflict!
+    ---------------------
+    Who:       Teacher {conflict['name']}
+    When:      {conflict['day']} at {conflict['slot']}
+    Problem:   Is double-booked. Required for: {', '.join(conflict['required_for'])}
+    ---------------------""")
+        else:
+            print(f"""
     🔴 Room Conflict!
     ---------------------
-    Where:     Room {room}
-    When:      {day} at {slot}
-    Problem:   Is double-booked. Required for: {', '.join(assignments)}
+    Where:     Room {conflict['name']}
+    When:      {conflict['day']} at {conflict['slot']}
+    Problem:   Is double-booked. Required for: {', '.join(conflict['required_for'])}
     ---------------------""")
 
-    # --- 4. Final Report ---
-    if conflict_count == 0:
+    # --- Final Report ---
+    if not conflicts:
         print("\n✅ No fundamental teacher or room conflicts found. The issue might be with other constraints like daily class limits or recess rules.")
     else:
-        print(f"\nFound a total of {conflict_count} conflicts. Please fix these in 'data.json' and re-run the solver.")
+        print(f"\nFound a total of {len(conflicts)} conflicts. Please fix these in 'data.json' and re-run the solver.")
+
+
+def diagnose_all_conflicts(vectorized=False):
+    """
+    Loads data and runs a comprehensive check for all types of conflicts:
+    1. "To Be Assigned" slots competing for the same room.
+    2. "Assigned" classes with teacher or room double-bookings.
+    3. "Assigned" classes violating the recess rule.
+    4. Conflicts between "Assigned" classes and "To Be Assigned" slots.
+    """
+    print("🩺 Running Comprehensive Timetable Diagnostics...")
+
+    # --- Load Data ---
+    try:
+        # UPDATED PATHS
+        with open('data/config.json', 'r') as f:
+            config = json.load(f)
+        with open('data/data.json', 'r') as f:
+            timetable = json.load(f)
+    except FileNotFoundError as e:
+        print(f"❌ Error: {e}. Make sure 'data/config.json' and 'data/data.json' are present.")
+        return
+
+    print_conflicts((find_conflicts_vectorized if vectorized else find_conflicts)(config, timetable))
+
+
+def benchmark(factors, repeat):
+    """Checks that both modes agree on copies of the shipped sections and times them."""
+    from src.solver.build_benchmark import replicate
+    from src.solver.model_builder import load_data
+    from src.solver.timetable import best_time
+
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    print("\n=== Conflict detection: per-slot dicts vs count array ===")
+    print(f"{'sections':>9}{'conflicts':>11}{'dicts (ms)':>12}{'import (ms)':>13}{'arrays (ms)':>13}{'speed-up':>10}")
+    for factor in factors:
+        config, timetable = replicate(config_data, timetable_data, factor)
+        slots = config['settings']['all_slots']
+        tt = Timetable.from_json(timetable, slots)
+        conflicts = find_conflicts(config, timetable)
+        if find_conflicts_vectorized(config, timetable) != conflicts or find_conflicts_vectorized(config, tt) != conflicts:
+            raise SystemExit(f"The two modes disagree for factor {factor}.")
+        dict_time = best_time(lambda: find_conflicts(config, timetable), repeat)
+        import_time = best_time(lambda: Timetable.from_json(timetable, slots), repeat)
+        array_time = best_time(lambda: find_conflicts_vectorized(config, tt), repeat)
+        print(f"{len(config['sections']):>9}{len(conflicts):>11}{1000 * dict_time:>12.2f}{1000 * import_time:>13.2f}"
+              f"{1000 * array_time:>13.2f}{dict_time / (import_time + array_time):>9.1f}x")
 
 
 # --- Run the diagnostic tool ---
 if __name__ == '__main__':
-    diagnose_all_conflicts()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Find teacher and room double-bookings in data/data.json.")
+    parser.add_argument("--vectorized", action="store_true", help="count the demand in one array (same report)")
+    parser.add_argument("--benchmark", action="store_true", help="compare both modes on copies of the shipped sections")
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 10, 100],
+                        help="copies of the shipped sections for --benchmark (default: 1 10 100)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+    if args.benchmark:
+        benchmark(args.factors, args.repeat)
+    else:
+        diagnose_all_conflicts(args.vectorized)
\ No newline at end of file
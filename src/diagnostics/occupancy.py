@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# occupancy.py
+"""
+Occupancy index of the "Assigned" cells of a timetable, for the diagnostics.
+
+Every teacher, theory room and lab room gets one integer per day with bit
+j set when it is busy in slot j (config.json["settings"]["all_slots"]
+order), so "is this teacher busy in these slots?" is one AND and "which
+lab rooms are free for this lab slot?" is one AND per room. Who occupies a
+busy cell is kept separately for the messages.
+
+Cells are read as conflict_analyzer.py always read them: "A / B" teachers
+count for both teachers ("TBD" names are skipped), a room without "/" is a
+theory room and each half of "R1 / R2" is a lab room.
+
+Run as a script, it compares the index with the per-day lists of
+(slot, section) it replaced, on generated instances of growing size.
+
+Usage (from the repository root):
+    python3 src/diagnostics/occupancy.py [--sizes 14 56 224] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+from collections import defaultdict
+
+# Run as a script (python3 src/diagnostics/occupancy.py): make `src` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+KINDS = ("teacher", "room", "lab_room")
+
+
+def cell_occupants(slot_info):
+    """(kind, name) pairs an "Assigned" cell keeps busy."""
+    pairs = []
+    teacher, room = slot_info.get('teacher', ''), slot_info.get('room', '')
+    if teacher and "/" not in str(teacher):
+        if "TBD" not in str(teacher):
+            pairs.append(("teacher", teacher))
+    elif teacher:
+        pairs.extend(("teacher", t.strip()) for t in teacher.split('/') if "TBD" not in t)
+    if room and "/" not in str(room):
+        pairs.append(("room", room))
+    elif room:
+        pairs.extend(("lab_room", r.strip()) for r in room.split('/'))
+    return pairs
+
+
+class OccupancyIndex:
+    """Busy bitmasks per (kind, name, day) of the "Assigned" cells of `timetable_data`."""
+
+    def __init__(self, config, timetable_data):
+        self.days = config['settings']['days']
+        self.slots = config['settings']['all_slots']
+        self.slot_bit = {slot: 1 << j for j, slot in enumerate(self.slots)}
+        self.busy = {kind: {} for kind in KINDS}       # kind -> name -> day -> mask
+        self.occupants = {kind: {} for kind in KINDS}  # kind -> (name, day, slot) -> [sections]
+        for day in self.days:
+            for section_obj in timetable_data[day]:
+                section = section_obj['section']
+                for slot in self.slots:
+                    slot_info = section_obj[slot][0]
+                    if slot_info['status'] != "Assigned":
+                        continue
+                    for kind, name in cell_occupants(slot_info):
+                        masks = self.busy[kind].setdefault(name, {})
+                        masks[day] = masks.get(day, 0) | self.slot_bit[slot]
+                        self.occupants[kind].setdefault((name, day, slot), []).append(section)
+
+    def mask(self, slots):
+        """Bitmask of `slots`."""
+        result = 0
+        for slot in slots:
+            result |= self.slot_bit[slot]
+        return result
+
+    def is_busy(self, kind, name, day, slots):
+        """True if `name` has an "Assigned" cell in any of `slots` on `day`."""
+        return bool(self.busy[kind].get(name, {}).get(day, 0) & self.mask(slots))
+
+    def free(self, kind, names, day, slots):
+        """The `names` with no "Assigned" cell in any of `slots` on `day`, in order."""
+        wanted = self.mask(slots)
+        return [name for name in names if not self.busy[kind].get(name, {}).get(day, 0) & wanted]
+
+    def who(self, kind, name, day, slot):
+        """Sections whose "Assigned" cell keeps `name` busy in `slot` on `day`."""
+        return self.occupants[kind].get((name, day, slot), [])
+
+
+# --- The per-day (slot, section) lists conflict_analyzer.py scanned before, kept for the benchmark ---
+
+def list_index(config, timetable_data):
+    """kind -> name -> day -> [(slot, section)], as conflict_analyzer.py built it."""
+    busy = {kind: defaultdict(lambda: defaultdict(list)) for kind in KINDS}
+    for day in config['settings']['days']:
+        for section_obj in timetable_data[day]:
+            for slot in config['settings']['all_slots']:
+                slot_info = section_obj[slot][0]
+                if slot_info['status'] == "Assigned":
+                    for kind, name in cell_occupants(slot_info):
+                        busy[kind][name][day].append((slot, section_obj['section']))
+    return busy
+
+
+def analyzer_questions(config, timetable_data, sections):
+    """The cells and lab slots conflict_analyzer.py asks about: (section, day, TBA slots, free lab slots)."""
+    from src.diagnostics.conflict_analyzer import LAB_SLOT_MAP
+    questions = []
+    for day in config['settings']['days']:
+        by_section = {obj['section']: obj for obj in timetable_data[day]}
+        for section in sections:
+            section_obj = by_section[section]
+            tba = [slot for slot in config['settings']['all_slots'] if section_obj[slot][0]['status'] == "To Be Assigned"]
+            free_lab_slots = [covered for covered in LAB_SLOT_MAP.values()
+                              if all(section_obj[s][0]['status'] == "Free" for s in covered)]
+            questions.append((section, day, tba, free_lab_slots))
+    return questions
+
+
+def list_answers(config, busy, questions):
+    """Busy teachers per TBA cell, room occupants, and free lab rooms / busy lab teachers, by list scans."""
+    answers = []
+    for section, day, tba, free_lab_slots in questions:
+        teachers = {s: t for s, t in config['subjects'][section]}
+        room = config['section_theory_rooms'][section]
+        for slot in tba:
+            for subject in config['core_subjects'][section]:
+                teacher = teachers.get(subject, '')
+                answers.append([sec for busy_slot, sec in busy["teacher"][teacher][day] if busy_slot == slot])
+            answers.append([sec for busy_slot, sec in busy["room"][room][day] if busy_slot == slot])
+        for covered in free_lab_slots:
+            answers.append([r for r in config['lab_rooms']
+                            if not any(s in [b for b, _ in busy["lab_room"][r][day]] for s in covered)])
+            answers.append([lab for lab in config['labs'][section]
+                            if any(s in [b for b, _ in busy["teacher"][teachers.get(lab.split(" ")[0], teachers.get(lab, ''))][day]]
+                                   for s in covered)])
+    return answers
+
+
+def bitset_answers(config, index, questions):
+    """The same answers from the OccupancyIndex."""
+    answers = []
+    for section, day, tba, free_lab_slots in questions:
+        teachers = {s: t for s, t in config['subjects'][section]}
+        room = config['section_theory_rooms'][section]
+        for slot in tba:
+            for subject in config['core_subjects'][section]:
+                answers.append(index.who("teacher", teachers.get(subject, ''), day, slot))
+            answers.append(index.who("room", room, day, slot))
+        for covered in free_lab_slots:
+            answers.append(index.free("lab_room", config['lab_rooms'], day, covered))
+            answers.append([lab for lab in config['labs'][section]
+                            if index.is_busy("teacher", teachers.get(lab.split(" ")[0], teachers.get(lab, '')), day, covered)])
+    return answers
+
+
+def main():
+    from src.diagnostics.conflict_analyzer import analyze
+    from src.solver.instance_generator import generate_instance
+    from src.solver.model_builder import load_data
+    from src.solver.timetable import best_time
+
+    parser = argparse.ArgumentParser(description="Compare the occupancy bitmasks with the per-day list scans.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[14, 56, 224],
+                        help="sections of the generated instances (default: 14 56 224)")
+    parser.add_argument("--repeat", type=int, default=3, help="runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    base_config, _ = load_data('data/config.json', 'data/data.json')
+    print("\n=== Occupancy: per-day lists vs bitmasks (all sections analyzed) ===")
+    print(f"{'sections':>9}{'teachers':>10}{'lab rooms':>11}{'lists (ms)':>12}{'bitmasks (ms)':>15}{'speed-up':>10}"
+          f"{'analyzer (ms)':>15}")
+    for size in args.sizes:
+        # Institution-size data: 4.5 teachers and one lab room per section, and a third of the cells "Assigned".
+        config, timetable = generate_instance(base_config['settings'], size, round(4.5 * size), size, assigned=0.3)
+        questions = analyzer_questions(config, timetable, config['sections'])
+        if list_answers(config, list_index(config, timetable), questions) != bitset_answers(
+                config, OccupancyIndex(config, timetable), questions):
+            raise SystemExit(f"The list scans and the bitmasks disagree for {size} sections.")
+        list_time = best_time(lambda: list_answers(config, list_index(config, timetable), questions), args.repeat)
+        bitset_time = best_time(lambda: bitset_answers(config, OccupancyIndex(config, timetable), questions), args.repeat)
+        with contextlib.redirect_stdout(io.StringIO()):
+            analyzer_time = best_time(lambda: analyze(config, timetable, config['sections']), args.repeat)
+        print(f"{size:>9}{round(4.5 * size):>10}{size:>11}{1000 * list_time:>12.1f}"
+              f"{1000 * bitset_time:>15.1f}{list_time / bitset_time:>9.1f}x{1000 * analyzer_time:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
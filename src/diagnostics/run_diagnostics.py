@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+# run_diagnostics.py
+"""
+Runs every diagnostic on one timetable, for every section group.
+
+config.json and the timetable are read once. Their arrays (Timetable) and
+the occupancy bitmasks (OccupancyIndex) are built once and shared by the
+checks:
+- conflicts: teacher and room double-bookings (diagnose_conflicts.py,
+  counted on the shared arrays);
+- unavailability: classes of unavailable teachers (test_unavailability.py);
+- analysis <stage>: why the TBA cells and lab slots of each group in
+  config.json["stage_sections"] cannot be filled (conflict_analyzer.py);
+  sections with no TBA cell left are already solved and skipped, so a
+  solved timetable gives an empty report.
+The checks are independent. With --processes above 1 they run in forked
+processes, which inherit the loaded data instead of reading it again. The
+output of each check is printed in the order above, followed by a summary
+table. The same findings go to --report as JSON.
+
+Usage (from the repository root):
+    python3 src/diagnostics/run_diagnostics.py [--timetable outputs/updated_timetable.json] [--stages 3rd 5th 7th]
+        [--processes N] [--report outputs/diagnostics.json]
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+# Run as a script (python3 src/diagnostics/run_diagnostics.py): make `src` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.diagnostics.conflict_analyzer import analyze
+from src.diagnostics.diagnose_conflicts import find_conflicts_vectorized, print_conflicts
+from src.diagnostics.occupancy import OccupancyIndex
+from src.diagnostics.test_unavailability import print_violations, unavailability_violations
+from src.solver.model_builder import load_data
+from src.solver.timetable import Timetable
+
+_shared = {}  # config, timetable, arrays, occupancy: loaded once, inherited by forked workers
+
+
+def load_shared(config_path, timetable_path):
+    """Reads config.json and the timetable and builds the indexes every check uses."""
+    config, timetable = load_data(config_path, timetable_path)
+    _shared.update(config=config, timetable=timetable,
+                   arrays=Timetable.from_json(timetable, config['settings']['all_slots']),
+                   occupancy=OccupancyIndex(config, timetable))
+
+
+def check_conflicts():
+    conflicts = find_conflicts_vectorized(_shared['config'], _shared['arrays'])
+    print_conflicts(conflicts)
+    return conflicts
+
+
+def check_unavailability():
+    violations = unavailability_violations(_shared['config'], _shared['arrays'])
+    print_violations(violations)
+    if not violations:
+        print("✅ SUCCESS: No unavailability constraint violations found.")
+    return violations
+
+
+def check_analysis(stage):
+    sections = _shared['config']['stage_sections'][stage]
+    return analyze(_shared['config'], _shared['timetable'], sections, stage, _shared['occupancy'])
+
+
+CHECKS = {"conflicts": check_conflicts, "unavailability": check_unavailability, "analysis": check_analysis}
+
+
+def run_check(check):
+    """Runs one (name, argument) check. Returns (name, argument, printed text, findings, seconds)."""
+    name, argument = check
+    output = io.StringIO()
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(output):
+        findings = CHECKS[name](argument) if argument is not None else CHECKS[name]()
+    return name, argument, output.getvalue(), findings, time.perf_counter() - start
+
+
+def summarize(name, findings):
+    """One line of the summary table for a check's findings."""
+    if name == "conflicts":
+        teachers = sum(1 for conflict in findings if conflict['kind'] == "teacher")
+        return len(findings), f"{teachers} teacher, {len(findings) - teachers} room double-bookings"
+    if name == "unavailability":
+        return len(findings), f"{len(findings)} classes of unavailable teachers"
+    sections = findings['sections'].values()
+    teachers = sum(len(section['teacher_conflicts']) for section in sections)
+    rooms = sum(len(section['room_conflicts']) for section in sections)
+    labs = sum(len(section['blocked_lab_slots']) for section in sections)
+    return (teachers + rooms + labs + len(findings['issues']),
+            f"{teachers} busy teachers, {rooms} busy rooms, {labs} blocked lab slots, {len(findings['issues'])} issues")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run every diagnostic on one timetable, for every section group.")
+    parser.add_argument("--config", default='data/config.json', help="config file (default: data/config.json)")
+    parser.add_argument("--timetable",
+                        help="timetable to diagnose (default: outputs/updated_timetable.json if present, "
+                             "else data/data.json)")
+    parser.add_argument("--stages", nargs="+",
+                        help="section groups to analyze (default: every stage in config.json[\"stage_sections\"])")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1,
+                        help="checks run at the same time (default: one per core)")
+    parser.add_argument("--report", default='outputs/diagnostics.json',
+                        help="where to write the findings as JSON (default: outputs/diagnostics.json)")
+    args = parser.parse_args()
+
+    timetable_path = args.timetable or ('outputs/updated_timetable.json'
+                                        if os.path.exists('outputs/updated_timetable.json') else 'data/data.json')
+    start = time.perf_counter()
+    load_shared(args.config, timetable_path)
+    load_time = time.perf_counter() - start
+    stages = args.stages or list(_shared['config'].get('stage_sections', {}))
+    unknown = [stage for stage in stages if stage not in _shared['config'].get('stage_sections', {})]
+    if unknown:
+        print(f"FATAL ERROR: no stage {', '.join(unknown)} in config.json[\"stage_sections\"].", file=sys.stderr)
+        sys.exit(1)
+    checks = [("conflicts", None), ("unavailability", None)] + [("analysis", stage) for stage in stages]
+    print(f"🩺 Running {len(checks)} diagnostics on {timetable_path} (loaded in {load_time:.3f}s)...")
+
+    processes = min(args.processes, len(checks))
+    if processes > 1 and "fork" in multiprocessing.get_all_start_methods():
+        with multiprocessing.get_context("fork").Pool(processes) as pool:
+            results = pool.map(run_check, checks)
+    else:
+        results = [run_check(check) for check in checks]
+
+    report = {"config": args.config, "timetable": timetable_path, "stages": stages, "checks": []}
+    rows = []
+    for name, argument, text, findings, seconds in results:
+        label = name if argument is None else f"{name} {argument}"
+        print(f"\n--- {label} ---")
+        print(text, end="")
+        count, description = summarize(name, findings)
+        rows.append((label, count, description, seconds))
+        report["checks"].append({"check": name, "stage": argument, "problems": count, "seconds": round(seconds, 6),
+                                 "findings": findings})
+
+    print("\n=== Diagnostics summary ===")
+    print(f"{'check':<20}{'problems':>10}{'time (s)':>10}  details")
+    for label, count, description, seconds in rows:
+        print(f"{label:<20}{count:>10}{seconds:>10.3f}  {description}")
+    print(f"Total: {time.perf_counter() - start:.3f}s with {processes} process(es).")
+
+    os.makedirs(os.path.dirname(args.report) or ".", exist_ok=True)
+    with open(args.report, 'w') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Report written to {args.report}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,83 @@
 import json
+import os
 import sys
 
-def check_unavailability():
+import numpy as np
+
+# Run as a script (python3 src/diagnostics/test_unavailability.py): make `src` importable.
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from src.solver.model_builder import teacher_unavailability as configured_unavailability
+from src.solver.timetable import Timetable
+
+
+def unavailability_violations(config, timetable, teacher_unavailability=None):
+    """
+    Every class in `timetable` (already loaded, e.g. by the pipeline, as
+    JSON or as a Timetable) whose teacher is listed as unavailable at that
+    time, in timetable order, as dicts: {"teacher", "section", "day", "slot",
+    "subject"}. The list defaults to the one the solver uses:
+    config["teacher_unavailability"], else model_builder.TEACHER_UNAVAILABILITY.
+    """
+    if teacher_unavailability is None:
+        teacher_unavailability = configured_unavailability(config)
+    slots = config['settings']['all_slots']
+    tt = timetable if isinstance(timetable, Timetable) else Timetable.from_json(timetable, slots)
+    assigned = tt.mask('status', "Assigned")
+    teacher_codes = tt.codes['teacher']
+    # (day, position in the day's list, slot, position in the cell) -> teacher
+    found = {}
+
+    # One array pass per listed teacher instead of a walk over every cell
+    for teacher, blocked_days in teacher_unavailability.items():
+        blocked = np.zeros((len(tt.days), len(tt.slots)), dtype=bool)
+        for day, blocked_slots in blocked_days.items():
+            for slot in blocked_slots:
+                if day in tt.day_index and slot in tt.slot_index and day in config['settings']['days'] and slot in slots:
+                    blocked[tt.day_index[day], tt.slot_index[slot]] = True
+        # This handles both single theory teachers ("SS")
+        # and parallel lab teachers ("SK / SS")
+        codes = [code for code in range(1, len(tt.tables['teacher'])) if teacher in tt.tables['teacher'].names(code)]
+        hits = assigned & blocked[:, None, :] & np.isin(teacher_codes, codes)
+        for d, s, t in zip(*np.nonzero(hits)):
+            names = tt.tables['teacher'].names(int(teacher_codes[d, s, t]))
+            found[d, tt.order[tt.days[d]].index(s), t, names.index(teacher)] = teacher
+
+    violations = []
+    for (d, position, t, _), teacher in sorted(found.items()):
+        s = tt.order[tt.days[d]][position]
+        violations.append({"teacher": teacher, "section": tt.sections[s], "day": tt.days[d], "slot": tt.slots[t],
+                           "subject": tt.cell(tt.days[d], tt.sections[s], tt.slots[t]).get('subject')})
+    return violations
+
+
+def find_violations(config, timetable, teacher_unavailability=None):
     """
-    Checks the generated outputs/updated_timetable.json against a hard-coded
-    list of teacher unavailability constraints.
+    Prints every class in `timetable` whose teacher is listed as unavailable
+    at that time (see unavailability_violations()). Returns the count.
     """
-    
-    # 1. Define the Unavailability Rules (copy/pasted from your list)
-    teacher_unavailability = {
-        # TEACHER SA
-        "SA": {"Monday": ["11-12", "12-1", "3-4"], "Wednesday": ["9-10"], "Thursday": ["11-12"]},
-        # TEACHER EO
-        "EO": {"Tuesday": ["10-11", "11-12", "12-1"], "Wednesday": ["12-1"], "Thursday": ["3-4"], "Friday": ["9-10", "10-11"]},
-        # TEACHER GF7
-        "GF7": {"Monday": ["2-3"], "Tuesday": ["12-1"], "Wednesday": ["9-10"], "Thursday": ["3-4", "4-5"]},
-        # TEACHER SPS
-        "SPS": {"Monday": ["9-10"], "Wednesday": ["11-12", "12-1", "4-5"], "Friday": ["10-11"]},
-        # TEACHER GF8
-        "GF8": {"Monday": ["12-1"], "Tuesday": ["11-12", "12-1"], "Wednesday": ["11-12"], "Thursday": ["3-4"]},
-        # TEACHER SS
-        "SS": {"Tuesday": ["10-11"], "Wednesday": ["11-12"], "Thursday": ["11-12", "12-1"], "Friday": ["3-4"]},
-        # TEACHER GF9
-        "GF9": {"Monday": ["3-4"], "Tuesday": ["11-12", "3-4", "4-5"], "Wednesday": ["3-4"]},
-        # TEACHER GF10
-        "GF10": {"Monday": ["3-4", "4-5"], "Tuesday": ["9-10"], "Thursday": ["10-11"], "Friday": ["12-1"]},
-        # TEACHER AS
-        "AS": {"Monday": ["3-4", "4-5"]},
-        # TEACHER SP
-        "SP": {"Tuesday": ["3-4", "4-5"]},
-        # TEACHER KN
-        "KN": {"Thursday": ["3-4", "4-5"]},
-    }
+    violations = unavailability_violations(config, timetable, teacher_unavailability)
+    print_violations(violations)
+    return len(violations)
+
+
+def print_violations(violations):
+    """Prints the violations of unavailability_violations()."""
+    for violation in violations:
+        print(f"\n--- 🔴 VIOLATION FOUND! ---")
+        print(f"  Teacher:  {violation['teacher']}")
+        print(f"  Section:  {violation['section']}")
+        print(f"  When:     {violation['day']} at {violation['slot']}")
+        print(f"  Subject:  {violation['subject']}")
+        print(f"  Problem:  Teacher is scheduled but listed as unavailable at this time.\n")
 
-    # 2. Load the generated timetable
+
+def check_unavailability():
+    """
+    Checks the generated outputs/updated_timetable.json against the teacher
+    unavailability constraints the solver uses. Exits with status 1 if there
+    are violations.
+    """
+    # 1. Load the generated timetable
     try:
         # UPDATED PATH
         with open('outputs/updated_timetable.json', 'r') as f:
@@ -43,7 +87,7 @@ def check_unavailability():
         print("Please run the full solver pipeline first to generate it.")
         sys.exit(1)
         
-    # 3. Load config for days/slots
+    # 2. Load config for days/slots
     try:
         # UPDATED PATH
         with open('data/config.json', 'r') as f:
@@ -52,38 +96,10 @@ def check_unavailability():
         print("❌ Error: 'data/config.json' not found.")
         sys.exit(1)
         
-    days = config['settings']['days']
-    slots = config['settings']['all_slots']
-    
-    violations = 0
     print("🕵️  Checking 'outputs/updated_timetable.json' against unavailability constraints...")
-    
-    # 4. Iterate through all assigned slots and check for violations
-    for day in days:
-        for section_obj in timetable.get(day, []):
-            for slot in slots:
-                if slot not in section_obj: continue
-                
-                slot_info = section_obj[slot][0]
-                
-                if slot_info.get('status') == "Assigned":
-                    teacher_str = slot_info.get('teacher')
-                    if not teacher_str: continue
-                    
-                    # This handles both single theory teachers ("SS")
-                    # and parallel lab teachers ("SK / SS")
-                    teachers_in_slot = [t.strip() for t in teacher_str.split('/')]
-                    
-                    for teacher in teachers_in_slot:
-                        if teacher in teacher_unavailability:
-                            if day in teacher_unavailability[teacher] and slot in teacher_unavailability[teacher][day]:
-                                print(f"\n--- 🔴 VIOLATION FOUND! ---")
-                                print(f"  Teacher:  {teacher}")
-                                print(f"  Section:  {section_obj['section']}")
-                                print(f"  When:     {day} at {slot}")
-                                print(f"  Subject:  {slot_info.get('subject')}")
-                                print(f"  Problem:  Teacher is scheduled but listed as unavailable at this time.\n")
-                                violations += 1
+
+    # 3. Check every assigned slot
+    violations = find_violations(config, timetable)
 
     if violations == 0:
         print("\n✅ SUCCESS: No unavailability constraint violations found.")
@@ -91,6 +107,8 @@ def check_unavailability():
         print(f"\n❌ FAILED: Found {violations} total violations.")
         
     print("Check complete.")
+    if violations:
+        sys.exit(1)
 
 if __name__ == "__main__":
     check_unavailability()
\ No newline at end of file
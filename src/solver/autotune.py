@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+# autotune.py
+"""
+Searches CP-SAT parameters over the solves of a corpus (see corpus.py).
+
+The instances are the corpus entries, grouped into classes by their stage
+(3rd, 5th, 7th, joint, ...), which is how the solvers look parameters up.
+Every candidate parameter set is a choice of one value per SEARCH_SPACE
+field (workers, search branching, linearization, presolve and probing),
+either every combination (--grid) or --samples of them drawn at random.
+Candidate 0 is always the entries' recorded parameters.
+
+Each candidate solves every instance of a class once per --seeds value,
+in a pool of --processes solver processes. A run that ends without a
+definitive answer counts as failed and costs the time limit. Per class the
+candidates are ranked by failed runs, then median, then p95 solve time;
+the report lists every candidate, and the best set of each class is saved
+to --output (settings.solver.tuned_file, which the solvers load; see
+solver_settings.py). A class whose best set fails as often as the recorded
+parameters and is not --min-gain faster at the median gets an empty set.
+
+Runs in parallel processes share the machine: keep --processes times the
+largest num_workers at or below the core count, or the times of
+multi-worker candidates are too high.
+
+Usage (from the repository root):
+    python3 -m src.solver.pipeline --corpus corpus
+    python3 -m src.solver.autotune [--corpus corpus] [--grid | --samples 20] [--seeds 0 1 2] [--time-limit 10]
+        [--processes N] [--min-gain 0.05] [--random-seed 0] [--output data/tuned_parameters.json] [--dry-run]
+"""
+
+import argparse
+import itertools
+import json
+import math
+import multiprocessing
+import os
+import random
+import statistics
+import sys
+import time
+from ortools.sat.python import cp_model
+
+from src.solver.corpus import entry_model, load_entries
+from src.solver.solver_settings import DEFINITIVE_STATUSES, configure
+
+SEARCH_SPACE = {
+    "num_workers": [1, 2, 4, 8],
+    "search_branching": ["AUTOMATIC_SEARCH", "FIXED_SEARCH", "PORTFOLIO_WITH_QUICK_RESTART_SEARCH"],
+    "linearization_level": [0, 1, 2],
+    "cp_model_presolve": [True, False],
+    "cp_model_probing_level": [0, 2],
+}
+_models = {}  # entry id -> CpModel, per pool process
+
+
+def candidates(grid=False, samples=20, seed=0):
+    """Parameter sets to try: {} (as recorded) first, then the grid or `samples` random points of it."""
+    points = [dict(zip(SEARCH_SPACE, values)) for values in itertools.product(*SEARCH_SPACE.values())]
+    if not grid:
+        points = random.Random(seed).sample(points, min(samples, len(points)))
+    return [{}] + points
+
+
+def percentile(values, q):
+    """Nearest-rank percentile `q` (0-100) of `values`."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(q / 100 * len(ordered)) - 1)]
+
+
+def _tune_job(job):
+    """Solves one (candidate, entry, seed) in a pool process. Returns (candidate, stage, wall time, solved)."""
+    corpus_dir, entry, candidate_index, params = job
+    if entry["id"] not in _models:
+        _models[entry["id"]] = entry_model(corpus_dir, entry)[0]
+    solver = cp_model.CpSolver()
+    configure(solver, params)
+    status = solver.Solve(_models[entry["id"]])
+    solved = status in DEFINITIVE_STATUSES
+    return candidate_index, entry["stage"], solver.WallTime() if solved else params['max_time_in_seconds'], solved
+
+
+def describe(params):
+    """A parameter set as a short table cell."""
+    if not params:
+        return "(as recorded)"
+    short = {"AUTOMATIC_SEARCH": "auto", "FIXED_SEARCH": "fixed", "PORTFOLIO_WITH_QUICK_RESTART_SEARCH": "quick"}
+    return (f"w={params['num_workers']} {short.get(params['search_branching'], params['search_branching'])} "
+            f"lin={params['linearization_level']} presolve={'on' if params['cp_model_presolve'] else 'off'} "
+            f"probe={params['cp_model_probing_level']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search CP-SAT parameters over the solves of a corpus.")
+    parser.add_argument("--corpus", default='corpus', help="corpus directory recorded with --corpus (default: corpus)")
+    parser.add_argument("--grid", action="store_true", help="try every combination of SEARCH_SPACE")
+    parser.add_argument("--samples", type=int, default=20,
+                        help="random combinations to try without --grid (default: 20)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0, 1, 2],
+                        help="CP-SAT random_seed values; each instance is solved once per seed (default: 0 1 2)")
+    parser.add_argument("--time-limit", type=float, default=10, help="time limit per solve (default: 10)")
+    parser.add_argument("--processes", type=int,
+                        help="solver processes in the pool (default: cores / largest num_workers, at least 1)")
+    parser.add_argument("--min-gain", type=float, default=0.05,
+                        help="median speed-up a set needs over the recorded parameters to be saved (default: 0.05)")
+    parser.add_argument("--random-seed", type=int, default=0, help="seed for drawing the random candidates")
+    parser.add_argument("--output", default='data/tuned_parameters.json',
+                        help="where to save the best set per class (settings.solver.tuned_file)")
+    parser.add_argument("--dry-run", action="store_true", help="print the report without saving it")
+    args = parser.parse_args()
+
+    entries = load_entries(args.corpus) if os.path.isdir(args.corpus) else []
+    if not entries:
+        print(f"FATAL ERROR: no corpus entries in {args.corpus}; record some first, "
+              f"e.g. python3 -m src.solver.pipeline --corpus {args.corpus}", file=sys.stderr)
+        sys.exit(1)
+    points = candidates(args.grid, args.samples, args.random_seed)
+    processes = args.processes or max(1, (os.cpu_count() or 1) // max(SEARCH_SPACE["num_workers"]))
+    jobs = []
+    for index, candidate in enumerate(points):
+        for entry in entries:
+            for seed in args.seeds:
+                params = dict(entry["parameters"], **candidate, random_seed=seed,
+                              max_time_in_seconds=args.time_limit)
+                jobs.append((args.corpus, entry, index, params))
+    classes = sorted({entry["stage"] for entry in entries})
+    print(f"\n=== Autotuning {len(points)} parameter sets on {len(entries)} instances "
+          f"({', '.join(classes)}), {len(args.seeds)} seed(s), {processes} process(es) ===")
+
+    start = time.perf_counter()
+    times = {}   # (class, candidate) -> solve times
+    failed = {}  # (class, candidate) -> runs without a definitive answer
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(processes) as pool:
+        for done, (index, stage, wall_time, solved) in enumerate(pool.imap_unordered(_tune_job, jobs), 1):
+            times.setdefault((stage, index), []).append(wall_time)
+            failed[stage, index] = failed.get((stage, index), 0) + (not solved)
+            if done % 50 == 0 or done == len(jobs):
+                print(f"  -> {done}/{len(jobs)} solves ({time.perf_counter() - start:.1f}s)")
+
+    tuned = {"tuned": time.strftime("%Y-%m-%dT%H:%M:%S"), "corpus": args.corpus, "time_limit": args.time_limit,
+             "seeds": args.seeds, "classes": {}}
+    for stage in classes:
+        instances = sum(1 for entry in entries if entry["stage"] == stage)
+        ranked = sorted(range(len(points)), key=lambda i: (failed[stage, i], statistics.median(times[stage, i]),
+                                                           percentile(times[stage, i], 95)))
+        print(f"\n--- {stage}: {instances} instance(s), {len(args.seeds) * instances} runs per candidate ---")
+        print(f"{'#':>4}  {'parameters':<52}{'failed':>8}{'median (s)':>12}{'p95 (s)':>10}")
+        for index in ranked:
+            print(f"{index:>4}  {describe(points[index]):<52}{failed[stage, index]:>8}"
+                  f"{statistics.median(times[stage, index]):>12.3f}{percentile(times[stage, index], 95):>10.3f}")
+        best = ranked[0]
+        recorded_median = statistics.median(times[stage, 0])
+        if failed[stage, best] == failed[stage, 0] and statistics.median(times[stage, best]) > recorded_median * (1 - args.min_gain):
+            best = 0
+        tuned["classes"][stage] = {
+            "parameters": points[best], "instances": instances, "failed": failed[stage, best],
+            "median_s": round(statistics.median(times[stage, best]), 6),
+            "p95_s": round(percentile(times[stage, best], 95), 6),
+            "recorded_median_s": round(statistics.median(times[stage, 0]), 6),
+            "recorded_p95_s": round(percentile(times[stage, 0], 95), 6),
+        }
+        print(f"Best for {stage}: {describe(points[best])}")
+
+    if args.dry_run:
+        return
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w') as f:
+        json.dump(tuned, f, indent=2)
+    print(f"\nTuned parameters written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
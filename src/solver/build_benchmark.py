@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# build_benchmark.py
+"""
+Measures how model-build time grows with the number of sections.
+
+The instance in data/ is replicated k times: every copy of a section gets
+its own name, teachers and theory room (suffixed "#k"). Lab rooms stay
+shared so each lab slot keeps the same room domain and the model grows by
+the same amount per section. Only pre-processing and model building are
+timed; nothing is solved, so the replicated instance need not be feasible.
+
+Usage (from the repository root):
+    python3 -m src.solver.build_benchmark [--factors 1 2 4 8] [--model integer|onehot|interval] [--repeat 3]
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import time
+
+from src.solver.model_builder import MODEL_BUILDERS, TimetableProblem, load_data, model_size, split_names
+
+
+def suffixed(value, suffix):
+    """Appends `suffix` to every name in a "A / B" cell value."""
+    names = split_names(value)
+    return " / ".join(f"{name}{suffix}" for name in names) if names else value
+
+
+def replicate(config_data, timetable_data, factor):
+    """Returns (config, timetable) with every section copied `factor` times (lab rooms shared)."""
+    config = copy.deepcopy(config_data)
+    timetable = copy.deepcopy(timetable_data)
+    for k in range(1, factor):
+        suffix = f"#{k}"
+        for section in config_data['sections']:
+            clone = f"{section}{suffix}"
+            config['sections'].append(clone)
+            config['section_theory_rooms'][clone] = f"{config_data['section_theory_rooms'][section]}{suffix}"
+            config['core_subjects'][clone] = list(config_data['core_subjects'][section])
+            config['subjects'][clone] = [[subject, f"{teacher}{suffix}"] for subject, teacher in config_data['subjects'][section]]
+            config['labs'][clone] = list(config_data['labs'].get(section, []))
+        for day in config_data['settings']['days']:
+            for section_obj in timetable_data[day]:
+                clone_obj = copy.deepcopy(section_obj)
+                clone_obj['section'] = f"{section_obj['section']}{suffix}"
+                for slot in config_data['settings']['all_slots']:
+                    if slot in clone_obj and clone_obj[slot][0]['status'] == "Assigned":
+                        slot_info = clone_obj[slot][0]
+                        slot_info['teacher'] = suffixed(slot_info.get('teacher'), suffix)
+                        if "/" not in str(slot_info.get('room', '')):
+                            slot_info['room'] = suffixed(slot_info.get('room'), suffix)
+                timetable[day].append(clone_obj)
+    return config, timetable
+
+
+def time_build(config_data, timetable_data, model_name, repeat):
+    """Best-of-`repeat` (seconds, variables, constraints) for pre-processing + building all sections."""
+    best = None
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            built = MODEL_BUILDERS[model_name](TimetableProblem(config_data, timetable_data, config_data['sections']))
+            elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return (best,) + model_size(built)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time model building for growing numbers of sections.")
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 2, 4, 8],
+                        help="how many copies of the shipped sections to build (default: 1 2 4 8)")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer")
+    parser.add_argument("--repeat", type=int, default=3, help="builds per factor; the fastest is reported")
+    args = parser.parse_args()
+
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    print(f"\n=== Build Scaling ({args.model} model) ===")
+    print(f"{'sections':>9}{'variables':>11}{'constraints':>13}{'build (s)':>11}{'ms/section':>12}")
+    for factor in args.factors:
+        config, timetable = replicate(config_data, timetable_data, factor)
+        elapsed, num_vars, num_constraints = time_build(config, timetable, args.model, args.repeat)
+        sections = len(config['sections'])
+        print(f"{sections:>9}{num_vars:>11}{num_constraints:>13}{elapsed:>11.3f}{1000 * elapsed / sections:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
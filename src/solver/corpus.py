@@ -0,0 +1,294 @@
+#!/usr/bin/env python
+# corpus.py
+"""
+A corpus of recorded solves, and a runner that replays them.
+
+With --corpus DIR on the engine, solver_joint or the pipeline, every
+stage's solve is saved to DIR before the run goes on:
+
+    DIR/<entry id>/entry.json       stage, sections, formulation, CP-SAT parameters,
+                                    input hashes, model size and the solver's response
+    DIR/<entry id>/model.pbtxt.gz   the built CpModel proto (text format)
+    DIR/inputs/<sha256>.json.gz     config.json and the timetable the stage started from,
+                                    stored once per distinct content
+
+Entry ids are "<date>-<time>-<stage>-<model hash>", so a corpus can be
+kept across runs (generate.sh only cleans outputs/). `list` prints the
+entries; `replay` solves them again, all of them or the ids given:
+
+- by default the saved proto is solved as recorded, with the recorded
+  parameters changed by --param FIELD=VALUE, --workers, --time-limit and
+  one run per --seeds value;
+- --model, --symmetry-breaking or --rebuild build the model again from the
+  saved inputs with the current code (another formulation, symmetry
+  breaking, or the same formulation after a change to model_builder.py).
+
+Usage (from the repository root):
+    python3 -m src.solver.engine --corpus corpus
+    python3 -m src.solver.corpus list [--corpus corpus]
+    python3 -m src.solver.corpus replay [ENTRY ...] [--corpus corpus] [--status INFEASIBLE UNKNOWN]
+        [--param FIELD=VALUE ...] [--workers N] [--seeds 0 1 2] [--time-limit SECONDS]
+        [--model integer|onehot|interval] [--symmetry-breaking] [--rebuild] [--output PATH]
+"""
+
+import argparse
+import contextlib
+import csv
+import gzip
+import hashlib
+import io
+import json
+import os
+import sys
+import time
+from ortools.sat.python import cp_model
+
+from src.solver.model_builder import MODEL_BUILDERS, TimetableProblem, add_soft_objective, model_size
+from src.solver.profiler import RESPONSE_STATS
+from src.solver.solver_settings import configure, model_from_text, stage_parameters
+
+REPLAY_COLUMNS = ["entry", "stage", "variant", "seed", "variables", "constraints", "recorded_status",
+                  "recorded_wall_s", "status", "wall_s", "deterministic_time", "num_conflicts", "objective"]
+
+
+def content_hash(data):
+    """(sha256 hex digest, bytes) of `data` as canonical JSON."""
+    encoded = json.dumps(data, sort_keys=True, separators=(",", ":")).encode()
+    return hashlib.sha256(encoded).hexdigest(), encoded
+
+
+def model_name(built):
+    """MODEL_BUILDERS key of a built model."""
+    return next(name for name, builder in MODEL_BUILDERS.items() if type(built) is builder)
+
+
+class SolveCorpus:
+    """Saves every solve handed to record() as a corpus entry under `directory`."""
+
+    def __init__(self, directory, command=None):
+        self.directory = directory
+        self.command = list(sys.argv if command is None else command)
+        os.makedirs(os.path.join(directory, "inputs"), exist_ok=True)
+
+    def save_input(self, data):
+        """Writes `data` to inputs/ unless the same content is there already. Returns its hash."""
+        digest, encoded = content_hash(data)
+        path = os.path.join(self.directory, "inputs", f"{digest}.json.gz")
+        if not os.path.exists(path):
+            with gzip.open(path, 'wb') as f:
+                f.write(encoded)
+        return digest
+
+    def record(self, built, config_data, stage, solver, status, num_workers=None, race_processes=None):
+        """Saves the model, parameters, inputs and response of one finished solve. Returns the entry id."""
+        model_text = str(built.model.Proto())
+        model_hash = hashlib.sha256(model_text.encode()).hexdigest()
+        parameters = stage_parameters(config_data, stage)
+        if num_workers:
+            parameters['num_workers'] = num_workers
+        variables, constraints = model_size(built)
+        entry = {
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "command": self.command,
+            "stage": stage,
+            "sections": built.problem.sections_to_solve,
+            "model": model_name(built),
+            "room_matching": built.room_matching,
+            "symmetry_breaking": built.symmetry_breaking,
+            "objective": built.model.HasObjective(),
+            "parameters": parameters,
+            "race_processes": race_processes or 0,
+            "inputs": {"config": self.save_input(config_data),
+                       "timetable": self.save_input(built.problem.timetable_data)},
+            "model_sha256": model_hash,
+            "variables": variables,
+            "constraints": constraints,
+            "response": {"status": solver.StatusName(status), "wall_s": solver.WallTime()},
+        }
+        if isinstance(solver, cp_model.CpSolver):
+            response = solver.ResponseProto()
+            entry["response"].update({stat: getattr(response, stat) for stat in RESPONSE_STATS})
+            if built.model.HasObjective():
+                entry["response"].update(objective=response.objective_value, bound=response.best_objective_bound)
+
+        entry_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{stage}-{model_hash[:8]}"
+        suffix = 1
+        while os.path.exists(os.path.join(self.directory, entry_id if suffix == 1 else f"{entry_id}-{suffix}")):
+            suffix += 1
+        entry_id = entry_id if suffix == 1 else f"{entry_id}-{suffix}"
+        entry["id"] = entry_id
+        entry_dir = os.path.join(self.directory, entry_id)
+        os.makedirs(entry_dir)
+        with gzip.open(os.path.join(entry_dir, "model.pbtxt.gz"), 'wt') as f:
+            f.write(model_text)
+        with open(os.path.join(entry_dir, "entry.json"), 'w') as f:
+            json.dump(entry, f, indent=2)
+        print(f"Solve of {stage} recorded in {entry_dir}.")
+        return entry_id
+
+
+class NoCorpus:
+    """Stands in for SolveCorpus when no --corpus is given; record() does nothing."""
+
+    def record(self, built, config_data, stage, solver, status, num_workers=None, race_processes=None):
+        return None
+
+
+NO_CORPUS = NoCorpus()
+
+
+def load_entries(directory):
+    """Every entry.json under `directory`, oldest first."""
+    entries = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name, "entry.json")
+        if os.path.isfile(path):
+            with open(path) as f:
+                entries.append(json.load(f))
+    return entries
+
+
+def load_input(directory, digest):
+    with gzip.open(os.path.join(directory, "inputs", f"{digest}.json.gz"), 'rb') as f:
+        return json.loads(f.read())
+
+
+def entry_model(directory, entry, model=None, symmetry_breaking=False, rebuild=False):
+    """
+    (CpModel, variant name) to replay: the saved proto, or with `model`,
+    `symmetry_breaking` or `rebuild` a model built again from the saved inputs.
+    """
+    if model is None and not symmetry_breaking and not rebuild:
+        with gzip.open(os.path.join(directory, entry["id"], "model.pbtxt.gz"), 'rt') as f:
+            return model_from_text(f.read()), "recorded"
+    model = model or entry["model"]
+    config = load_input(directory, entry["inputs"]["config"])
+    timetable = load_input(directory, entry["inputs"]["timetable"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        problem = TimetableProblem(config, timetable, entry["sections"])
+        built = MODEL_BUILDERS[model](problem, room_matching=entry["room_matching"],
+                                      symmetry_breaking=symmetry_breaking or entry["symmetry_breaking"])
+        if entry["objective"]:
+            add_soft_objective(built, config['settings'].get('objective', {}))
+    return built.model, model + ("+symmetry" if symmetry_breaking else "")
+
+
+def replay(model, parameters):
+    """Solves `model` in-process with `parameters`. Returns the response measurements."""
+    solver = cp_model.CpSolver()
+    configure(solver, parameters)
+    status = solver.Solve(model)
+    response = solver.ResponseProto()
+    return {"status": solver.StatusName(status), "wall_s": round(solver.WallTime(), 6),
+            "deterministic_time": round(response.deterministic_time, 6), "num_conflicts": response.num_conflicts,
+            "objective": response.objective_value if model.HasObjective() else None}
+
+
+def parse_overrides(pairs):
+    """{field: value} from FIELD=VALUE strings."""
+    overrides = {}
+    for pair in pairs:
+        field, sep, value = pair.partition("=")
+        if not sep or not field:
+            raise ValueError(f"--param takes FIELD=VALUE, got {pair!r}.")
+        overrides[field.strip()] = value.strip()
+    return overrides
+
+
+def list_corpus(directory):
+    print(f"\n=== Corpus {directory} ===")
+    print(f"{'entry':<40}{'model':>10}{'variables':>11}{'constraints':>13}{'status':>12}{'wall (s)':>10}")
+    for entry in load_entries(directory):
+        response = entry["response"]
+        print(f"{entry['id']:<40}{entry['model']:>10}{entry['variables']:>11}{entry['constraints']:>13}"
+              f"{response['status']:>12}{response['wall_s']:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List or replay recorded solves.")
+    parser.add_argument("command", choices=["list", "replay"])
+    parser.add_argument("entries", nargs="*", metavar="ENTRY", help="entry ids to replay (default: all)")
+    parser.add_argument("--corpus", default='corpus', help="corpus directory (default: corpus)")
+    parser.add_argument("--status", nargs="+", metavar="STATUS",
+                        help="only replay entries recorded with one of these statuses (e.g. INFEASIBLE UNKNOWN)")
+    parser.add_argument("--param", action="append", default=[], metavar="FIELD=VALUE",
+                        help="override a recorded CP-SAT parameter (repeatable), e.g. linearization_level=2")
+    parser.add_argument("--workers", type=int, help="CP-SAT search workers (default: as recorded)")
+    parser.add_argument("--seeds", type=int, nargs="+", help="one replay per random_seed (default: as recorded)")
+    parser.add_argument("--time-limit", type=float, metavar="SECONDS", help="solver time limit (default: as recorded)")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS),
+                        help="rebuild each entry with this formulation from its saved inputs")
+    parser.add_argument("--symmetry-breaking", action="store_true",
+                        help="rebuild each entry from its saved inputs with symmetry-breaking constraints")
+    parser.add_argument("--rebuild", action="store_true",
+                        help="rebuild each entry from its saved inputs with its recorded formulation and the current code")
+    parser.add_argument("--output", metavar="PATH", help="also write the replay table as CSV")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.corpus):
+        print(f"FATAL ERROR: no corpus at {args.corpus}; record one with --corpus on the engine, "
+              f"solver_joint or the pipeline.", file=sys.stderr)
+        sys.exit(1)
+    if args.command == "list":
+        list_corpus(args.corpus)
+        return
+
+    entries = load_entries(args.corpus)
+    if args.entries:
+        known = {entry["id"] for entry in entries}
+        unknown = [entry_id for entry_id in args.entries if entry_id not in known]
+        if unknown:
+            print(f"FATAL ERROR: unknown corpus entries {unknown}.", file=sys.stderr)
+            sys.exit(1)
+        entries = [entry for entry in entries if entry["id"] in args.entries]
+    if args.status:
+        entries = [entry for entry in entries if entry["response"]["status"] in args.status]
+    try:
+        overrides = parse_overrides(args.param)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"\n=== Replaying {len(entries)} corpus entries ===")
+    print(f"{'entry':<40}{'variant':>18}{'seed':>6}{'recorded':>22}{'replayed':>22}{'det. time':>11}")
+    rows = []
+    for entry in entries:
+        try:
+            model, variant = entry_model(args.corpus, entry, args.model, args.symmetry_breaking, args.rebuild)
+        except ValueError as e:
+            print(f"{entry['id']:<40}  -> cannot rebuild: {e}")
+            continue
+        variables, constraints = len(model.Proto().variables), len(model.Proto().constraints)
+        parameters = dict(entry["parameters"], **overrides)
+        if args.workers:
+            parameters['num_workers'] = args.workers
+        if args.time_limit is not None:
+            parameters['max_time_in_seconds'] = args.time_limit
+        for seed in args.seeds or [parameters.get('random_seed')]:
+            if seed is not None:
+                parameters['random_seed'] = seed
+            try:
+                result = replay(model, parameters)
+            except ValueError as e:
+                print(f"FATAL ERROR: {e}", file=sys.stderr)
+                sys.exit(1)
+            recorded = entry["response"]
+            rows.append({"entry": entry["id"], "stage": entry["stage"], "variant": variant, "seed": seed,
+                         "variables": variables, "constraints": constraints, "recorded_status": recorded["status"],
+                         "recorded_wall_s": recorded["wall_s"], **result})
+            print(f"{entry['id']:<40}{variant:>18}{'-' if seed is None else seed:>6}"
+                  f"{recorded['status'] + ' ' + format(recorded['wall_s'], '.3f') + 's':>22}"
+                  f"{result['status'] + ' ' + format(result['wall_s'], '.3f') + 's':>22}"
+                  f"{result['deterministic_time']:>11.3f}")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPLAY_COLUMNS)
+            writer.writeheader()
+            writer.writerows(rows)
+        print(f"\nReplay table written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+#!/usr/bin/env python
+# engine.py
+"""
+One solver engine for every semester stage.
+
+The section group of each stage comes from config.json["stage_sections"]
+(e.g. "3rd" -> ["CSE-A-3", "CSE-B-3", "CSE-AIML-3"]). The name→ID maps,
+slot tables and section index map are built once (TimetableIndex) and
+reused by every stage, so running all stages in one process pays the
+interpreter start, the OR-Tools import and the index build only once. The
+timetable arrays (timetable.py) are imported once too and updated in place
+as stages are solved.
+Each stage still freezes the stages before it, as in the 3rd -> 5th ->
+7th chain.
+
+solver_3rd.py, solver_5th.py and solver_7th.py are thin wrappers that run
+one stage through this engine.
+
+Reads from:
+- data/config.json (rules, subjects, rooms, labs, stage_sections)
+- data/data.json (base timetable skeleton)
+
+Writes to:
+- outputs/updated_timetable.json (solved timetable)
+
+Usage (from the repository root):
+    python3 -m src.solver.engine [--stages 3rd 5th 7th] [--model integer|onehot|interval] [--workers N]
+    python3 -m src.solver.engine --objective [--stream PATH] [--time-limit SECONDS]
+    python3 -m src.solver.engine --profile outputs/profile.json
+    python3 -m src.solver.engine --corpus corpus
+    python3 -m src.solver.engine --explain [minimal]
+    python3 -m src.solver.engine --warm-start [PATH]
+    python3 -m src.solver.solver_7th --warm-start [PATH]
+"""
+
+import time
+
+IMPORT_START = time.perf_counter()
+
+import argparse
+import json
+import os
+import sys
+from ortools.sat.python import cp_model
+
+from src.solver.corpus import NO_CORPUS, SolveCorpus
+from src.solver.infeasibility import report_conflicts
+from src.solver.model_builder import (MODEL_BUILDERS, SolutionStreamer, SolutionValues, TimetableIndex, TimetableProblem,
+                                      add_soft_objective, delta_to_json, load_data, merge_delta, previous_assignments,
+                                      report_objective, save_timetable, solution_delta, solve)
+from src.solver.profiler import NO_PROFILE, RunProfile
+from src.solver.timetable import Timetable
+
+OUTPUT_PATH = 'outputs/updated_timetable.json'
+
+
+def stage_sections(config_data):
+    """config.json["stage_sections"]: {stage: [sections]} in solving order."""
+    stages = config_data.get('stage_sections')
+    if not stages:
+        raise ValueError("config.json has no \"stage_sections\" (stage name -> list of sections).")
+    for stage, sections in stages.items():
+        unknown = [s for s in sections if s not in config_data['sections']]
+        if unknown:
+            raise ValueError(f"Stage {stage} lists sections that are not in config.json[\"sections\"]: {unknown}")
+    return stages
+
+
+def add_warm_start_hints(problem, built, previous_timetable):
+    """Hints `built` with a previous timetable. Returns (kept, total) hint counts."""
+    theory, labs, hinted_sections, kept, total = previous_assignments(problem, previous_timetable)
+    built.add_hints(theory, labs, hinted_sections)
+    print(f"Warm start: kept {kept} of {total} hints across {len(hinted_sections)} sections.")
+    return kept, total
+
+
+def load_previous_timetable(path):
+    """The timetable at `path` for --warm-start, or None (with a warning) if it cannot be read."""
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Warning: Cannot warm start from {path} ({e}). Solving from scratch.", file=sys.stderr)
+        return None
+
+
+class SemesterEngine:
+    """
+    Solves section groups one at a time on top of a shared TimetableIndex.
+    `timings` collects one dict per solved stage (see solve_stage).
+    With `objective`, every stage minimizes settings.objective (see
+    add_soft_objective); with `stream_path`, every improving solution is
+    written there as it is found (see SolutionStreamer). Phases, model
+    sizes and solver statistics go to `profile` (see profiler.py), and
+    every stage's solve to `corpus` (see corpus.py). With `explain`
+    ("core" or "minimal"), an infeasible stage prints the rules that
+    conflict (see infeasibility.py). With `previous_timetable`, every stage
+    is hinted with that timetable's cells of its sections (warm start).
+    """
+
+    def __init__(self, config_data, timetable_data, model_name="integer", num_workers=None, race_processes=None,
+                 objective=False, stream_path=None, profile=NO_PROFILE, corpus=NO_CORPUS, explain=None,
+                 previous_timetable=None):
+        start = time.perf_counter()
+        self.config_data = config_data
+        self.stages = stage_sections(config_data)
+        self.profile = profile
+        self.corpus = corpus
+        self.explain = explain
+        self.previous_timetable = previous_timetable
+        # Imported once; stages solved in place on `timetable_data` keep these arrays up to date.
+        self.timetable_data = timetable_data
+        with profile.phase("index"):
+            self.timetable = Timetable.from_json(timetable_data, config_data['settings']['all_slots'])
+            self.index = TimetableIndex(config_data, self.timetable)
+        self.model_name = model_name
+        self.num_workers = num_workers
+        self.race_processes = race_processes
+        self.objective = objective
+        self.stream_path = stream_path
+        self.timings = []
+        self.deltas = {}  # stage -> cells its solution changed (solution_delta)
+        # Imports and the index are paid for by the first stage only.
+        self.startup_time = time.perf_counter() - IMPORT_START
+        self.index_time = time.perf_counter() - start
+
+    def solve_stage(self, stage, timetable_data, in_place=False):
+        """
+        Solves the sections of `stage` with every other "Assigned" cell fixed.
+        Returns the updated timetable (`timetable_data` itself with `in_place`),
+        or None if no solution was found. The changed cells are kept in
+        self.deltas[stage].
+        """
+        sections = self.stages[stage]
+        print(f"\n=== Stage {stage}: {', '.join(sections)} ===")
+        timing = {"stage": stage, "startup": 0.0 if self.timings else self.startup_time}
+
+        profile = self.profile
+
+        start = time.perf_counter()
+        with profile.phase("preprocessing", stage):
+            arrays = self.timetable if timetable_data is self.timetable_data else None
+            problem = TimetableProblem(self.config_data, timetable_data, sections, index=self.index, timetable=arrays)
+        timing["preprocessing"] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        with profile.phase("build", stage):
+            try:
+                built = MODEL_BUILDERS[self.model_name](problem)
+            except ValueError:
+                if self.explain:
+                    report_conflicts(problem, self.explain == "minimal")
+                raise
+            if self.previous_timetable is not None:
+                add_warm_start_hints(problem, built, self.previous_timetable)
+            if self.objective:
+                add_soft_objective(built, self.config_data['settings'].get('objective', {}))
+        timing["build"] = time.perf_counter() - start
+        profile.model(built, stage)
+
+        print(f"\nStarting solver for {stage} semester...")
+        streamer = SolutionStreamer(built, self.stream_path, stage, append=bool(self.timings)) if self.stream_path else None
+        # Racing keeps only the winner's final solution, so objectives and streaming solve in-process.
+        race_processes = 0 if self.objective or streamer else self.race_processes
+        with profile.phase("solve", stage):
+            solver, status = solve(built, self.config_data, self.num_workers, stage=stage, race_processes=race_processes,
+                                   solution_callback=streamer, log_callback=profile.log_callback())
+        profile.solve(built, solver, status, stage)
+        self.corpus.record(built, self.config_data, stage, solver, status, self.num_workers, race_processes)
+        timing["solve"] = solver.WallTime()
+        timing["status"] = solver.StatusName(status)
+        self.timings.append(timing)
+
+        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+            print(f"Solution found for {stage} semester.")
+            if self.objective:
+                report_objective(built, solver)
+            with profile.phase("extract", stage):
+                self.deltas[stage] = solution_delta(problem, *built.extract(SolutionValues(solver)))
+            with profile.phase("merge", stage):
+                return merge_delta(timetable_data, self.deltas[stage], in_place, problem.timetable if in_place else None)
+        if status == cp_model.INFEASIBLE:
+            print("No solution found: The problem is infeasible.")
+            if self.explain:
+                report_conflicts(problem, self.explain == "minimal")
+            else:
+                print("Check constraints, especially room/teacher clashes or lack of 'Free' slots for labs.")
+        else:
+            print(f"No solution found. Solver status: {solver.StatusName(status)}")
+        return None
+
+    def run(self, timetable_data, stages=None, in_place=False):
+        """Solves `stages` (default: all, in config order), each on the result of the one before. Returns the timetable or None."""
+        for stage in stages or list(self.stages):
+            timetable_data = self.solve_stage(stage, timetable_data, in_place)
+            if timetable_data is None:
+                return None
+        return timetable_data
+
+    def report(self):
+        """Prints startup + pre-processing, build and solve time for every stage solved so far."""
+        print("\n=== Stage Timings ===")
+        print(f"{'stage':<8}{'startup (s)':>13}{'preproc (s)':>13}{'build (s)':>11}{'solve (s)':>11}  status")
+        for t in self.timings:
+            print(f"{t['stage']:<8}{t['startup']:>13.3f}{t['preprocessing']:>13.3f}{t['build']:>11.3f}{t['solve']:>11.3f}  {t['status']}")
+        print(f"Index built once in {self.index_time:.3f}s (included in the first stage's startup).")
+
+
+def run_stage_script(stage):
+    """
+    Entry point of the per-semester wrappers. The first stage in
+    config.json["stage_sections"] starts from data/data.json; later stages
+    continue from outputs/updated_timetable.json when it exists.
+    """
+    parser = argparse.ArgumentParser(description=f"Solve the {stage} semester stage.")
+    add_warm_start_argument(parser)
+    args = parser.parse_args()
+
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    previous_timetable = load_previous_timetable(args.warm_start) if args.warm_start else None
+    try:
+        engine = SemesterEngine(config_data, timetable_data, previous_timetable=previous_timetable)
+        if stage != next(iter(engine.stages)) and os.path.exists(OUTPUT_PATH):
+            print(f"Reading from existing {os.path.basename(OUTPUT_PATH)}...")
+            with open(OUTPUT_PATH, 'r') as f:
+                timetable_data = json.load(f)
+        solved = engine.solve_stage(stage, timetable_data, in_place=True)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        print("Please correct config.json/data.json and try again.", file=sys.stderr)
+        sys.exit(1)
+    engine.report()
+    if solved is None:
+        sys.exit(1)
+    save_timetable(solved, OUTPUT_PATH)
+
+
+def add_objective_arguments(parser):
+    """--objective, --stream and --time-limit, shared by the engine, solver_joint and the pipeline."""
+    parser.add_argument("--objective", action="store_true",
+                        help="minimize the weighted soft terms in settings.objective (teacher gaps, lab clustering, day overload)")
+    parser.add_argument("--stream", metavar="PATH",
+                        help="write every improving solution to PATH as it is found, one progress line each in <PATH stem>.progress.jsonl")
+    parser.add_argument("--time-limit", type=float, metavar="SECONDS",
+                        help="solver time limit per solve (default: settings.solver_timeout_seconds)")
+
+
+def add_corpus_argument(parser):
+    """--corpus, shared by the engine, solver_joint and the pipeline."""
+    parser.add_argument("--corpus", metavar="DIR",
+                        help="save every solve's model, parameters, inputs and statistics to DIR for replay (see corpus.py)")
+
+
+def add_explain_argument(parser):
+    """--explain, shared by the engine, solver_joint and the pipeline."""
+    parser.add_argument("--explain", nargs="?", const="core", choices=["core", "minimal"],
+                        help="if a solve is infeasible, name the rules that conflict; 'minimal' shrinks them to a minimal core")
+
+
+def add_warm_start_argument(parser):
+    """--warm-start, shared by the engine, the per-semester scripts, solver_joint and the pipeline."""
+    parser.add_argument("--warm-start", nargs="?", const=OUTPUT_PATH, metavar="PATH",
+                        help=f"hint the solver with a previous timetable (default PATH: {OUTPUT_PATH})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve the semester stages one after another in one process.")
+    parser.add_argument("--stages", nargs="+", metavar="STAGE",
+                        help="stages to solve, in order (default: every stage in config.json[\"stage_sections\"])")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer",
+                        help="model formulation: integer subject vars, one-hot booleans or optional intervals (default: integer)")
+    parser.add_argument("--workers", type=int,
+                        help="CP-SAT search workers (default: settings.solver in config.json)")
+    parser.add_argument("--race", type=int, metavar="N",
+                        help="race N solver processes with different seeds (default: settings.solver.race.processes)")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    parser.add_argument("--deltas", metavar="PATH",
+                        help="also write the cells each stage changed, as {stage: {section: [[day, slot, cell]]}}")
+    add_objective_arguments(parser)
+    parser.add_argument("--profile", metavar="PATH",
+                        help="write per-phase timings, model sizes and solver statistics of this run as JSON")
+    add_corpus_argument(parser)
+    add_explain_argument(parser)
+    add_warm_start_argument(parser)
+    args = parser.parse_args()
+
+    profile = RunProfile() if args.profile else NO_PROFILE
+    corpus = SolveCorpus(args.corpus) if args.corpus else NO_CORPUS
+    previous_timetable = load_previous_timetable(args.warm_start) if args.warm_start else None
+    with profile.phase("load JSON"):
+        config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    if args.time_limit is not None:
+        config_data['settings']['solver_timeout_seconds'] = args.time_limit
+    try:
+        engine = SemesterEngine(config_data, timetable_data, args.model, args.workers, args.race, args.objective,
+                                args.stream, profile, corpus, args.explain, previous_timetable)
+        unknown = [s for s in args.stages or [] if s not in engine.stages]
+        if unknown:
+            raise ValueError(f"Unknown stage(s) {unknown}; config.json defines {list(engine.stages)}.")
+        solved = engine.run(timetable_data, args.stages, in_place=True)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        print("Please correct config.json/data.json and try again.", file=sys.stderr)
+        sys.exit(1)
+
+    engine.report()
+    if solved is None:
+        if args.profile:
+            profile.save(args.profile)
+        sys.exit(1)
+    print(f"Solution found for all stages. Saving to {args.output}...")
+    with profile.phase("save"):
+        save_timetable(solved, args.output)
+    if args.deltas:
+        with open(args.deltas, 'w') as f:
+            json.dump({stage: delta_to_json(delta) for stage, delta in engine.deltas.items()}, f, separators=(",", ":"))
+        print(f"Stage deltas written to {args.deltas}.")
+    if args.profile:
+        profile.save(args.profile)
+
+
+if __name__ == "__main__":
+    main()
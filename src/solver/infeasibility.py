@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# infeasibility.py
+"""
+Explains an infeasible timetable with a small set of named rules.
+
+The solver models prune teacher unavailability and "Assigned" classes out
+of the domains, so an infeasible stage only says INFEASIBLE (or "empty
+domain"). ConflictModel builds the same rules on the full domains, and
+guards every rule instance with its own enforcement literal, named after
+the rule:
+
+- cell: a "To Be Assigned" cell holds one core class;
+- frequency: a section gets the missing classes of a core subject;
+- daily uniqueness: a core subject at most once a day in a section;
+- lab frequency / lab pairing / lab daily limit: each group takes each
+  lab once, groups A and B take different labs, at most two lab sessions
+  a day;
+- lab rooms: no more labs in a lab slot than free lab rooms (two each);
+- unavailability: one (teacher, day, slot) entry of the unavailability list;
+- teacher clash / room clash: one teacher or theory room, one hour.
+
+All guards are solved as assumptions. If the model is infeasible,
+SufficientAssumptionsForInfeasibility() names a subset of the rules that
+cannot hold together. With `minimal`, every rule of that subset is then
+dropped in turn and kept only if the rest becomes feasible, which leaves a
+minimal core: removing any one of its rules makes the timetable solvable.
+
+Usage (from the repository root):
+    python3 -m src.solver.infeasibility [--stage 7th | --sections CSE-7 IT-7] [--timetable data/data.json]
+        [--minimal] [--time-limit 30]
+    python3 -m src.solver.engine --explain [minimal]
+"""
+
+import argparse
+import contextlib
+import io
+import sys
+import time
+from ortools.sat.python import cp_model
+
+from src.solver.model_builder import TimetableProblem, load_data
+from src.solver.solver_settings import configure
+
+
+class ConflictModel:
+    """
+    The timetable rules of `problem`'s sections on unpruned domains, one
+    enforcement literal per rule instance. `guards` lists (literal, name).
+    """
+
+    def __init__(self, problem):
+        self.problem = problem
+        self.model = cp_model.CpModel()
+        self.guards = []
+        self.x = {}        # (section, day, slot, subject_idx) -> bool
+        self.y = {}        # (section, day, lab_slot_idx, group, lab_idx) -> bool
+        self.has_lab = {}  # (section, day, lab_slot_idx) -> bool
+        self.build()
+
+    def guard(self, name):
+        """A new enforcement literal for the rule `name`."""
+        lit = self.model.NewBoolVar(name)
+        self.guards.append((lit, name))
+        return lit
+
+    def build(self):
+        p, model = self.problem, self.model
+        # (day, slot) -> {teacher: literals of classes and labs that teacher would give then}
+        teacher_lits = {(d, t): {} for d in p.days for t in p.slots}
+
+        # --- Theory cells: every core subject that has a teacher ---
+        for section in p.sections_to_solve:
+            for (day, slot) in p.tba_slots_by_section[section]:
+                cell = []
+                for subject_index, teacher_id in enumerate(p.section_teacher_id_list_map[section]):
+                    if teacher_id == -1:
+                        continue
+                    lit = model.NewBoolVar(f"x_{section}_{day}_{slot}_{subject_index}")
+                    self.x[section, day, slot, subject_index] = lit
+                    cell.append(lit)
+                    teacher_lits[day, slot].setdefault(p.inv_teacher_name_to_id[teacher_id], []).append(lit)
+                model.AddAtMostOne(cell)
+                model.AddExactlyOne(cell).OnlyEnforceIf(self.guard(f"cell: {section} on {day} at {slot} holds one core class"))
+
+        # --- Labs: every lab slot whose cells are free, every lab that has a teacher ---
+        for section in p.sections_to_solve:
+            for day in p.days:
+                for lab_slot_idx, lab_slot_name in p.inv_lab_slot_id_to_name.items():
+                    if not p.available_lab_slots[section][day][lab_slot_idx]:
+                        continue
+                    has_lab = model.NewBoolVar(f"has_lab_{section}_{day}_{lab_slot_idx}")
+                    self.has_lab[section, day, lab_slot_idx] = has_lab
+                    for group in p.groups:
+                        labs_here = []
+                        for lab_index, teacher_id in enumerate(p.lab_teacher_id_list_map[section]):
+                            if teacher_id == -1:
+                                continue
+                            lit = model.NewBoolVar(f"y_{section}_{day}_{lab_slot_idx}_{group}_{lab_index}")
+                            self.y[section, day, lab_slot_idx, group, lab_index] = lit
+                            labs_here.append(lit)
+                            for slot in p.lab_slot_map[lab_slot_name]:
+                                teacher_lits[day, slot].setdefault(p.inv_teacher_name_to_id[teacher_id], []).append(lit)
+                        # Both groups have a lab (parallel) exactly when has_lab.
+                        model.Add(sum(labs_here) == has_lab)
+
+        # --- Constraint 1: Subject Frequency (Theory) ---
+        for section in p.sections_to_solve:
+            pre_assigned_counts = p.pre_assigned_counts(section)
+            for subject_name, subject_index in p.core_subject_map[section].items():
+                needed = max(0, 3 - pre_assigned_counts[subject_name])
+                lits = [self.x[k] for k in ((section, d, t, subject_index) for (d, t) in p.tba_slots_by_section[section])
+                        if k in self.x]
+                teacher = p.teacher_subject_map[section].get(subject_name, "no teacher")
+                model.Add(sum(lits) == needed).OnlyEnforceIf(
+                    self.guard(f"frequency: {section} needs {needed} more {subject_name} class(es) ({teacher})"))
+
+        # --- Constraint 2: Daily Subject Uniqueness (Theory) ---
+        for section in p.sections_to_solve:
+            for day in p.days:
+                daily_slots = [t for (d, t) in p.tba_slots_by_section[section] if d == day]
+                pre_assigned_subjects_on_day = p.pre_assigned_subjects_on_day(section, day)
+                for subject_name, subject_index in p.core_subject_map[section].items():
+                    lits = [self.x[k] for k in ((section, day, t, subject_index) for t in daily_slots) if k in self.x]
+                    if subject_name in pre_assigned_subjects_on_day and lits:
+                        model.Add(sum(lits) == 0).OnlyEnforceIf(
+                            self.guard(f"daily uniqueness: {section} already has {subject_name} on {day}"))
+                    elif len(lits) > 1:
+                        model.Add(sum(lits) <= 1).OnlyEnforceIf(
+                            self.guard(f"daily uniqueness: {section} has {subject_name} at most once on {day}"))
+
+        # --- Constraints 3-5: Lab Pairing, Frequency and Daily Limit ---
+        for section in p.sections_to_solve:
+            if p.section_lab_count[section] == 0:
+                continue
+            placed_labs, placed_sessions = p.pre_assigned_labs(section)
+            for group in p.groups:
+                for lab_index, lab_name in p.inv_lab_name_map[section].items():
+                    lits = [lit for (s, _, _, g, l), lit in self.y.items() if s == section and g == group and l == lab_index]
+                    teacher = p.lab_teacher_map[section].get(lab_name, "no teacher")
+                    if (group, lab_index) in placed_labs:
+                        if lits:
+                            model.Add(sum(lits) == 0).OnlyEnforceIf(
+                                self.guard(f"lab frequency: {section} group {group} already has {lab_name}"))
+                    else:
+                        model.Add(sum(lits) == 1).OnlyEnforceIf(
+                            self.guard(f"lab frequency: {section} group {group} takes {lab_name} once ({teacher})"))
+            pairing = self.guard(f"lab pairing: groups of {section} take different labs in the same lab slot")
+            for day in p.days:
+                daily = [has_lab for (s, d, _), has_lab in self.has_lab.items() if s == section and d == day]
+                if len(daily) > 2 - placed_sessions[day]:
+                    model.Add(sum(daily) <= 2 - placed_sessions[day]).OnlyEnforceIf(
+                        self.guard(f"lab daily limit: {section} has at most {2 - placed_sessions[day]} lab session(s) on {day}"))
+                for lab_slot_idx in p.inv_lab_slot_id_to_name:
+                    for lab_index in range(p.section_lab_count[section]):
+                        pair = [self.y[k] for k in ((section, day, lab_slot_idx, g, lab_index) for g in p.groups) if k in self.y]
+                        if len(pair) > 1:
+                            model.Add(sum(pair) <= 1).OnlyEnforceIf(pairing)
+
+        # --- Lab rooms: two free rooms per scheduled lab ---
+        scheduled_labs = {}
+        for (section, day, lab_slot_idx), has_lab in self.has_lab.items():
+            scheduled_labs.setdefault((day, lab_slot_idx), []).append(has_lab)
+        for (day, lab_slot_idx), scheduled in scheduled_labs.items():
+            free_rooms = len(p.lab_room_domains[day, lab_slot_idx])
+            if 2 * len(scheduled) > free_rooms:
+                model.Add(2 * sum(scheduled) <= free_rooms).OnlyEnforceIf(self.guard(
+                    f"lab rooms: {free_rooms} of {len(p.real_lab_room_ids)} lab rooms free on {day} at "
+                    f"{p.inv_lab_slot_id_to_name[lab_slot_idx]}"))
+
+        # --- Constraint 0: Teacher Unavailability, one guard per listed hour ---
+        for teacher_name, blocked_days in p.teacher_unavailability.items():
+            for day, slots in blocked_days.items():
+                for slot in slots:
+                    lits = teacher_lits.get((day, slot), {}).get(teacher_name, [])
+                    if lits:
+                        model.Add(sum(lits) == 0).OnlyEnforceIf(
+                            self.guard(f"unavailability: {teacher_name} is unavailable on {day} at {slot}"))
+
+        # --- Constraint 6: Resource Clashes, one guard per teacher/room and hour ---
+        for (day, slot), by_teacher in teacher_lits.items():
+            for teacher_name, lits in by_teacher.items():
+                busy = bool(p.teacher_busy.get(teacher_name, 0) & p.slot_bit[day, slot])
+                if len(lits) > 1 or busy:
+                    reason = " (already teaches an \"Assigned\" class)" if busy else ""
+                    model.Add(sum(lits) <= 1 - busy).OnlyEnforceIf(
+                        self.guard(f"teacher clash: {teacher_name} teaches once on {day} at {slot}{reason}"))
+        for (day, slot), sections in p.tba_sections_by_slot.items():
+            by_room = {}
+            for section in sections:
+                by_room.setdefault(p.config_data['section_theory_rooms'][section], []).append(section)
+            for room, room_sections in by_room.items():
+                busy = bool(p.theory_room_busy.get(room, 0) & p.slot_bit[day, slot])
+                if len(room_sections) > 1 or busy:
+                    lits = [lit for (s, d, t, _), lit in self.x.items() if d == day and t == slot and s in room_sections]
+                    reason = " (already holds an \"Assigned\" class)" if busy else ""
+                    model.Add(sum(lits) <= 1 - busy).OnlyEnforceIf(
+                        self.guard(f"room clash: {room} is used once on {day} at {slot}{reason}"))
+
+
+def solve_with_guards(model, guards, time_limit, num_workers=1):
+    """Solves `model` assuming every literal of `guards`. Returns (status, names of a sufficient infeasible subset)."""
+    model.ClearAssumptions()
+    model.AddAssumptions([lit for lit, _ in guards])
+    solver = cp_model.CpSolver()
+    configure(solver, {"max_time_in_seconds": time_limit, "num_workers": num_workers})
+    status = solver.Solve(model)
+    if status != cp_model.INFEASIBLE:
+        return status, []
+    core = set(solver.SufficientAssumptionsForInfeasibility())
+    return status, [(lit, name) for lit, name in guards if lit.Index() in core]
+
+
+def explain_infeasibility(problem, minimal=False, time_limit=30):
+    """
+    Rules of `problem` that cannot hold together, as a list of names; [] if
+    the rules are satisfiable (or no answer came within `time_limit` seconds
+    per solve). With `minimal`, shrinks the set to a minimal core. Returns
+    (names, is_minimal).
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        conflicts = ConflictModel(problem)
+    status, core = solve_with_guards(conflicts.model, conflicts.guards, time_limit)
+    if status != cp_model.INFEASIBLE:
+        return [], False
+    if not minimal:
+        return [name for _, name in core], len(core) == 1
+
+    # Deletion filter: drop each rule in turn and keep it only if the rest become satisfiable.
+    proven = True
+    i = 0
+    while i < len(core):
+        status, smaller = solve_with_guards(conflicts.model, core[:i] + core[i + 1:], time_limit)
+        if status == cp_model.INFEASIBLE:
+            core = smaller
+            i = min(i, len(core))
+        else:
+            proven = proven and status in (cp_model.OPTIMAL, cp_model.FEASIBLE)
+            i += 1
+    return [name for _, name in core], proven
+
+
+def report_conflicts(problem, minimal=False, time_limit=30):
+    """Prints the rules that make `problem` infeasible. Returns their names."""
+    for message in problem.constant_clashes:
+        print(f"  -> Clash between \"Assigned\" classes: {message}")
+    print(f"\nSearching for the {'minimal ' if minimal else ''}set of conflicting rules...")
+    start = time.perf_counter()
+    names, is_minimal = explain_infeasibility(problem, minimal, time_limit)
+    elapsed = time.perf_counter() - start
+    if not names:
+        print(f"No conflicting rules found in {elapsed:.2f}s; the rules can be met together"
+              + (" apart from the clashes above." if problem.constant_clashes else "."))
+        return names
+    kind = "minimal" if is_minimal else "sufficient, not necessarily minimal"
+    print(f"{len(names)} rule(s) cannot hold together ({kind}; found in {elapsed:.2f}s):")
+    for name in names:
+        print(f"  -> {name}")
+    return names
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Name the rules that make the timetable infeasible.")
+    parser.add_argument("--stage", help="explain one stage of config.json[\"stage_sections\"] (default: all sections)")
+    parser.add_argument("--sections", nargs="+", help="explain these sections (default: all sections)")
+    parser.add_argument("--timetable", default='data/data.json',
+                        help="timetable to complete (default: data/data.json; use outputs/updated_timetable.json for later stages)")
+    parser.add_argument("--minimal", action="store_true", help="shrink the conflicting set to a minimal core")
+    parser.add_argument("--time-limit", type=float, default=30, help="time limit per solve (default: 30)")
+    args = parser.parse_args()
+
+    config_data, timetable_data = load_data('data/config.json', args.timetable)
+    sections = args.sections or config_data['sections']
+    if args.stage:
+        if args.stage not in config_data.get('stage_sections', {}):
+            print(f"FATAL ERROR: unknown stage {args.stage}.", file=sys.stderr)
+            sys.exit(1)
+        sections = config_data['stage_sections'][args.stage]
+    problem = TimetableProblem(config_data, timetable_data, sections)
+    names = report_conflicts(problem, args.minimal, args.time_limit)
+    if names or problem.constant_clashes:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+#!/usr/bin/env python
+# instance_generator.py
+"""
+Generates synthetic config.json / data.json pairs of any size.
+
+An instance has N sections, M teachers and K lab rooms on the days, slots
+and lab slots of data/config.json. Every section gets:
+- its own theory room and `core` core subjects, each needing 3 classes a
+  week, so exactly 3 * core "To Be Assigned" cells (at most `core` a day);
+- `labs` labs ("<subject> Lab", taught by the subject's teacher), with
+  labs + 2 lab slots kept "Free" so the groups have room to choose;
+- "Assigned" classes of extra subjects on about `assigned` of its cells,
+  by teachers who are free then;
+- everything else "Free".
+Core subjects are dealt to the teachers round-robin. Each teacher is then
+unavailable on about `unavailable` of the week's slots, away from their
+"Assigned" classes and the lab slots kept for their labs; the list goes to
+config.json["teacher_unavailability"].
+Sections are grouped into stages of `stage_size` for the engine.
+
+The same arguments and seed always give the same instance. The instance is
+valid (every rule can be checked), but not always feasible: too few
+teachers, lab rooms or available slots make it infeasible, which is what
+scale_benchmark.py measures.
+
+Usage (from the repository root):
+    python3 -m src.solver.instance_generator --sections 14 --teachers 60 --lab-rooms 14 [--assigned 0.1]
+        [--unavailable 0.05] [--seed 0] [--out-dir data/generated]
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+
+from src.solver.model_builder import load_data, parse_slot
+
+WEEKLY_CLASSES = 3   # classes a week of every core subject
+SPARE_LAB_SLOTS = 2  # "Free" lab slots per section beyond its labs
+
+
+def lab_slot_cells(settings):
+    """{lab slot name: (theory slots it covers)}, as in TimetableIndex."""
+    slot_times = {slot: parse_slot(slot) for slot in settings['all_slots']}
+    covered = {}
+    for name in settings['lab_slot']:
+        start, end = parse_slot(name)
+        covered[name] = tuple(s for s in settings['all_slots'] if start <= slot_times[s][0] and slot_times[s][1] <= end)
+    return covered
+
+
+def generate_instance(settings, num_sections, num_teachers, num_lab_rooms, assigned=0.1, unavailable=0.05, seed=0,
+                      core=4, labs=3, stage_size=3):
+    """
+    Returns (config, timetable) for a synthetic instance on `settings`
+    (config.json["settings"]). Raises ValueError if the cells of a section
+    cannot hold its classes and lab slots.
+    """
+    rng = random.Random(seed)
+    days, slots = settings['days'], settings['all_slots']
+    lab_slots = lab_slot_cells(settings)
+    cells_per_section = len(days) * len(slots)
+    tba_cells, lab_cells = WEEKLY_CLASSES * core, 2 * (labs + SPARE_LAB_SLOTS)
+    assigned_cells = round(assigned * cells_per_section)
+    if labs > core:
+        raise ValueError(f"{labs} labs need as many core subjects to be taught by, but there are {core}.")
+    if labs + SPARE_LAB_SLOTS > len(days) * len(lab_slots) or tba_cells > core * len(days):
+        raise ValueError(f"A week of {len(days)} days cannot hold {labs} labs or {core} core subjects.")
+    if tba_cells + lab_cells + assigned_cells > cells_per_section:
+        raise ValueError(f"{tba_cells} TBA + {lab_cells} lab + {assigned_cells} assigned cells do not fit in "
+                         f"{cells_per_section} cells per section; lower --assigned.")
+
+    sections = [f"S{i:03d}" for i in range(1, num_sections + 1)]
+    teachers = [f"T{i:03d}" for i in range(1, num_teachers + 1)]
+    subjects = [f"SUB{j}" for j in range(1, core + 1)]
+    config = {
+        "settings": copy.deepcopy(settings),
+        "sections": sections,
+        "stage_sections": {f"stage{k // stage_size + 1}": sections[k:k + stage_size]
+                           for k in range(0, num_sections, stage_size)},
+        "section_theory_rooms": {section: f"R{i:03d}" for i, section in enumerate(sections, 1)},
+        "lab_rooms": [f"LAB{i:02d}" for i in range(1, num_lab_rooms + 1)],
+        "core_subjects": {section: list(subjects) for section in sections},
+        "subjects": {},
+        "labs": {section: [f"{subject} Lab" for subject in subjects[:labs]] for section in sections},
+        "teacher_unavailability": {},
+    }
+
+    # --- Core subjects dealt round-robin over a shuffled teacher list ---
+    dealt = list(teachers)
+    rng.shuffle(dealt)
+    for i, section in enumerate(sections):
+        pairs = [[subject, dealt[(i * core + j) % num_teachers]] for j, subject in enumerate(subjects)]
+        config['subjects'][section] = pairs + [[f"{subject} Lab", teacher] for subject, teacher in pairs[:labs]]
+
+    busy = {teacher: set() for teacher in teachers}  # (day, slot) of each teacher's "Assigned" classes
+    kept = {teacher: set() for teacher in teachers}  # (day, slot) of the lab slots kept for each teacher's labs
+    timetable = {day: [] for day in days}
+    for section in sections:
+        grid = {(day, slot): {"status": "Free"} for day in days for slot in slots}
+        # Lab slots first (at most two a day), then TBA cells (at most `core` a day) outside them.
+        windows = rng.sample([(day, name) for day in days for name in lab_slots], labs + SPARE_LAB_SLOTS)
+        while max(sum(1 for d, _ in windows if d == day) for day in days) > 2:
+            windows = rng.sample([(day, name) for day in days for name in lab_slots], labs + SPARE_LAB_SLOTS)
+        reserved = {(day, slot) for day, name in windows for slot in lab_slots[name]}
+        for _, teacher in config['subjects'][section][core:]:
+            kept[teacher] |= reserved
+        open_cells = [cell for cell in grid if cell not in reserved]
+        rng.shuffle(open_cells)
+        per_day, placed = {day: 0 for day in days}, 0
+        for cell in list(open_cells):
+            if placed == tba_cells:
+                break
+            if per_day[cell[0]] < core:
+                grid[cell] = {"status": "To Be Assigned"}
+                per_day[cell[0]] += 1
+                placed += 1
+                open_cells.remove(cell)
+        if placed < tba_cells:
+            raise ValueError(f"{section}: could not place {tba_cells} TBA cells outside its lab slots.")
+
+        # "Assigned" extra subjects, up to WEEKLY_CLASSES cells each, by a teacher free in all of them.
+        extra = []
+        for cell in open_cells[:assigned_cells]:
+            free_teachers = [t for t in teachers if cell not in busy[t]]
+            if not extra or len(extra[-1][2]) == WEEKLY_CLASSES or cell in busy[extra[-1][1]]:
+                extra.append((f"X{len(extra) + 1}", rng.choice(free_teachers), []))
+            subject, teacher, cells = extra[-1]
+            cells.append(cell)
+            busy[teacher].add(cell)
+            grid[cell] = {"status": "Assigned", "room": config['section_theory_rooms'][section],
+                          "subject": subject, "teacher": teacher}
+        config['subjects'][section] += [[subject, teacher] for subject, teacher, _ in extra]
+
+        for day in days:
+            timetable[day].append({"section": section, **{slot: [grid[day, slot]] for slot in slots}})
+
+    # --- Unavailability, away from each teacher's "Assigned" classes and kept lab slots ---
+    blocked_per_teacher = round(unavailable * cells_per_section)
+    for teacher in teachers:
+        candidates = [(day, slot) for day in days for slot in slots
+                      if (day, slot) not in busy[teacher] and (day, slot) not in kept[teacher]]
+        blocked = {}
+        for day, slot in sorted(rng.sample(candidates, min(blocked_per_teacher, len(candidates))),
+                                key=lambda cell: (days.index(cell[0]), slots.index(cell[1]))):
+            blocked.setdefault(day, []).append(slot)
+        if blocked:
+            config['teacher_unavailability'][teacher] = blocked
+    return config, timetable
+
+
+def capacity_warnings(config, timetable):
+    """Messages about teacher load and lab rooms that make the instance unlikely to be feasible."""
+    settings = config['settings']
+    week = len(settings['days']) * len(settings['all_slots'])
+    load = {}
+    for section in config['sections']:
+        core, labs = set(config['core_subjects'][section]), set(config['labs'][section])
+        for subject, teacher in config['subjects'][section]:
+            # 3 classes a week per core subject, and 2 hours for each group's session of a lab.
+            hours = WEEKLY_CLASSES if subject in core else 4 if subject in labs else 0
+            load[teacher] = load.get(teacher, 0) + hours
+    for section_objs in timetable.values():
+        for section_obj in section_objs:
+            for slot in settings['all_slots']:
+                if section_obj[slot][0]['status'] == "Assigned":
+                    teacher = section_obj[slot][0]['teacher']
+                    load[teacher] = load.get(teacher, 0) + 1
+    messages = []
+    for teacher, hours in sorted(load.items()):
+        blocked = sum(len(s) for s in config['teacher_unavailability'].get(teacher, {}).values())
+        if hours > week - blocked:
+            messages.append(f"{teacher} teaches {hours} hours but is available for {week - blocked}")
+    sessions = sum(len(labs) for labs in config['labs'].values())
+    room_slots = len(settings['days']) * len(settings['lab_slot']) * len(config['lab_rooms'])
+    if 2 * sessions > room_slots:
+        messages.append(f"{sessions} lab sessions need {2 * sessions} lab-room slots, only {room_slots} exist")
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic config.json / data.json pair.")
+    parser.add_argument("--sections", type=int, required=True, help="number of sections")
+    parser.add_argument("--teachers", type=int, required=True, help="number of teachers")
+    parser.add_argument("--lab-rooms", type=int, required=True, help="number of lab rooms")
+    parser.add_argument("--assigned", type=float, default=0.1,
+                        help="fraction of each section's cells pre-assigned to extra subjects (default: 0.1)")
+    parser.add_argument("--unavailable", type=float, default=0.05,
+                        help="fraction of the week each teacher is unavailable (default: 0.05)")
+    parser.add_argument("--core", type=int, default=4, help="core subjects per section (default: 4)")
+    parser.add_argument("--labs", type=int, default=3, help="labs per section (default: 3)")
+    parser.add_argument("--stage-size", type=int, default=3, help="sections per engine stage (default: 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out-dir", default='data/generated', help="writes config.json and data.json here")
+    args = parser.parse_args()
+
+    base_config, _ = load_data('data/config.json', 'data/data.json')
+    try:
+        config, timetable = generate_instance(base_config['settings'], args.sections, args.teachers, args.lab_rooms,
+                                              args.assigned, args.unavailable, args.seed, args.core, args.labs,
+                                              args.stage_size)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        sys.exit(1)
+    for message in capacity_warnings(config, timetable):
+        print(f"Warning: {message}; the instance is probably infeasible.", file=sys.stderr)
+
+    os.makedirs(args.out_dir, exist_ok=True)
+    for name, data in (("config.json", config), ("data.json", timetable)):
+        with open(os.path.join(args.out_dir, name), 'w') as f:
+            json.dump(data, f, indent=2)
+    print(f"Wrote {args.sections} sections, {args.teachers} teachers and {args.lab_rooms} lab rooms to {args.out_dir}/.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1540 @@
+#!/usr/bin/env python
+# model_builder.py
+"""
+Section-agnostic CP-SAT model builder shared by the timetable solvers.
+
+This module builds the model for ANY list of sections: one semester stage
+at a time (engine.py, behind solver_3rd.py, solver_5th.py, solver_7th.py)
+or every section in config.json at once (solver_joint.py).
+
+Everything not in `sections_to_solve` is treated as fixed: its "Assigned"
+cells occupy teachers and rooms exactly like pre-assigned classes.
+"""
+
+import json
+import os
+import sys
+import numpy as np
+from ortools.sat.python import cp_model
+
+from src.solver.solver_settings import RaceResult, run_solver
+from src.solver.timetable import ABSENT, Timetable
+
+# Slot names are "start-end" hours ("9-10", "12-1", "9:30-11"); hours before this one are afternoon.
+FIRST_MORNING_HOUR = 8
+
+TEACHER_UNAVAILABILITY = {
+    "SA": {"Monday": ["11-12", "12-1", "3-4"], "Wednesday": ["9-10"], "Thursday": ["11-12"]},
+    "EO": {"Tuesday": ["10-11", "11-12", "12-1"], "Wednesday": ["12-1"], "Thursday": ["3-4"], "Friday": ["9-10", "10-11"]},
+    "GF7": {"Monday": ["2-3"], "Tuesday": ["12-1"], "Wednesday": ["9-10"], "Thursday": ["3-4", "4-5"]},
+    "SPS": {"Monday": ["9-10"], "Wednesday": ["11-12", "12-1", "4-5"], "Friday": ["10-11"]},
+    "GF8": {"Monday": ["12-1"], "Tuesday": ["11-12", "12-1"], "Wednesday": ["11-12"], "Thursday": ["3-4"]},
+    "SS": {"Tuesday": ["10-11"], "Wednesday": ["11-12"], "Thursday": ["11-12", "12-1"], "Friday": ["3-4"]},
+    "GF9": {"Monday": ["3-4"], "Tuesday": ["11-12", "3-4", "4-5"], "Wednesday": ["3-4"]},
+    "GF10": {"Monday": ["3-4", "4-5"], "Tuesday": ["9-10"], "Thursday": ["10-11"], "Friday": ["12-1"]},
+    "AS": {"Monday": ["3-4", "4-5"]},
+    "SP": {"Tuesday": ["3-4", "4-5"]},
+    "KN": {"Thursday": ["3-4", "4-5"]},
+}
+
+
+def teacher_unavailability(config_data):
+    """config.json["teacher_unavailability"] ({teacher: {day: [slots]}}) if given, else TEACHER_UNAVAILABILITY."""
+    return config_data.get('teacher_unavailability', TEACHER_UNAVAILABILITY)
+
+
+def load_data(config_path, data_path):
+    """Loads config and timetable data from JSON files."""
+    try:
+        with open(config_path, 'r') as f:
+            config_data = json.load(f)
+        with open(data_path, 'r') as f:
+            timetable_data = json.load(f)
+        return config_data, timetable_data
+    except FileNotFoundError as e:
+        print(f"Error: A required file was not found. {e}", file=sys.stderr)
+        sys.exit(1)
+    except json.JSONDecodeError as e:
+        print(f"Error: Failed to decode JSON. {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def parse_slot(name):
+    """(start, end) of a slot name such as "9-10", "12-1" or "9:30-11", in minutes after midnight."""
+    minutes = []
+    for part in name.split("-"):
+        hour, _, minute = part.strip().partition(":")
+        hour = int(hour)
+        if hour < FIRST_MORNING_HOUR:
+            hour += 12
+        minutes.append(hour * 60 + int(minute or 0))
+    return minutes[0], minutes[1]
+
+
+def split_names(value):
+    """Splits a "T1 / T2" cell value into its names. Returns [] for empty values."""
+    if not value:
+        return []
+    return [v.strip() for v in str(value).split('/') if v.strip()]
+
+
+class TimetableIndex:
+    """
+    The parts of the pre-processing that do not depend on which sections are
+    solved or on what earlier stages assigned: name→ID maps for teachers,
+    rooms, subjects and labs of EVERY section, slot tables and times, and
+    the section index map. Build it once and pass it to every
+    TimetableProblem of a run (see engine.py).
+    """
+
+    def __init__(self, config_data, timetable_data):
+        timetable = timetable_data if isinstance(timetable_data, Timetable) else Timetable.from_json(
+            timetable_data, config_data['settings']['all_slots'])
+        self.config_data = config_data
+        self.all_sections = config_data['sections']
+        self.days = config_data['settings']['days']
+        self.slots = config_data['settings']['all_slots']
+        self.groups = config_data['settings']['groups']
+        self.lab_slot_name_to_id = {name: i for i, name in enumerate(config_data['settings']['lab_slot'])}
+        self.inv_lab_slot_id_to_name = {i: name for name, i in self.lab_slot_name_to_id.items()}
+
+        # --- Slot times, and the theory slots each lab slot covers (derived from the names) ---
+        self.slot_times = {slot: parse_slot(slot) for slot in self.slots}
+        self.lab_slot_times = {name: parse_slot(name) for name in self.lab_slot_name_to_id}
+        self.lab_slot_map, self.theory_slot_to_lab_slot_map = {}, {}
+        for lab_slot_name, (start, end) in self.lab_slot_times.items():
+            self.lab_slot_map[lab_slot_name] = tuple(s for s in self.slots
+                                                     if start <= self.slot_times[s][0] and self.slot_times[s][1] <= end)
+            for slot in self.lab_slot_map[lab_slot_name]:
+                self.theory_slot_to_lab_slot_map.setdefault(slot, lab_slot_name)
+        spans = sorted(self.lab_slot_times.values())
+        self.lab_slots_disjoint = all(a[1] <= b[0] for a, b in zip(spans, spans[1:]))
+
+        all_teachers, all_theory_rooms = set(), set()
+        all_lab_rooms = set(config_data['lab_rooms'])
+
+        # --- Section positions inside each day's list ---
+        self.section_index_map = {day: {timetable.sections[s]: i for i, s in enumerate(timetable.order[day])}
+                                  for day in self.days}
+
+        # --- Teachers and rooms already in use (one lookup per distinct value) ---
+        assigned = timetable.mask('status', "Assigned")
+        teachers, rooms = timetable.tables['teacher'], timetable.tables['room']
+        for code in np.unique(timetable.codes['teacher'][assigned]).tolist():
+            all_teachers.update(t for t in teachers.names(code) if "TBD" not in t)
+        for code in np.unique(timetable.codes['room'][assigned]).tolist():
+            room = rooms.values[code] if code != ABSENT else None
+            if room and "/" not in str(room) and room not in all_lab_rooms:
+                all_theory_rooms.add(room)
+
+        # --- Theory mappings ---
+        self.teacher_subject_map = {}
+        for section in self.all_sections:
+            self.teacher_subject_map[section] = {s: t for s, t in config_data['subjects'][section]}
+            all_theory_rooms.add(config_data['section_theory_rooms'][section])
+
+        self.core_subject_map, self.inv_core_subject_map = {}, {}
+        for section in self.all_sections:
+            core_subjects = config_data['core_subjects'][section]
+            self.core_subject_map[section] = {s: i for i, s in enumerate(core_subjects)}
+            self.inv_core_subject_map[section] = {i: s for s, i in self.core_subject_map[section].items()}
+            for subject in core_subjects:
+                if subject in self.teacher_subject_map[section]:
+                    all_teachers.add(self.teacher_subject_map[section][subject])
+
+        # --- Lab mappings ---
+        self.lab_teacher_map = {}
+        for section in self.all_sections:
+            self.lab_teacher_map[section] = {}
+            for lab_name in config_data['labs'].get(section, []):
+                teacher_name = self.lab_teacher(section, lab_name)
+                if teacher_name:
+                    self.lab_teacher_map[section][lab_name] = teacher_name
+                    all_teachers.add(teacher_name)
+                else:
+                    print(f"Warning: No teacher could be mapped for lab '{lab_name}' in section {section}", file=sys.stderr)
+
+        self.lab_name_map, self.inv_lab_name_map, self.section_lab_count = {}, {}, {}
+        for section in self.all_sections:
+            labs = config_data['labs'].get(section, [])
+            self.section_lab_count[section] = len(labs)
+            self.lab_name_map[section] = {name: i for i, name in enumerate(labs)}
+            self.inv_lab_name_map[section] = {i: name for name, i in self.lab_name_map[section].items()}
+
+        # --- Final integer mappings (with per-group dummies for AddAllDifferent) ---
+        self.dummy_teacher_id_map, self.dummy_lab_room_id_map = {}, {}
+        for section in self.all_sections:
+            for group in self.groups:
+                self.dummy_teacher_id_map[section, group] = f"DUMMY_TEACHER_{section}_{group}"
+                all_teachers.add(self.dummy_teacher_id_map[section, group])
+                self.dummy_lab_room_id_map[section, group] = f"DUMMY_LAB_ROOM_{section}_{group}"
+                all_lab_rooms.add(self.dummy_lab_room_id_map[section, group])
+
+        self.teacher_name_to_id = {name: i for i, name in enumerate(sorted(all_teachers))}
+        self.inv_teacher_name_to_id = {i: name for name, i in self.teacher_name_to_id.items()}
+        self.theory_room_name_to_id = {name: i for i, name in enumerate(sorted(all_theory_rooms))}
+        self.lab_room_name_to_id = {name: i for i, name in enumerate(sorted(all_lab_rooms))}
+        self.inv_lab_room_id_to_name = {i: name for name, i in self.lab_room_name_to_id.items()}
+        self.real_lab_room_ids = [i for i, name in self.inv_lab_room_id_to_name.items() if not name.startswith("DUMMY")]
+
+        self.section_teacher_id_list_map = {}
+        for section in self.all_sections:
+            core_subjects = config_data['core_subjects'][section]
+            self.section_teacher_id_list_map[section] = [
+                self.teacher_name_to_id.get(self.teacher_subject_map[section].get(s, ''), -1) for s in core_subjects]
+
+        self.lab_teacher_id_list_map = {}
+        for section in self.all_sections:
+            labs = config_data['labs'].get(section, [])
+            self.lab_teacher_id_list_map[section] = [
+                self.teacher_name_to_id.get(self.lab_teacher_map[section].get(ln, ''), -1) for ln in labs]
+
+        # --- One bit per (day, slot); teacher unavailability as bitsets ---
+        self.slot_bit = {(d, t): 1 << (i * len(self.slots) + j)
+                         for i, d in enumerate(self.days) for j, t in enumerate(self.slots)}
+        self.teacher_unavailability = teacher_unavailability(config_data)
+        self.teacher_unavailable_mask = {}
+        for teacher_name, blocked_days in self.teacher_unavailability.items():
+            for day, slots in blocked_days.items():
+                for slot in slots:
+                    if (day, slot) in self.slot_bit:
+                        self.teacher_unavailable_mask[teacher_name] = self.teacher_unavailable_mask.get(teacher_name, 0) | self.slot_bit[day, slot]
+
+    def lab_teacher(self, section, lab_name):
+        """Teacher of a lab: listed under the lab name itself, else under its theory subject."""
+        teachers = self.teacher_subject_map[section]
+        if lab_name in teachers:
+            return teachers[lab_name]
+        return teachers.get(lab_name.split(" ")[0])
+
+
+def occupancy_counts(tt, field, positions, day_rows):
+    """
+    Timetable.occupancy() for a day × section × slot mask whose day axis is
+    `day_rows` of the arrays (the config days); the counts come back in the
+    same day order.
+    """
+    full = np.zeros((len(tt.days),) + positions.shape[1:], dtype=bool)
+    full[day_rows] = positions
+    return {name: per_slot[day_rows] for name, per_slot in tt.occupancy(field, full).items()}
+
+
+class TimetableProblem(TimetableIndex):
+    """
+    Free cells, fixed occupancy and reduced domains for one group of sections
+    on top of a TimetableIndex. Mirrors the pre-processing block at the top
+    of each solver's main(). Pass `index` to reuse the maps of an earlier
+    stage instead of rebuilding them, and `timetable` to reuse arrays that
+    already hold `timetable_data` (apply_solution keeps them in step).
+    """
+
+    def __init__(self, config_data, timetable_data, sections_to_solve, index=None, timetable=None):
+        # The JSON is kept for apply_solution; every lookup below runs on the arrays (timetable.py).
+        self.timetable = timetable if timetable is not None else Timetable.from_json(
+            timetable_data, config_data['settings']['all_slots'])
+        if index is None:
+            TimetableIndex.__init__(self, config_data, self.timetable)
+        else:
+            vars(self).update(vars(index))
+        self.timetable_data = timetable_data
+        self.sections_to_solve = list(sections_to_solve)
+
+        # day × section × slot masks over the config days and slots. The day rows of the arrays follow
+        # the key order of the timetable file, which need not be the config order: `day_rows` maps them.
+        tt, num_slots = self.timetable, len(self.slots)
+        self.day_rows = [tt.day_index[day] for day in self.days]
+        self.assigned = tt.mask('status', "Assigned")[self.day_rows, :, :num_slots]
+        tba = tt.mask('status', "To Be Assigned")[self.day_rows, :, :num_slots]
+        free = tt.mask('status', "Free")[self.day_rows, :, :num_slots]
+
+        self.tba_slots_by_section = {}
+        for section in self.sections_to_solve:
+            day_idx, slot_idx = np.nonzero(tba[:, tt.section_index[section], :])
+            self.tba_slots_by_section[section] = [(self.days[d], self.slots[t])
+                                                  for d, t in zip(day_idx.tolist(), slot_idx.tolist())]
+
+        self.available_lab_slots = {s: {d: {} for d in self.days} for s in self.sections_to_solve}
+        for lab_slot_name, covered in self.lab_slot_map.items():
+            lab_slot_idx = self.lab_slot_name_to_id[lab_slot_name]
+            columns = [tt.slot_index[slot] for slot in covered]
+            for section in self.sections_to_solve:
+                all_free = free[:, tt.section_index[section], columns].all(axis=1).tolist() if columns else [False] * len(self.days)
+                for day, available in zip(self.days, all_free):
+                    self.available_lab_slots[section][day][lab_slot_idx] = available
+
+        # --- Fixed-occupancy index: one bitset per teacher/room, one bit per (day, slot) ---
+        # Built once; domain pruning and clash checks are then a single AND per lookup.
+        # Bit d * len(slots) + t matches slot_bit, so it is the flat index of the day × slot counts.
+        self.teacher_busy, self.theory_room_busy, self.lab_room_busy = {}, {}, {}
+        self.constant_clashes = []
+        room_codes, room_values = tt.codes['room'][self.day_rows, :, :num_slots], tt.tables['room'].values
+        theory_codes = [code for code in np.unique(room_codes[self.assigned]).tolist() if code != ABSENT
+                        and "/" not in str(room_values[code]) and room_values[code] in self.theory_room_name_to_id]
+        lab_codes = [code for code in np.unique(room_codes[self.assigned]).tolist() if code != ABSENT
+                     and room_values[code] and "/" in str(room_values[code])]
+        occupancy = [
+            (self.teacher_busy, self.teacher_name_to_id, 'teacher', self.assigned),
+            (self.theory_room_busy, self.theory_room_name_to_id, 'room', self.assigned & np.isin(room_codes, theory_codes)),
+            (self.lab_room_busy, self.lab_room_name_to_id, 'room', self.assigned & np.isin(room_codes, lab_codes)),
+        ]
+        for index, known, field, positions in occupancy:
+            for name, counts in occupancy_counts(tt, field, positions, self.day_rows).items():
+                if name not in known:
+                    continue
+                index[name] = sum(1 << bit for bit in np.flatnonzero(counts).tolist())
+                for d, t in zip(*np.nonzero(counts > 1)):
+                    self.constant_clashes.append(f"{name} has two \"Assigned\" classes on {self.days[d]} at {self.slots[t]}")
+
+        self.teacher_blocked_mask = dict(self.teacher_busy)
+        for teacher_name, mask in self.teacher_unavailable_mask.items():
+            self.teacher_blocked_mask[teacher_name] = self.teacher_blocked_mask.get(teacher_name, 0) | mask
+
+        # --- TBA cells grouped per (day, slot) ---
+        self.tba_sections_by_slot = {(d, t): [] for d in self.days for t in self.slots}
+        for section in self.sections_to_solve:
+            for (day, slot) in self.tba_slots_by_section[section]:
+                self.tba_sections_by_slot[day, slot].append(section)
+        for (day, slot), sections in self.tba_sections_by_slot.items():
+            rooms = [config_data['section_theory_rooms'][s] for s in sections]
+            for room in sorted(set(r for r in rooms if rooms.count(r) > 1)):
+                self.constant_clashes.append(f"room {room} is needed by {rooms.count(room)} sections on {day} at {slot}")
+
+        # --- Reduced domains: unavailable or already-booked values are never created ---
+        self.theory_domains = {}
+        for section in self.sections_to_solve:
+            for (day, slot) in self.tba_slots_by_section[section]:
+                self.theory_domains[section, day, slot] = self.theory_domain(section, day, slot)
+        self.lab_domains, self.lab_room_domains = {}, {}
+        for day in self.days:
+            for lab_slot_idx in self.inv_lab_slot_id_to_name:
+                self.lab_room_domains[day, lab_slot_idx] = self.lab_room_domain(day, lab_slot_idx)
+                for section in self.sections_to_solve:
+                    self.lab_domains[section, day, lab_slot_idx] = self.lab_domain(section, day, lab_slot_idx)
+
+    def keep_open(self, cells):
+        """
+        Closes every lab slot and TBA cell of the solved sections outside the
+        (section, day) `cells`, so only those cells can change (solver_repair.py).
+        """
+        for section in self.sections_to_solve:
+            for day in self.days:
+                if (section, day) in cells:
+                    continue
+                for lab_slot_idx in self.available_lab_slots[section][day]:
+                    self.available_lab_slots[section][day][lab_slot_idx] = False
+                    self.lab_domains[section, day, lab_slot_idx] = []
+        for (section, day, slot) in self.theory_domains:
+            if (section, day) not in cells:
+                self.theory_domains[section, day, slot] = []
+
+    def slots_mask(self, day, slots):
+        """Bitset of `slots` on `day` in the fixed-occupancy index."""
+        mask = 0
+        for slot in slots:
+            mask |= self.slot_bit[day, slot]
+        return mask
+
+    def teacher_blocked(self, teacher_name, day, slots):
+        """True if the teacher is unavailable, or already teaching an "Assigned" class, in any of `slots` on `day`."""
+        return bool(self.teacher_blocked_mask.get(teacher_name, 0) & self.slots_mask(day, slots))
+
+    def theory_domain(self, section, day, slot):
+        """Core subject indices `section` can take in a TBA slot."""
+        if self.theory_room_busy.get(self.config_data['section_theory_rooms'][section], 0) & self.slot_bit[day, slot]:
+            return []
+        return [i for i, teacher_id in enumerate(self.section_teacher_id_list_map[section])
+                if teacher_id != -1 and not self.teacher_blocked(self.inv_teacher_name_to_id[teacher_id], day, [slot])]
+
+    def lab_domain(self, section, day, lab_slot_idx):
+        """Lab indices `section` can take in a lab slot (empty if the slot is not free)."""
+        if not self.available_lab_slots[section][day][lab_slot_idx]:
+            return []
+        slots = self.lab_slot_map[self.inv_lab_slot_id_to_name[lab_slot_idx]]
+        return [i for i, teacher_id in enumerate(self.lab_teacher_id_list_map[section])
+                if teacher_id != -1 and not self.teacher_blocked(self.inv_teacher_name_to_id[teacher_id], day, slots)]
+
+    def lab_room_domain(self, day, lab_slot_idx):
+        """Real lab room ids not used by an "Assigned" lab during the lab slot."""
+        mask = self.slots_mask(day, self.lab_slot_map[self.inv_lab_slot_id_to_name[lab_slot_idx]])
+        return [r for r in self.real_lab_room_ids if not self.lab_room_busy.get(self.inv_lab_room_id_to_name[r], 0) & mask]
+
+    def teacher_block_reason(self, teacher_id, day, slots):
+        """Why a teacher cannot take `slots` on `day` ("missing", "unavailable", "busy"), or None."""
+        if teacher_id == -1:
+            return "missing"
+        teacher_name, mask = self.inv_teacher_name_to_id[teacher_id], self.slots_mask(day, slots)
+        if self.teacher_unavailable_mask.get(teacher_name, 0) & mask:
+            return "unavailable"
+        if self.teacher_busy.get(teacher_name, 0) & mask:
+            return "busy"
+        return None
+
+    def empty_domains(self):
+        """
+        Free cells and unplaced labs that have no possible value left, as readable
+        messages naming the filter that emptied them: the teachers (unavailable,
+        or busy with an "Assigned" class), the rooms, or the section's own cells.
+        """
+        messages = []
+        for (section, day, slot), domain in self.theory_domains.items():
+            if domain:
+                continue
+            room = self.config_data['section_theory_rooms'][section]
+            if self.theory_room_busy.get(room, 0) & self.slot_bit[day, slot]:
+                messages.append(f"{section} on {day} at {slot}: theory room {room} is taken by an \"Assigned\" class")
+                continue
+            reasons = [f"{self.inv_core_subject_map[section][i]} teacher {self.teacher_block_reason(teacher_id, day, [slot])}"
+                       for i, teacher_id in enumerate(self.section_teacher_id_list_map[section])]
+            messages.append(f"{section} on {day} at {slot}: no core subject teacher can take it ({', '.join(reasons)})")
+        for section in self.sections_to_solve:
+            placed_labs, _ = self.pre_assigned_labs(section)
+            for lab_index, lab_name in self.inv_lab_name_map[section].items():
+                if all((group, lab_index) in placed_labs for group in self.groups):
+                    continue
+                if any(lab_index in self.lab_domains[section, d, ls] and self.lab_room_domains[d, ls]
+                       for d in self.days for ls in self.inv_lab_slot_id_to_name):
+                    continue
+                # Every lab slot was removed by one filter, checked in the order the domains apply them.
+                teacher_id = self.lab_teacher_id_list_map[section][lab_index]
+                removed = {}
+                for d in self.days:
+                    for ls in self.inv_lab_slot_id_to_name:
+                        if not self.available_lab_slots[section][d][ls]:
+                            reason = "not free for the section"
+                        elif lab_index not in self.lab_domains[section, d, ls]:
+                            slots = self.lab_slot_map[self.inv_lab_slot_id_to_name[ls]]
+                            reason = f"teacher {self.teacher_block_reason(teacher_id, d, slots)}"
+                        else:
+                            reason = "no lab room free"
+                        removed[reason] = removed.get(reason, 0) + 1
+                teacher = self.lab_teacher_map[section].get(lab_name, "no teacher")
+                summary = ", ".join(f"{count} {reason}" for reason, count in removed.items())
+                messages.append(f"{section} {lab_name} ({teacher}): no lab slot left ({summary})")
+        return messages
+
+    def check_domains(self):
+        """Reports every empty domain before a model is built. Raises ValueError if there is one."""
+        messages = self.empty_domains()
+        if messages:
+            for message in messages:
+                print(f"  -> Empty domain: {message}", file=sys.stderr)
+            raise ValueError(f"{len(messages)} free cell(s) or lab(s) have no possible value (see above).")
+
+    def section_obj(self, day, section):
+        """Returns the timetable entry of `section` on `day`."""
+        return self.timetable_data[day][self.section_index_map[day][section]]
+
+    def assigned_subjects(self, section, day=None):
+        """Subjects of the "Assigned" cells of `section` on `day` (default: the whole week); None where missing."""
+        s, values = self.timetable.section_index[section], self.timetable.tables['subject'].values
+        rows = self.day_rows if day is None else [self.timetable.day_index[day]]
+        assigned = self.assigned[:, s, :] if day is None else self.assigned[[self.days.index(day)], s, :]
+        codes = self.timetable.codes['subject'][rows, s, :len(self.slots)][assigned]
+        return [values[code] if code != ABSENT else None for code in codes.tolist()]
+
+    def pre_assigned_counts(self, section):
+        """How many times each core subject of `section` is already "Assigned"."""
+        counts = {subj: 0 for subj in self.core_subject_map[section]}
+        for subject in self.assigned_subjects(section):
+            if subject in counts:
+                counts[subject] += 1
+        return counts
+
+    def pre_assigned_subjects_on_day(self, section, day):
+        """Core subjects of `section` that already have an "Assigned" class on `day`."""
+        return {subject for subject in self.assigned_subjects(section, day) if subject in self.core_subject_map[section]}
+
+    def pre_assigned_labs(self, section):
+        """
+        Labs of `section` already "Assigned" in the timetable (e.g. kept by a
+        repair). Returns ({(group, lab_idx)}, {day: number of lab sessions}).
+        """
+        placed, sessions_per_day = set(), {day: 0 for day in self.days}
+        s, values = self.timetable.section_index[section], self.timetable.tables['subject'].values
+        for d, day in enumerate(self.days):
+            for covered in self.lab_slot_map.values():
+                t = self.timetable.slot_index[covered[0]] if covered else None
+                if t is None or not self.assigned[d, s, t]:
+                    continue
+                code = int(self.timetable.codes['subject'][self.day_rows[d], s, t])
+                subject = str(values[code]) if code != ABSENT else ""
+                if not subject.endswith(" (G-B)") or " (G-A) / " not in subject:
+                    continue
+                sessions_per_day[day] += 1
+                for group, lab_name in zip(self.groups, subject[:-len(" (G-B)")].split(" (G-A) / ")):
+                    if lab_name in self.lab_name_map[section]:
+                        placed.add((group, self.lab_name_map[section][lab_name]))
+        return placed, sessions_per_day
+
+
+class IntegerModel:
+    """
+    The integer-variable model used by the per-semester solvers:
+    one subject var per TBA slot, one subject/room var per group and lab slot.
+    With `room_matching`, no room vars are created; only the number of labs
+    per lab slot is limited, and rooms are assigned afterwards (room_matching.py).
+    """
+
+    def __init__(self, problem, room_matching=False, symmetry_breaking=False):
+        self.problem = problem
+        self.room_matching = room_matching
+        self.symmetry_breaking = symmetry_breaking
+        self.model = cp_model.CpModel()
+        self.new_classes = {}
+        self.lab_group_A_subject, self.lab_group_A_room = {}, {}
+        self.lab_group_B_subject, self.lab_group_B_room = {}, {}
+        self.lab_scheduled = {}  # (section, day, lab_slot_idx) -> bool, true when both groups have a lab
+        self.open_lab_slots = []  # (section, day, lab_slot_idx) whose domain has real labs and rooms
+        self.extract_plan = None  # variable order and indices for extract(), built on first use
+        self.families = []  # (family, variables, constraints) at each mark_family()
+        self.build()
+
+    def build(self):
+        p, model = self.problem, self.model
+        p.check_domains()
+
+        # --- Variables ---
+        # Constraint 0 (teacher unavailability) and fixed occupancy live in the domains.
+        mark_family(self, "variables")
+        for section in p.sections_to_solve:
+            for (day, slot) in p.tba_slots_by_section[section]:
+                self.new_classes[section, day, slot] = model.NewIntVarFromDomain(
+                    cp_model.Domain.FromValues(p.theory_domains[section, day, slot]), f"theory_{section}_{day}_{slot}")
+
+        for section in p.sections_to_solve:
+            dummy_room_A_id = p.lab_room_name_to_id[p.dummy_lab_room_id_map[section, "A"]]
+            dummy_room_B_id = p.lab_room_name_to_id[p.dummy_lab_room_id_map[section, "B"]]
+            no_lab = p.section_lab_count[section]
+            for day in p.days:
+                for lab_slot_idx in p.lab_slot_name_to_id.values():
+                    key = (section, day, lab_slot_idx)
+                    subject_domain = [no_lab]
+                    room_A_domain, room_B_domain = [dummy_room_A_id], [dummy_room_B_id]
+                    if p.lab_domains[key] and p.lab_room_domains[day, lab_slot_idx]:
+                        self.open_lab_slots.append(key)
+                        subject_domain.extend(p.lab_domains[key])
+                        room_A_domain.extend(p.lab_room_domains[day, lab_slot_idx])
+                        room_B_domain.extend(p.lab_room_domains[day, lab_slot_idx])
+                    self.lab_group_A_subject[key] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(subject_domain), f"lab_A_subj_{section}_{day}_{lab_slot_idx}")
+                    self.lab_group_B_subject[key] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(subject_domain), f"lab_B_subj_{section}_{day}_{lab_slot_idx}")
+                    if self.room_matching: continue
+                    self.lab_group_A_room[key] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(room_A_domain), f"lab_A_room_{section}_{day}_{lab_slot_idx}")
+                    self.lab_group_B_room[key] = model.NewIntVarFromDomain(cp_model.Domain.FromValues(room_B_domain), f"lab_B_room_{section}_{day}_{lab_slot_idx}")
+
+        # --- Constraint 1: Subject Frequency (Theory) ---
+        print("Adding subject frequency constraints (Theory)...")
+        mark_family(self, "theory frequency")
+        for section in p.sections_to_solve:
+            section_vars = [self.new_classes[section, d, t] for (d, t) in p.tba_slots_by_section[section]]
+            pre_assigned_counts = p.pre_assigned_counts(section)
+            total_needed = sum(max(0, 3 - count) for count in pre_assigned_counts.values())
+            if len(section_vars) != total_needed:
+                raise ValueError(
+                    f"Section {section} has {len(section_vars)} 'To Be Assigned' slots, but needs {total_needed} "
+                    f"to satisfy the '3-per-week' rule (pre-assigned counts: {pre_assigned_counts}).")
+
+            for subject_name, subject_index in p.core_subject_map[section].items():
+                needed_count = max(0, 3 - pre_assigned_counts[subject_name])
+                if needed_count > 0:
+                    bool_list = [model.NewBoolVar(f"sec_{section}_subj_{subject_index}_var_{i}") for i in range(len(section_vars))]
+                    for i, var in enumerate(section_vars):
+                        model.Add(var == subject_index).OnlyEnforceIf(bool_list[i])
+                        model.Add(var != subject_index).OnlyEnforceIf(bool_list[i].Not())
+                    model.Add(sum(bool_list) == needed_count)
+                else:
+                    for var in section_vars:
+                        model.Add(var != subject_index)
+
+        # --- Constraint 2: Daily Subject Uniqueness (Theory) ---
+        print("Adding daily subject uniqueness constraints (Theory)...")
+        mark_family(self, "daily uniqueness")
+        for section in p.sections_to_solve:
+            for day in p.days:
+                daily_vars = [self.new_classes[section, day, t] for (d, t) in p.tba_slots_by_section[section] if d == day]
+                if not daily_vars:
+                    continue
+                pre_assigned_subjects_on_day = p.pre_assigned_subjects_on_day(section, day)
+                for subject_name, subject_index in p.core_subject_map[section].items():
+                    bool_list = [model.NewBoolVar(f"day_{day}_sec_{section}_subj_{subject_index}_var_{i}") for i in range(len(daily_vars))]
+                    for i, var in enumerate(daily_vars):
+                        model.Add(var == subject_index).OnlyEnforceIf(bool_list[i])
+                        model.Add(var != subject_index).OnlyEnforceIf(bool_list[i].Not())
+                    if subject_name in pre_assigned_subjects_on_day:
+                        model.Add(sum(bool_list) == 0)
+                    else:
+                        model.Add(sum(bool_list) <= 1)
+
+        # --- Constraints 3-5: Lab Parallelism, Frequency and Daily Limit ---
+        print("Adding lab parallelism and frequency constraints...")
+        mark_family(self, "labs")
+        for section in p.sections_to_solve:
+            no_lab = p.section_lab_count[section]
+            if no_lab == 0: continue
+            dummy_room_A_id = p.lab_room_name_to_id[p.dummy_lab_room_id_map[section, "A"]]
+            dummy_room_B_id = p.lab_room_name_to_id[p.dummy_lab_room_id_map[section, "B"]]
+            placed_labs, placed_sessions = p.pre_assigned_labs(section)
+            for group, subject_vars in (("A", self.lab_group_A_subject), ("B", self.lab_group_B_subject)):
+                weekly_vars = [subject_vars[section, d, s] for d in p.days for s in p.lab_slot_name_to_id.values()]
+                for lab_idx in range(no_lab):
+                    bool_list = [model.NewBoolVar(f"b_freq_{group}_{section}_lab{lab_idx}_var{i}") for i in range(len(weekly_vars))]
+                    for i, var in enumerate(weekly_vars):
+                        model.Add(var == lab_idx).OnlyEnforceIf(bool_list[i])
+                        model.Add(var != lab_idx).OnlyEnforceIf(bool_list[i].Not())
+                    model.Add(sum(bool_list) == (0 if (group, lab_idx) in placed_labs else 1))
+                for day in p.days:
+                    daily_vars = [subject_vars[section, day, s] for s in p.lab_slot_name_to_id.values()]
+                    bool_list = [model.NewBoolVar(f"b_daily_{group}_{section}_{day}_var{i}") for i in range(len(daily_vars))]
+                    for i, var in enumerate(daily_vars):
+                        model.Add(var != no_lab).OnlyEnforceIf(bool_list[i])
+                        model.Add(var == no_lab).OnlyEnforceIf(bool_list[i].Not())
+                    model.Add(sum(bool_list) <= 2 - placed_sessions[day])
+
+            for day in p.days:
+                for lab_slot_idx in p.lab_slot_name_to_id.values():
+                    key = (section, day, lab_slot_idx)
+                    gA_subj, gB_subj = self.lab_group_A_subject[key], self.lab_group_B_subject[key]
+                    b_A, b_B = model.NewBoolVar(f"b_A_has_lab_{section}_{day}_{lab_slot_idx}"), model.NewBoolVar(f"b_B_has_lab_{section}_{day}_{lab_slot_idx}")
+                    model.Add(gA_subj != no_lab).OnlyEnforceIf(b_A)
+                    model.Add(gA_subj == no_lab).OnlyEnforceIf(b_A.Not())
+                    model.Add(gB_subj != no_lab).OnlyEnforceIf(b_B)
+                    model.Add(gB_subj == no_lab).OnlyEnforceIf(b_B.Not())
+                    model.Add(b_A == b_B)
+                    model.Add(gA_subj != gB_subj).OnlyEnforceIf(b_A)
+                    self.lab_scheduled[key] = b_A
+                    if self.room_matching: continue
+                    gA_room, gB_room = self.lab_group_A_room[key], self.lab_group_B_room[key]
+                    model.Add(gA_room != gB_room).OnlyEnforceIf(b_A)
+                    model.Add(gA_room != dummy_room_A_id).OnlyEnforceIf(b_A)
+                    model.Add(gA_room == dummy_room_A_id).OnlyEnforceIf(b_A.Not())
+                    model.Add(gB_room != dummy_room_B_id).OnlyEnforceIf(b_B)
+                    model.Add(gB_room == dummy_room_B_id).OnlyEnforceIf(b_B.Not())
+
+        # --- Constraint 6: Resource Uniqueness (Combined Theory + Lab) ---
+        # "Assigned" classes are already outside the domains, so only this model's variables meet here.
+        print("Adding combined resource uniqueness constraints...")
+        mark_family(self, "resource clashes")
+        for message in p.constant_clashes:
+            print(f"  -> Clash: {message}", file=sys.stderr)
+            model.AddBoolOr([])
+
+        lab_teacher_vars, lab_room_vars = {}, {}  # (day, lab_slot_idx) -> vars of every open lab slot
+        scheduled_labs = {}
+        for key in self.open_lab_slots:
+            section, day, lab_slot_idx = key
+            scheduled_labs.setdefault((day, lab_slot_idx), []).append(self.lab_scheduled[key])
+            for group, subject_vars, room_vars in (("A", self.lab_group_A_subject, self.lab_group_A_room),
+                                                   ("B", self.lab_group_B_subject, self.lab_group_B_room)):
+                dummy_id = p.teacher_name_to_id[p.dummy_teacher_id_map[section, group]]
+                teacher_opts = p.lab_teacher_id_list_map[section] + [dummy_id]
+                lab_teacher = model.NewIntVarFromDomain(
+                    cp_model.Domain.FromValues([teacher_opts[i] for i in p.lab_domains[key]] + [dummy_id]),
+                    f"lab_{group}_teach_{section}_{day}_{lab_slot_idx}")
+                model.AddElement(subject_vars[key], teacher_opts, lab_teacher)
+                lab_teacher_vars.setdefault((day, lab_slot_idx), []).append(lab_teacher)
+                if not self.room_matching:
+                    lab_room_vars.setdefault((day, lab_slot_idx), []).append(room_vars[key])
+        for room_vars in lab_room_vars.values():
+            if len(room_vars) > 1: model.AddAllDifferent(room_vars)
+        if self.room_matching:
+            # Phase 1 of the two-phase lab model: two rooms per scheduled lab, no more than are free.
+            for (day, lab_slot_idx), scheduled in scheduled_labs.items():
+                model.Add(2 * sum(scheduled) <= len(p.lab_room_domains[day, lab_slot_idx]))
+
+        for day in p.days:
+            for slot in p.slots:
+                teacher_vars = []
+                for section in p.tba_sections_by_slot[day, slot]:
+                    var = self.new_classes[section, day, slot]
+                    teacher_opts = p.section_teacher_id_list_map[section]
+                    teacher_var = model.NewIntVarFromDomain(
+                        cp_model.Domain.FromValues([teacher_opts[i] for i in p.theory_domains[section, day, slot]]),
+                        f"teacher_{section}_{day}_{slot}")
+                    model.AddElement(var, teacher_opts, teacher_var)
+                    teacher_vars.append(teacher_var)
+                lab_slot_name = p.theory_slot_to_lab_slot_map.get(slot)
+                if lab_slot_name:
+                    teacher_vars.extend(lab_teacher_vars.get((day, p.lab_slot_name_to_id[lab_slot_name]), []))
+                if len(teacher_vars) > 1: model.AddAllDifferent(teacher_vars)
+
+        if self.symmetry_breaking:
+            add_symmetry_breaking(self)
+
+    def lab_room(self, key, group):
+        """Room id expression of `group`'s lab in an open lab slot (meaningful only when it is scheduled)."""
+        return (self.lab_group_A_room if group == "A" else self.lab_group_B_room)[key]
+
+    def takes_subject(self, key, subject_index):
+        """Literal: the TBA cell `key` = (section, day, slot) gets core subject `subject_index` (False if not in its domain)."""
+        if subject_index not in self.problem.theory_domains[key]:
+            return False
+        lit = self.model.NewBoolVar(f"takes_{subject_index}_{'_'.join(map(str, key))}")
+        self.model.Add(self.new_classes[key] == subject_index).OnlyEnforceIf(lit)
+        self.model.Add(self.new_classes[key] != subject_index).OnlyEnforceIf(lit.Not())
+        return lit
+
+    def takes_lab(self, key, group, lab_index):
+        """Literal: `group` has lab `lab_index` in an open lab slot."""
+        var = (self.lab_group_A_subject if group == "A" else self.lab_group_B_subject)[key]
+        lit = self.model.NewBoolVar(f"takes_{group}_{lab_index}_{'_'.join(map(str, key))}")
+        self.model.Add(var == lab_index).OnlyEnforceIf(lit)
+        self.model.Add(var != lab_index).OnlyEnforceIf(lit.Not())
+        return lit
+
+    def extract(self, values):
+        """
+        Reads a solution through `values` (a SolutionValues of the solver) into plain indices:
+        theory {(section, day, slot): subject_idx} and
+        labs {(section, day, lab_slot_idx): (gA_lab_idx, gA_room_id, gB_lab_idx, gB_room_id)}.
+        Room ids are None with `room_matching`.
+        """
+        p = self.problem
+        if self.extract_plan is None:
+            # Variable order: theory, group A subject, group B subject (, group A room, group B room).
+            lab_keys = list(self.lab_group_A_subject)
+            groups = [self.lab_group_A_subject, self.lab_group_B_subject]
+            if not self.room_matching:
+                groups += [self.lab_group_A_room, self.lab_group_B_room]
+            self.extract_plan = (list(self.new_classes), lab_keys, variable_plan(
+                list(self.new_classes.values()) + [group[key] for group in groups for key in lab_keys]))
+        theory_keys, lab_keys, plan = self.extract_plan
+        result = values(*plan).tolist()
+        theory = dict(zip(theory_keys, result))
+        start, num_labs = len(theory_keys), len(lab_keys)
+        columns = [result[start + i * num_labs:start + (i + 1) * num_labs] for i in range(2 if self.room_matching else 4)]
+        if self.room_matching:
+            columns += [[None] * num_labs, [None] * num_labs]
+        labs = {}
+        for key, gA_idx, gB_idx, gA_room, gB_room in zip(lab_keys, *columns):
+            if gA_idx != p.section_lab_count[key[0]]:
+                labs[key] = (gA_idx, gA_room, gB_idx, gB_room)
+        return theory, labs
+
+    def previous_values(self, theory, labs, hinted_sections):
+        """
+        (var, value) pairs for a previous solution (same format as extract()).
+        Lab slots of a hinted section that are not in `labs` read as "no lab".
+        """
+        p = self.problem
+        pairs = [(self.new_classes[key], subject_index) for key, subject_index in theory.items()]
+        for key, gA_subj in self.lab_group_A_subject.items():
+            section = key[0]
+            if section not in hinted_sections:
+                continue
+            if key in labs:
+                gA_idx, gA_room, gB_idx, gB_room = labs[key]
+            else:
+                gA_idx = gB_idx = p.section_lab_count[section]
+                gA_room = p.lab_room_name_to_id[p.dummy_lab_room_id_map[section, "A"]]
+                gB_room = p.lab_room_name_to_id[p.dummy_lab_room_id_map[section, "B"]]
+            pairs.extend([(gA_subj, gA_idx), (self.lab_group_B_subject[key], gB_idx)])
+            if not self.room_matching:
+                pairs.extend([(self.lab_group_A_room[key], gA_room), (self.lab_group_B_room[key], gB_room)])
+        return pairs
+
+    def add_hints(self, theory, labs, hinted_sections):
+        """Hints a previous solution (same format as extract())."""
+        for var, value in self.previous_values(theory, labs, hinted_sections):
+            self.model.AddHint(var, value)
+
+    def change_literals(self, theory, labs, hinted_sections):
+        """One literal per variable, true when it differs from the previous solution."""
+        changes = []
+        for var, value in self.previous_values(theory, labs, hinted_sections):
+            changed = self.model.NewBoolVar(f"changed_{var.Name()}")
+            self.model.Add(var != value).OnlyEnforceIf(changed)
+            self.model.Add(var == value).OnlyEnforceIf(changed.Not())
+            changes.append(changed)
+        return changes
+
+
+class OneHotModel:
+    """
+    Boolean reformulation of IntegerModel: x[section, day, slot, subject] for
+    theory, y[section, day, lab_slot, group, lab] and z[..., group, room] for
+    labs. Frequency, daily uniqueness and clashes become AddExactlyOne /
+    AddAtMostOne over these literals, with no reified (var == value) pairs
+    and no AddElement teacher channelling. `room_matching` drops z as in
+    IntegerModel.
+    """
+
+    def __init__(self, problem, room_matching=False, symmetry_breaking=False):
+        self.problem = problem
+        self.room_matching = room_matching
+        self.symmetry_breaking = symmetry_breaking
+        self.model = cp_model.CpModel()
+        self.x = {}        # (section, day, slot, subject_idx) -> bool
+        self.y = {}        # (section, day, lab_slot_idx, group, lab_idx) -> bool
+        self.z = {}        # (section, day, lab_slot_idx, group, room_id) -> bool
+        self.has_lab = {}  # (section, day, lab_slot_idx) -> bool
+        self.lab_scheduled = self.has_lab  # same name as in IntegerModel
+        self.extract_plan = None
+        self.families = []
+        self.build()
+
+    def build(self):
+        p, model = self.problem, self.model
+        p.check_domains()
+
+        # --- Theory literals (only for values left in the reduced domains) ---
+        print("Creating theory literals...")
+        mark_family(self, "theory literals")
+        for section in p.sections_to_solve:
+            for (day, slot) in p.tba_slots_by_section[section]:
+                cell = []
+                for subject_index in p.theory_domains[section, day, slot]:
+                    self.x[section, day, slot, subject_index] = model.NewBoolVar(f"x_{section}_{day}_{slot}_{subject_index}")
+                    cell.append(self.x[section, day, slot, subject_index])
+                model.AddExactlyOne(cell)
+
+        # --- Lab literals, also grouped per lab, per day and per (day, lab slot) as they are created ---
+        print("Creating lab literals...")
+        mark_family(self, "lab literals")
+        lab_lits, daily_lab_lits = {}, {}        # (section, group, lab_idx) / (section, day) -> literals
+        lab_teacher_lits, lab_room_lits = {}, {}  # (day, lab_slot_idx) -> {teacher or room name: literals}
+        for section in p.sections_to_solve:
+            for day in p.days:
+                for lab_slot_idx in p.inv_lab_slot_id_to_name:
+                    lab_domain, room_domain = p.lab_domains[section, day, lab_slot_idx], p.lab_room_domains[day, lab_slot_idx]
+                    if not lab_domain or not room_domain:
+                        continue
+                    has_lab = model.NewBoolVar(f"has_lab_{section}_{day}_{lab_slot_idx}")
+                    self.has_lab[section, day, lab_slot_idx] = has_lab
+                    daily_lab_lits.setdefault((section, day), []).append(has_lab)
+                    teachers_here = lab_teacher_lits.setdefault((day, lab_slot_idx), {})
+                    rooms_in_use = lab_room_lits.setdefault((day, lab_slot_idx), {})
+                    for group in p.groups:
+                        labs_here = []
+                        for lab_index in lab_domain:
+                            lit = model.NewBoolVar(f"y_{section}_{day}_{lab_slot_idx}_{group}_{lab_index}")
+                            self.y[section, day, lab_slot_idx, group, lab_index] = lit
+                            labs_here.append(lit)
+                            lab_lits.setdefault((section, group, lab_index), []).append(lit)
+                            teacher_name = p.inv_teacher_name_to_id[p.lab_teacher_id_list_map[section][lab_index]]
+                            teachers_here.setdefault(teacher_name, []).append(lit)
+                        model.Add(sum(labs_here) == has_lab)
+                        if self.room_matching: continue
+                        rooms_here = []
+                        for room_id in room_domain:
+                            lit = model.NewBoolVar(f"z_{section}_{day}_{lab_slot_idx}_{group}_{room_id}")
+                            self.z[section, day, lab_slot_idx, group, room_id] = lit
+                            rooms_here.append(lit)
+                            rooms_in_use.setdefault(p.inv_lab_room_id_to_name[room_id], []).append(lit)
+                        # Both groups have a lab (parallel) exactly when has_lab; one lab and one room each.
+                        model.Add(sum(rooms_here) == has_lab)
+
+        self.add_theory_rules()
+        self.add_lab_rules(lab_lits, daily_lab_lits)
+
+        # --- Constraint 6: Resource Clashes ---
+        # "Assigned" classes are already outside the domains, so at most one literal per teacher/room and hour.
+        print("Adding teacher and room clash constraints...")
+        mark_family(self, "resource clashes")
+        for message in p.constant_clashes:
+            print(f"  -> Clash: {message}", file=sys.stderr)
+            model.AddBoolOr([])
+        for lab_room_groups in lab_room_lits.values():
+            for lits in lab_room_groups.values():
+                if len(lits) > 1:
+                    model.AddAtMostOne(lits)
+        if self.room_matching:
+            scheduled_labs = {}
+            for (section, day, lab_slot_idx), has_lab in self.has_lab.items():
+                scheduled_labs.setdefault((day, lab_slot_idx), []).append(has_lab)
+            for (day, lab_slot_idx), scheduled in scheduled_labs.items():
+                model.Add(2 * sum(scheduled) <= len(p.lab_room_domains[day, lab_slot_idx]))
+        for day in p.days:
+            for slot in p.slots:
+                teacher_lits = {}
+                for section in p.tba_sections_by_slot[day, slot]:
+                    for subject_index in p.theory_domains[section, day, slot]:
+                        teacher_id = p.section_teacher_id_list_map[section][subject_index]
+                        teacher_lits.setdefault(p.inv_teacher_name_to_id[teacher_id], []).append(self.x[section, day, slot, subject_index])
+                lab_slot_name = p.theory_slot_to_lab_slot_map.get(slot)
+                if lab_slot_name:
+                    for name, lits in lab_teacher_lits.get((day, p.lab_slot_name_to_id[lab_slot_name]), {}).items():
+                        teacher_lits.setdefault(name, []).extend(lits)
+                for lits in teacher_lits.values():
+                    if len(lits) > 1:
+                        model.AddAtMostOne(lits)
+
+        if self.symmetry_breaking:
+            add_symmetry_breaking(self)
+
+    def lab_room(self, key, group):
+        """Same contract as IntegerModel.lab_room."""
+        room_domain = self.problem.lab_room_domains[key[1], key[2]]
+        return sum(room_id * self.z[key + (group, room_id)] for room_id in room_domain)
+
+    def takes_subject(self, key, subject_index):
+        """Same contract as IntegerModel.takes_subject."""
+        return self.x.get(key + (subject_index,), False)
+
+    def takes_lab(self, key, group, lab_index):
+        """Same contract as IntegerModel.takes_lab."""
+        return self.y.get(key + (group, lab_index), False)
+
+    def add_theory_rules(self):
+        """Constraints 1-2 on the x literals."""
+        p, model = self.problem, self.model
+
+        # --- Constraint 1: Subject Frequency (Theory) ---
+        print("Adding subject frequency constraints (Theory)...")
+        mark_family(self, "theory frequency")
+        for section in p.sections_to_solve:
+            pre_assigned_counts = p.pre_assigned_counts(section)
+            total_needed = sum(max(0, 3 - count) for count in pre_assigned_counts.values())
+            if len(p.tba_slots_by_section[section]) != total_needed:
+                raise ValueError(
+                    f"Section {section} has {len(p.tba_slots_by_section[section])} 'To Be Assigned' slots, but needs "
+                    f"{total_needed} to satisfy the '3-per-week' rule (pre-assigned counts: {pre_assigned_counts}).")
+            for subject_name, subject_index in p.core_subject_map[section].items():
+                lits = [self.x[section, d, t, subject_index] for (d, t) in p.tba_slots_by_section[section]
+                        if (section, d, t, subject_index) in self.x]
+                model.Add(sum(lits) == max(0, 3 - pre_assigned_counts[subject_name]))
+
+        # --- Constraint 2: Daily Subject Uniqueness (Theory) ---
+        print("Adding daily subject uniqueness constraints (Theory)...")
+        mark_family(self, "daily uniqueness")
+        for section in p.sections_to_solve:
+            for day in p.days:
+                daily_slots = [t for (d, t) in p.tba_slots_by_section[section] if d == day]
+                if not daily_slots:
+                    continue
+                pre_assigned_subjects_on_day = p.pre_assigned_subjects_on_day(section, day)
+                for subject_name, subject_index in p.core_subject_map[section].items():
+                    lits = [self.x[section, day, t, subject_index] for t in daily_slots if (section, day, t, subject_index) in self.x]
+                    if subject_name in pre_assigned_subjects_on_day:
+                        for lit in lits:
+                            model.Add(lit == 0)
+                    elif len(lits) > 1:
+                        model.AddAtMostOne(lits)
+
+    def add_lab_rules(self, lab_lits, daily_lab_lits):
+        """Constraints 4-5 on the y and has_lab literals, grouped per (section, group, lab) and (section, day)."""
+        p, model = self.problem, self.model
+
+        # --- Constraints 4-5: Lab Frequency and Daily Limit ---
+        print("Adding lab frequency constraints...")
+        mark_family(self, "labs")
+        for section in p.sections_to_solve:
+            placed_labs, placed_sessions = p.pre_assigned_labs(section)
+            for group in p.groups:
+                for lab_index in range(p.section_lab_count[section]):
+                    lits = lab_lits.get((section, group, lab_index), [])
+                    if (group, lab_index) in placed_labs:
+                        model.Add(sum(lits) == 0)
+                    else:
+                        model.AddExactlyOne(lits)
+            for day in p.days:
+                daily = daily_lab_lits.get((section, day), [])
+                if len(daily) > 2 - placed_sessions[day]:
+                    model.Add(sum(daily) <= 2 - placed_sessions[day])
+                # Groups A and B never take the same lab in the same slot.
+                for lab_slot_idx in p.inv_lab_slot_id_to_name:
+                    for lab_index in range(p.section_lab_count[section]):
+                        pair = [self.y[k] for k in ((section, day, lab_slot_idx, g, lab_index) for g in p.groups) if k in self.y]
+                        if len(pair) > 1:
+                            model.AddAtMostOne(pair)
+
+    def extract(self, values):
+        """Same output as IntegerModel.extract. Only the true literals are turned back into keys."""
+        if self.extract_plan is None:
+            keys = [list(self.x), list(self.y), list(self.z), list(self.has_lab)]
+            self.extract_plan = (keys, variable_plan([lit for lits in (self.x, self.y, self.z, self.has_lab)
+                                                      for lit in lits.values()]))
+        keys, plan = self.extract_plan
+        true_keys, start = [], 0
+        result = values(*plan)
+        for group_keys in keys:
+            true_keys.append([group_keys[i] for i in np.flatnonzero(result[start:start + len(group_keys)]).tolist()])
+            start += len(group_keys)
+        x_keys, y_keys, z_keys, lab_keys = true_keys
+        theory = {(s, d, t): j for (s, d, t, j) in x_keys}
+        chosen_lab = {(s, d, ls, g): l for (s, d, ls, g, l) in y_keys}
+        chosen_room = {(s, d, ls, g): r for (s, d, ls, g, r) in z_keys}
+        labs = {}
+        for key in lab_keys:
+            labs[key] = (chosen_lab[key + ("A",)], chosen_room.get(key + ("A",)),
+                         chosen_lab[key + ("B",)], chosen_room.get(key + ("B",)))
+        return theory, labs
+
+    def previous_values(self, theory, labs, hinted_sections):
+        """Same contract as IntegerModel.previous_values: (literal, bool) for every literal of the given cells."""
+        pairs = [(lit, theory[s, d, t] == j) for (s, d, t, j), lit in self.x.items() if (s, d, t) in theory]
+        pairs.extend((has_lab, key in labs) for key, has_lab in self.has_lab.items() if key[0] in hinted_sections)
+        # labs[key] is (gA_lab, gA_room, gB_lab, gB_room); group A reads positions 0-1, group B 2-3.
+        offset = {"A": 0, "B": 2}
+        for (s, d, ls, g, l), lit in self.y.items():
+            if s in hinted_sections:
+                chosen = labs.get((s, d, ls))
+                pairs.append((lit, chosen is not None and chosen[offset[g]] == l))
+        for (s, d, ls, g, r), lit in self.z.items():
+            if s in hinted_sections:
+                chosen = labs.get((s, d, ls))
+                pairs.append((lit, chosen is not None and chosen[offset[g] + 1] == r))
+        return pairs
+
+    def add_hints(self, theory, labs, hinted_sections):
+        """Same contract as IntegerModel.add_hints: hints every literal of the hinted cells."""
+        for lit, value in self.previous_values(theory, labs, hinted_sections):
+            self.model.AddHint(lit, value)
+
+    def change_literals(self, theory, labs, hinted_sections):
+        """
+        Same contract as IntegerModel.change_literals. Only literals that were
+        true (plus has_lab where there was no lab) count, so a moved subject or
+        room is one change, as in the integer model.
+        """
+        changes = []
+        for lit, value in self.previous_values(theory, labs, hinted_sections):
+            if value:
+                changes.append(lit.Not())
+        changes.extend(has_lab for key, has_lab in self.has_lab.items()
+                       if key[0] in hinted_sections and key not in labs)
+        return changes
+
+
+class IntervalModel(OneHotModel):
+    """
+    Scheduling formulation: every theory class and every lab is an optional
+    interval on a week-long minute axis (day * 1440 + slot start), and
+    clashes are AddNoOverlap per teacher, theory room, lab room and lab
+    group. No dummy teachers or rooms are needed, and labs may have any
+    length (or overlap other lab slots) since their intervals come from
+    the slot names. The x/y/z/has_lab literals are the same as OneHotModel,
+    so extraction, hints and repair are shared. With `room_matching` the
+    lab rooms become one AddCumulative (two rooms per lab) instead of z;
+    rooms are then matched slot by slot, so the lab slots must not overlap.
+    """
+
+    def interval(self, day, times, lit, name):
+        """Optional fixed-size interval for `times` = (start, end) minutes on `day`; mandatory if lit is True."""
+        start, end = times
+        offset = self.problem.days.index(day) * 24 * 60
+        if lit is True:
+            return self.model.NewFixedSizeIntervalVar(offset + start, end - start, name)
+        return self.model.NewOptionalFixedSizeIntervalVar(offset + start, end - start, lit, name)
+
+    def build(self):
+        p, model = self.problem, self.model
+        if self.room_matching and not p.lab_slots_disjoint:
+            raise ValueError("Room matching assigns lab rooms slot by slot, so it needs lab slots that do not overlap; "
+                             "keep lab rooms in the model (--lab-rooms model) for these lab slots.")
+        p.check_domains()
+        teacher_intervals, room_intervals = {}, {}  # teacher / room name -> intervals
+        lab_intervals = {}                          # section -> has_lab intervals
+
+        # --- Theory literals and intervals ---
+        print("Creating theory literals and intervals...")
+        mark_family(self, "theory intervals")
+        for section in p.sections_to_solve:
+            theory_room = p.config_data['section_theory_rooms'][section]
+            for (day, slot) in p.tba_slots_by_section[section]:
+                times, cell = p.slot_times[slot], []
+                for subject_index in p.theory_domains[section, day, slot]:
+                    lit = model.NewBoolVar(f"x_{section}_{day}_{slot}_{subject_index}")
+                    self.x[section, day, slot, subject_index] = lit
+                    cell.append(lit)
+                    teacher_name = p.inv_teacher_name_to_id[p.section_teacher_id_list_map[section][subject_index]]
+                    teacher_intervals.setdefault(teacher_name, []).append(
+                        self.interval(day, times, lit, f"theory_{section}_{day}_{slot}_{subject_index}"))
+                model.AddExactlyOne(cell)
+                room_intervals.setdefault(theory_room, []).append(self.interval(day, times, True, f"room_{section}_{day}_{slot}"))
+
+        # --- Lab literals and intervals ---
+        print("Creating lab literals and intervals...")
+        mark_family(self, "lab intervals")
+        lab_lits, daily_lab_lits = {}, {}  # (section, group, lab_idx) / (section, day) -> literals
+        for section in p.sections_to_solve:
+            for day in p.days:
+                for lab_slot_idx, lab_slot_name in p.inv_lab_slot_id_to_name.items():
+                    lab_domain, room_domain = p.lab_domains[section, day, lab_slot_idx], p.lab_room_domains[day, lab_slot_idx]
+                    if not lab_domain or not room_domain:
+                        continue
+                    times = p.lab_slot_times[lab_slot_name]
+                    has_lab = model.NewBoolVar(f"has_lab_{section}_{day}_{lab_slot_idx}")
+                    self.has_lab[section, day, lab_slot_idx] = has_lab
+                    daily_lab_lits.setdefault((section, day), []).append(has_lab)
+                    lab_intervals.setdefault(section, []).append(
+                        self.interval(day, times, has_lab, f"lab_{section}_{day}_{lab_slot_idx}"))
+                    for group in p.groups:
+                        labs_here = []
+                        for lab_index in lab_domain:
+                            lit = model.NewBoolVar(f"y_{section}_{day}_{lab_slot_idx}_{group}_{lab_index}")
+                            self.y[section, day, lab_slot_idx, group, lab_index] = lit
+                            labs_here.append(lit)
+                            lab_lits.setdefault((section, group, lab_index), []).append(lit)
+                            teacher_name = p.inv_teacher_name_to_id[p.lab_teacher_id_list_map[section][lab_index]]
+                            teacher_intervals.setdefault(teacher_name, []).append(
+                                self.interval(day, times, lit, f"lab_teacher_{section}_{day}_{lab_slot_idx}_{group}_{lab_index}"))
+                        model.Add(sum(labs_here) == has_lab)
+                        if self.room_matching: continue
+                        rooms_here = []
+                        for room_id in room_domain:
+                            lit = model.NewBoolVar(f"z_{section}_{day}_{lab_slot_idx}_{group}_{room_id}")
+                            self.z[section, day, lab_slot_idx, group, room_id] = lit
+                            rooms_here.append(lit)
+                            room_intervals.setdefault(p.inv_lab_room_id_to_name[room_id], []).append(
+                                self.interval(day, times, lit, f"lab_room_{section}_{day}_{lab_slot_idx}_{group}_{room_id}"))
+                        model.Add(sum(rooms_here) == has_lab)
+
+        self.add_theory_rules()
+        self.add_lab_rules(lab_lits, daily_lab_lits)
+
+        # --- Constraint 6: Resource Clashes ---
+        # "Assigned" classes are already outside the domains; only the solved classes need intervals.
+        print("Adding teacher and room no-overlap constraints...")
+        mark_family(self, "resource clashes")
+        for message in p.constant_clashes:
+            print(f"  -> Clash: {message}", file=sys.stderr)
+            model.AddBoolOr([])
+        for intervals in list(teacher_intervals.values()) + list(room_intervals.values()) + list(lab_intervals.values()):
+            if len(intervals) > 1:
+                model.AddNoOverlap(intervals)
+        if self.room_matching and self.has_lab:
+            # Each lab needs two rooms at once; rooms taken by "Assigned" labs are fixed demand.
+            intervals = [self.interval(d, p.lab_slot_times[p.inv_lab_slot_id_to_name[ls]], has_lab, f"lab_rooms_{s}_{d}_{ls}")
+                         for (s, d, ls), has_lab in self.has_lab.items()]
+            demands = [2] * len(intervals)
+            for (day, slot), bit in p.slot_bit.items():
+                busy = sum(1 for r in p.real_lab_room_ids if p.lab_room_busy.get(p.inv_lab_room_id_to_name[r], 0) & bit)
+                if busy:
+                    intervals.append(self.interval(day, p.slot_times[slot], True, f"busy_lab_rooms_{day}_{slot}"))
+                    demands.append(busy)
+            model.AddCumulative(intervals, demands, len(p.real_lab_room_ids))
+
+        if self.symmetry_breaking:
+            add_symmetry_breaking(self)
+
+
+def add_symmetry_breaking(built):
+    """
+    Removes solutions that differ only by a relabelling, using the builder's
+    lab_room/takes_lab accessors:
+    - Groups A and B of a section with no placed labs can swap whole lab
+      schedules, so group A takes its first lab in an earlier lab slot than B.
+    - The free rooms of one lab slot are interchangeable (lab slots must not
+      overlap), so the rooms of its labs increase: group A below group B, and
+      each section below the next one. Skipped with room_matching.
+    Returns the number of constraints added.
+    """
+    p, model = built.problem, built.model
+    mark_family(built, "symmetry breaking")
+    open_slots = [key for key in built.lab_scheduled if p.lab_domains[key] and p.lab_room_domains[key[1:]]]
+    added = 0
+    for section in p.sections_to_solve:
+        placed_labs, _ = p.pre_assigned_labs(section)
+        keys = [key for key in open_slots if key[0] == section]
+        if placed_labs or not keys or p.section_lab_count[section] == 0:
+            continue
+        position = {group: sum(i * built.takes_lab(key, group, 0) for i, key in enumerate(keys)) for group in p.groups}
+        model.Add(position["A"] < position["B"])
+        added += 1
+
+    if built.room_matching or not p.lab_slots_disjoint:
+        return added
+    by_slot = {}
+    for key in open_slots:
+        by_slot.setdefault(key[1:], []).append(key)
+    for keys in by_slot.values():
+        for i, key in enumerate(keys):
+            scheduled = built.lab_scheduled[key]
+            model.Add(built.lab_room(key, "A") < built.lab_room(key, "B")).OnlyEnforceIf(scheduled)
+            for later in keys[i + 1:]:
+                model.Add(built.lab_room(key, "B") < built.lab_room(later, "A")).OnlyEnforceIf(
+                    [scheduled, built.lab_scheduled[later]])
+            added += len(keys) - i
+    return added
+
+
+SOFT_TERMS = ("teacher_gaps", "lab_clustering", "day_overload")
+
+
+def add_soft_objective(built, objective_settings):
+    """
+    Minimizes a weighted sum of soft terms over the builder's takes_subject/
+    takes_lab/lab_scheduled accessors. `objective_settings` is
+    settings.objective in config.json: a weight per term (0 leaves it out)
+    and "max_hours_per_day".
+    - teacher_gaps: idle hours of a teacher between their first and last
+      class of a day ("Assigned" classes count as fixed; days with only
+      "Assigned" classes cannot change and are left out).
+    - lab_clustering: lab sessions of a section beyond the first on a day.
+    - day_overload: hours of a section on a day above max_hours_per_day.
+    Stores {term: linear expression} in built.objective_terms and returns it.
+    """
+    p, model = built.problem, built.model
+    mark_family(built, "soft objective")
+    weights = {term: objective_settings.get(term, 0) for term in SOFT_TERMS}
+    unknown = set(objective_settings) - set(SOFT_TERMS) - {"max_hours_per_day"}
+    if unknown:
+        raise ValueError(f"Unknown terms in settings.objective: {sorted(unknown)} (known: {list(SOFT_TERMS)})")
+    open_slots = [key for key in built.lab_scheduled if p.lab_domains[key] and p.lab_room_domains[key[1:]]]
+    terms = {}
+
+    if weights["teacher_gaps"]:
+        # (teacher, day) -> {slot: literals that put the teacher in a class there}
+        busy = {}
+        for section in p.sections_to_solve:
+            for (day, slot) in p.tba_slots_by_section[section]:
+                for subject_index in p.theory_domains[section, day, slot]:
+                    teacher = p.inv_teacher_name_to_id[p.section_teacher_id_list_map[section][subject_index]]
+                    lit = built.takes_subject((section, day, slot), subject_index)
+                    if lit is not False:
+                        busy.setdefault((teacher, day), {}).setdefault(slot, []).append(lit)
+        for key in open_slots:
+            section, day, lab_slot_idx = key
+            for group in p.groups:
+                for lab_index in p.lab_domains[key]:
+                    lit = built.takes_lab(key, group, lab_index)
+                    if lit is False:
+                        continue
+                    teacher = p.inv_teacher_name_to_id[p.lab_teacher_id_list_map[section][lab_index]]
+                    for slot in p.lab_slot_map[p.inv_lab_slot_id_to_name[lab_slot_idx]]:
+                        busy.setdefault((teacher, day), {}).setdefault(slot, []).append(lit)
+        gaps = []
+        for (teacher, day), literals in busy.items():
+            busy_mask = p.teacher_busy.get(teacher, 0)
+            fixed = [bool(busy_mask & p.slot_bit[day, slot]) for slot in p.slots]
+            hours = [1 if is_fixed else sum(literals.get(slot, [])) for slot, is_fixed in zip(p.slots, fixed)]
+            # before[i] / after[i]: the teacher has a class earlier / later that day.
+            before, after = [0] * len(hours), [0] * len(hours)
+            for i in range(1, len(hours)):
+                before[i] = model.NewBoolVar(f"before_{teacher}_{day}_{i}")
+                model.Add(before[i] >= hours[i - 1])
+                if i > 1: model.Add(before[i] >= before[i - 1])
+            for i in range(len(hours) - 2, -1, -1):
+                after[i] = model.NewBoolVar(f"after_{teacher}_{day}_{i}")
+                model.Add(after[i] >= hours[i + 1])
+                if i < len(hours) - 2: model.Add(after[i] >= after[i + 1])
+            for i in range(1, len(hours) - 1):
+                if fixed[i]:
+                    continue
+                gap = model.NewBoolVar(f"gap_{teacher}_{day}_{i}")
+                model.Add(gap >= before[i] + after[i] - 1 - hours[i])
+                gaps.append(gap)
+        terms["teacher_gaps"] = sum(gaps)
+
+    sessions = {}  # (section, day) -> scheduled literals of its open lab slots
+    for key in open_slots:
+        sessions.setdefault(key[:2], []).append(key)
+
+    if weights["lab_clustering"]:
+        extra = []
+        for section in p.sections_to_solve:
+            _, placed_sessions = p.pre_assigned_labs(section)
+            for day in p.days:
+                keys = sessions.get((section, day), [])
+                if placed_sessions[day] + len(keys) < 2:
+                    continue
+                var = model.NewIntVar(0, placed_sessions[day] + len(keys), f"extra_labs_{section}_{day}")
+                model.Add(var >= placed_sessions[day] + sum(built.lab_scheduled[key] for key in keys) - 1)
+                extra.append(var)
+        terms["lab_clustering"] = sum(extra)
+
+    if weights["day_overload"]:
+        limit = objective_settings.get("max_hours_per_day", len(p.slots))
+        excess = []
+        for section in p.sections_to_solve:
+            s = p.timetable.section_index[section]
+            for d, day in enumerate(p.days):
+                fixed = int(p.assigned[d, s, :].sum()) + sum(1 for (td, _) in p.tba_slots_by_section[section] if td == day)
+                labs = [(built.lab_scheduled[key], len(p.lab_slot_map[p.inv_lab_slot_id_to_name[key[2]]]))
+                        for key in sessions.get((section, day), [])]
+                if fixed + sum(hours for _, hours in labs) <= limit:
+                    continue
+                var = model.NewIntVar(0, len(p.slots), f"overload_{section}_{day}")
+                model.Add(var >= fixed + sum(hours * lit for lit, hours in labs) - limit)
+                excess.append(var)
+        terms["day_overload"] = sum(excess)
+
+    model.Minimize(sum(weights[term] * expr for term, expr in terms.items()))
+    built.objective_terms = terms
+    return terms
+
+
+MODEL_BUILDERS = {"integer": IntegerModel, "onehot": OneHotModel, "interval": IntervalModel}
+
+
+def model_size(built):
+    """(variables, constraints) of a built model."""
+    proto = built.model.Proto()
+    return len(proto.variables), len(proto.constraints)
+
+
+def mark_family(built, family):
+    """
+    Starts a constraint family: the variables and constraints added to
+    built.model from here on are counted under `family` by model_families().
+    """
+    proto = built.model.Proto()
+    built.families.append((family, len(proto.variables), len(proto.constraints)))
+
+
+# CP-SAT constraint kinds, most common first (the proto binding has no WhichOneof).
+CONSTRAINT_KINDS = ("linear", "bool_or", "exactly_one", "at_most_one", "bool_and", "interval", "no_overlap",
+                    "all_diff", "element", "table", "lin_max", "int_prod", "int_div", "int_mod", "bool_xor",
+                    "cumulative", "no_overlap_2d", "circuit", "routes", "reservoir", "inverse", "automaton")
+
+
+def model_families(built):
+    """
+    {family: {"variables", "constraints", "kinds": {kind: count}}} for the
+    mark_family() marks of `built`; anything added before the first mark is
+    under "unmarked". Walks every constraint, so it is only called when profiling.
+    """
+    proto = built.model.Proto()
+    marks = [("unmarked", 0, 0)] + list(built.families) + [(None, len(proto.variables), len(proto.constraints))]
+    families = {}
+    for (family, variables, constraints), (_, next_variables, next_constraints) in zip(marks, marks[1:]):
+        entry = families.setdefault(family, {"variables": 0, "constraints": 0, "kinds": {}})
+        entry["variables"] += next_variables - variables
+        entry["constraints"] += next_constraints - constraints
+        for i in range(constraints, next_constraints):
+            ct = proto.constraints[i]
+            kind = next((kind for kind in CONSTRAINT_KINDS if getattr(ct, "has_" + kind)()), "other")
+            entry["kinds"][kind] = entry["kinds"].get(kind, 0) + 1
+    return {family: entry for family, entry in families.items() if entry["variables"] or entry["constraints"]}
+
+
+def solution_delta(problem, theory, labs):
+    """
+    The cells an extracted solution changes, per section:
+    {section: {(day, slot): cell}}. Cells keep any other keys they had.
+    """
+    p = problem
+    delta = {section: {} for section in p.sections_to_solve}
+
+    for (section, day, slot), subject_index in theory.items():
+        subject_name = p.inv_core_subject_map[section][subject_index]
+        delta[section][day, slot] = {**p.section_obj(day, section)[slot][0],
+                                     "status": "Assigned", "subject": subject_name,
+                                     "teacher": p.teacher_subject_map[section][subject_name],
+                                     "room": p.config_data['section_theory_rooms'][section]}
+
+    for (section, day, lab_slot_idx), (gA_idx, gA_room, gB_idx, gB_room) in labs.items():
+        gA_lab_name = p.inv_lab_name_map[section][gA_idx]
+        gB_lab_name = p.inv_lab_name_map[section][gB_idx]
+        section_obj = p.section_obj(day, section)
+        for slot in p.lab_slot_map[p.inv_lab_slot_id_to_name[lab_slot_idx]]:
+            delta[section][day, slot] = {
+                **section_obj[slot][0], "status": "Assigned",
+                "subject": f"{gA_lab_name} (G-A) / {gB_lab_name} (G-B)",
+                "teacher": f"{p.lab_teacher_map[section][gA_lab_name]} / {p.lab_teacher_map[section][gB_lab_name]}",
+                "room": f"{p.inv_lab_room_id_to_name[gA_room]} / {p.inv_lab_room_id_to_name[gB_room]}"}
+
+    return {section: cells for section, cells in delta.items() if cells}
+
+
+def merge_delta(timetable_data, delta, in_place=False, timetable=None):
+    """
+    Applies a solution delta copy-on-write: only the day lists and section
+    entries it touches are copied, everything else is shared with
+    `timetable_data`. With `in_place` the new day lists are put into
+    `timetable_data` itself; `timetable` (the arrays of `timetable_data`) is
+    updated too when given. Returns the merged timetable.
+    """
+    merged = timetable_data if in_place else dict(timetable_data)
+    by_day = {}
+    for section, cells in delta.items():
+        for (day, slot), cell in cells.items():
+            by_day.setdefault(day, {}).setdefault(section, []).append((slot, cell))
+
+    for day, sections in by_day.items():
+        day_list = list(timetable_data[day])
+        for i, section_obj in enumerate(day_list):
+            if section_obj['section'] not in sections:
+                continue
+            section_obj = day_list[i] = dict(section_obj)
+            for slot, cell in sections[section_obj['section']]:
+                section_obj[slot] = [cell]
+                if timetable is not None:
+                    timetable.set_cell(day, section_obj['section'], slot, section_obj[slot])
+        merged[day] = day_list
+    return merged
+
+
+def apply_solution(problem, theory, labs, in_place=False):
+    """
+    Returns the problem's timetable with the extracted solution written in.
+    Unchanged sections are shared with the problem's timetable, not copied
+    (see merge_delta). With `in_place`, the problem's own timetable (JSON and
+    arrays) is updated and returned instead (for callers that own it, e.g.
+    the pipeline).
+    """
+    return merge_delta(problem.timetable_data, solution_delta(problem, theory, labs), in_place,
+                       problem.timetable if in_place else None)
+
+
+def delta_to_json(delta):
+    """A delta as JSON: {section: [[day, slot, cell], ...]}."""
+    return {section: [[day, slot, cell] for (day, slot), cell in cells.items()] for section, cells in delta.items()}
+
+
+def delta_from_json(data):
+    """Inverse of delta_to_json."""
+    return {section: {(day, slot): cell for day, slot, cell in cells} for section, cells in data.items()}
+
+
+def previous_assignments(problem, previous_timetable):
+    """
+    Inverse of apply_solution: maps a previously saved timetable back to
+    variable indices for the problem's sections. Returns
+    (theory, labs, hinted_sections, kept, total) where `kept` of `total`
+    free cells could be mapped to a valid index.
+    """
+    p = problem
+    theory, labs, hinted_sections = {}, {}, set()
+    kept = total = 0
+
+    for section in p.sections_to_solve:
+        if not all(section in {obj['section'] for obj in previous_timetable.get(day, [])} for day in p.days):
+            continue
+        hinted_sections.add(section)
+        teacher_to_subject = {p.teacher_subject_map[section].get(s): i for s, i in p.core_subject_map[section].items()}
+
+        for day in p.days:
+            prev_obj = next(obj for obj in previous_timetable[day] if obj['section'] == section)
+
+            # Theory: keep the subject if it is still a core subject, else fall back to its teacher.
+            for slot in [t for (d, t) in p.tba_slots_by_section[section] if d == day]:
+                total += 1
+                prev_info = prev_obj.get(slot, [{}])[0]
+                if prev_info.get('status') != "Assigned":
+                    continue
+                subject_index = p.core_subject_map[section].get(prev_info.get('subject'),
+                                                               teacher_to_subject.get(prev_info.get('teacher')))
+                if subject_index is not None:
+                    theory[section, day, slot] = subject_index
+                    kept += 1
+
+            # Labs: parse "X (G-A) / Y (G-B)" and "R1 / R2" from the first hour of each free lab slot.
+            for lab_slot_idx, lab_slot_name in p.inv_lab_slot_id_to_name.items():
+                if not p.available_lab_slots[section][day][lab_slot_idx]:
+                    continue
+                total += 1
+                prev_info = prev_obj.get(p.lab_slot_map[lab_slot_name][0], [{}])[0]
+                subject = str(prev_info.get('subject', ''))
+                if prev_info.get('status') != "Assigned" or "(G-A)" not in subject:
+                    kept += 1  # No lab here last time: hinted as "no lab".
+                    continue
+                # Lab names may contain "/" themselves ("AI/ML Lab"), so split on the group markers.
+                lab_names = subject[:-len(" (G-B)")].split(" (G-A) / ") if subject.endswith(" (G-B)") else []
+                rooms = split_names(prev_info.get('room'))
+                if len(lab_names) != 2 or len(rooms) != 2:
+                    continue
+                indices = [p.lab_name_map[section].get(name) for name in lab_names]
+                room_ids = [p.lab_room_name_to_id.get(room) for room in rooms]
+                if None in indices or any(r not in p.real_lab_room_ids for r in room_ids):
+                    continue
+                labs[section, day, lab_slot_idx] = (indices[0], room_ids[0], indices[1], room_ids[1])
+                kept += 1
+
+    return theory, labs, hinted_sections, kept, total
+
+
+class FirstSolutionTimer(cp_model.CpSolverSolutionCallback):
+    """Records the wall time at which the first solution was found."""
+
+    def __init__(self):
+        super().__init__()
+        self.first_solution_time = None
+
+    def on_solution_callback(self):
+        if self.first_solution_time is None:
+            self.first_solution_time = self.WallTime()
+
+
+class SolutionStreamer(FirstSolutionTimer):
+    """
+    Writes every solution the solver reports (each one improves the
+    objective) to `output_path` as soon as it arrives, so the best timetable
+    so far survives a stop at any time. One JSON line per solution, with the
+    stage, the objective, the bound and the soft terms, is appended to
+    <output_path without .json>.progress.jsonl (emptied first unless `append`).
+    """
+
+    def __init__(self, built, output_path, stage="joint", append=False):
+        super().__init__()
+        self.built = built
+        self.output_path = output_path
+        self.progress_path = os.path.splitext(output_path)[0] + ".progress.jsonl"
+        self.stage = stage
+        self.solutions = 0
+        if not append:
+            with open(self.progress_path, 'w'):
+                pass
+
+    def on_solution_callback(self):
+        super().on_solution_callback()
+        self.solutions += 1
+        p = self.built.problem
+        timetable = merge_delta(p.timetable_data, solution_delta(p, *self.built.extract(SolutionValues(self))))
+        # Write next to the target and rename, so a stop never leaves a half-written file.
+        with open(self.output_path + ".tmp", 'w') as f:
+            json.dump(timetable, f, indent=2)
+        os.replace(self.output_path + ".tmp", self.output_path)
+
+        terms = {term: self.Value(expr) for term, expr in getattr(self.built, 'objective_terms', {}).items()}
+        record = {"stage": self.stage, "solution": self.solutions, "wall_time": round(self.WallTime(), 3),
+                  "objective": self.ObjectiveValue(), "bound": self.BestObjectiveBound(), "terms": terms}
+        with open(self.progress_path, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+        print(f"  -> Solution {self.solutions} after {record['wall_time']:.2f}s: objective {record['objective']:g} "
+              f"(bound {record['bound']:g}) {terms} -> {self.output_path}")
+
+
+def report_objective(built, solver):
+    """Prints the objective, its bound and every soft term of a model built with add_soft_objective."""
+    terms = ", ".join(f"{term} {solver.Value(expr)}" for term, expr in built.objective_terms.items())
+    print(f"Objective {solver.ObjectiveValue():g} (bound {solver.BestObjectiveBound():g}): {terms}")
+
+
+def save_timetable(timetable_data, output_path):
+    """Writes a timetable to `output_path`. Returns False if it could not be written."""
+    try:
+        with open(output_path, 'w') as f:
+            json.dump(timetable_data, f, indent=2)
+        print(f"Successfully saved updated timetable to {output_path}")
+        return True
+    except IOError as e:
+        print(f"Error: Could not write to output file. {e}", file=sys.stderr)
+        return False
+
+
+def variable_plan(variables):
+    """(variables, their indices as a NumPy array) for SolutionValues."""
+    return variables, np.array([var.Index() for var in variables], dtype=np.int64)
+
+
+class SolutionValues:
+    """
+    Batched replacement for solver.Value in extract(): values(variables, indices)
+    returns the values of (non-negated) variables as one NumPy array, read by
+    index from the solver's response (`variables` is there for readers that
+    need the variables themselves). When most of the model is asked for,
+    the whole solution is converted in one pass and gathered with NumPy.
+    """
+
+    def __init__(self, solver):
+        if isinstance(solver, RaceResult):
+            self.solution = solver.solution
+        elif isinstance(solver, cp_model.CpSolverSolutionCallback):
+            self.solution = solver.Response().solution
+        else:
+            self.solution = solver.ResponseProto().solution
+        self.array = None
+
+    def __call__(self, variables, indices):
+        if self.array is None and 2 * len(indices) < len(self.solution):
+            solution = self.solution
+            return np.array([solution[i] for i in indices.tolist()], dtype=np.int64)
+        if self.array is None:
+            self.array = np.fromiter(self.solution, dtype=np.int64, count=len(self.solution))
+        return self.array[indices]
+
+
+def solve(built, config_data, num_workers=None, stage="joint", race_processes=None, solution_callback=None,
+          log_callback=None):
+    """Solves a built model with the settings.solver parameters of `stage`. Returns (solver, status)."""
+    return run_solver(built.model, config_data, stage, num_workers, race_processes, solution_callback, log_callback)
@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# pipeline.py
+"""
+Runs the Python part of generate.sh in one process.
+
+generate.sh used to launch solver_3rd, solver_5th and solver_7th and then
+test_unavailability.py as separate interpreters, each re-reading and
+re-writing outputs/updated_timetable.json. Here the timetable stays in
+memory: the stages are solved one after another by the shared engine (or
+by the joint model with --joint), the unavailability check runs on the
+in-memory result, and the JSON is written once at the end. Every step is
+timed.
+
+Reads from:
+- data/config.json, data/data.json
+
+Writes to:
+- outputs/updated_timetable.json (solved timetable)
+
+Exit status: 0 on success, 1 if no solution was found, 2 if the solved
+timetable breaks a teacher's unavailability.
+
+Usage (from the repository root):
+    python3 -m src.solver.pipeline [--joint] [--model integer|onehot|interval] [--workers N] [--output PATH]
+    python3 -m src.solver.pipeline [--joint] --objective [--stream PATH] [--time-limit SECONDS]
+    python3 -m src.solver.pipeline [--joint] --profile outputs/profile.json
+    python3 -m src.solver.pipeline [--joint] --corpus corpus
+    python3 -m src.solver.pipeline [--joint] --explain [minimal]
+    python3 -m src.solver.pipeline [--joint] --warm-start [PATH]
+"""
+
+import time
+
+IMPORT_START = time.perf_counter()
+
+import argparse
+import sys
+
+from src.diagnostics.test_unavailability import find_violations
+from src.solver.corpus import NO_CORPUS, SolveCorpus
+from src.solver.engine import (OUTPUT_PATH, SemesterEngine, add_corpus_argument, add_explain_argument,
+                               add_objective_arguments, add_warm_start_argument, load_previous_timetable)
+from src.solver.model_builder import MODEL_BUILDERS, load_data, save_timetable
+from src.solver.profiler import NO_PROFILE, RunProfile
+from src.solver.solver_joint import solve_joint
+
+
+def run_pipeline(config_data, timetable_data, joint=False, model_name="integer", num_workers=None,
+                 race_processes=None, output_path=OUTPUT_PATH, objective=False, stream_path=None, profile=NO_PROFILE,
+                 corpus=NO_CORPUS, explain=None, previous_timetable=None):
+    """
+    Solves, checks and saves the timetable, hinted with `previous_timetable`
+    if given. Returns (exit_status, steps) where
+    `steps` is a list of (step name, seconds).
+    """
+    steps = []
+    if joint:
+        start = time.perf_counter()
+        solved = solve_joint(config_data, timetable_data, num_workers, model_name, race_processes, previous_timetable,
+                             objective=objective, stream_path=stream_path, profile=profile, corpus=corpus, explain=explain)
+        steps.append(("joint solve", time.perf_counter() - start))
+    else:
+        start = time.perf_counter()
+        engine = SemesterEngine(config_data, timetable_data, model_name, num_workers, race_processes, objective, stream_path,
+                                profile, corpus, explain, previous_timetable)
+        steps.append(("index", time.perf_counter() - start))
+        for stage in engine.stages:
+            start = time.perf_counter()
+            solved = engine.solve_stage(stage, timetable_data, in_place=True)
+            steps.append((f"stage {stage}", time.perf_counter() - start))
+            if solved is None:
+                break
+        engine.report()
+    if solved is None:
+        if not explain:
+            print("\nTip: Run again with --explain to name the conflicting rules, or "
+                  "'python3 src/diagnostics/conflict_analyzer.py' to diagnose the issue.")
+        return 1, steps
+
+    print("\n🕵️  Checking the solved timetable against unavailability constraints...")
+    start = time.perf_counter()
+    with profile.phase("unavailability check"):
+        violations = find_violations(config_data, solved)
+    steps.append(("unavailability check", time.perf_counter() - start))
+    if violations:
+        print(f"\n❌ FAILED: Found {violations} total violations.")
+    else:
+        print("\n✅ SUCCESS: No unavailability constraint violations found.")
+
+    start = time.perf_counter()
+    with profile.phase("save"):
+        saved = save_timetable(solved, output_path)
+    steps.append(("write JSON", time.perf_counter() - start))
+    if not saved:
+        return 1, steps
+    return (2 if violations else 0), steps
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve, check and save the timetable in one process.")
+    parser.add_argument("--joint", action="store_true",
+                        help="solve every section with one model instead of the 3rd -> 5th -> 7th stages")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer",
+                        help="model formulation: integer subject vars, one-hot booleans or optional intervals (default: integer)")
+    parser.add_argument("--workers", type=int,
+                        help="CP-SAT search workers (default: settings.solver in config.json)")
+    parser.add_argument("--race", type=int, metavar="N",
+                        help="race N solver processes with different seeds (default: settings.solver.race.processes)")
+    parser.add_argument("--output", default=OUTPUT_PATH)
+    add_objective_arguments(parser)
+    parser.add_argument("--profile", metavar="PATH",
+                        help="write per-phase timings, model sizes and solver statistics of this run as JSON")
+    add_corpus_argument(parser)
+    add_explain_argument(parser)
+    add_warm_start_argument(parser)
+    args = parser.parse_args()
+
+    profile = RunProfile() if args.profile else NO_PROFILE
+    start = time.perf_counter()
+    profile.add_phase("imports", start - IMPORT_START)
+    with profile.phase("load JSON"):
+        config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    if args.time_limit is not None:
+        config_data['settings']['solver_timeout_seconds'] = args.time_limit
+    previous_timetable = load_previous_timetable(args.warm_start) if args.warm_start else None
+    steps = [("imports", start - IMPORT_START), ("load JSON", time.perf_counter() - start)]
+    try:
+        status, run_steps = run_pipeline(config_data, timetable_data, args.joint, args.model, args.workers,
+                                         args.race, args.output, args.objective, args.stream, profile,
+                                         SolveCorpus(args.corpus) if args.corpus else NO_CORPUS, args.explain,
+                                         previous_timetable)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        print("Please correct config.json/data.json and try again.", file=sys.stderr)
+        sys.exit(1)
+    steps.extend(run_steps)
+
+    print("\n=== Pipeline Timings ===")
+    for name, seconds in steps:
+        print(f"{name:<22}{seconds:>9.3f}s")
+    print(f"{'total':<22}{sum(seconds for _, seconds in steps):>9.3f}s")
+    if args.profile:
+        profile.save(args.profile)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
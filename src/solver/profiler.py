@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# profiler.py
+"""
+Optional per-run instrumentation, written as one JSON file with --profile
+PATH on the engine, solver_joint and the pipeline.
+
+- phases: wall and CPU time of every step (load JSON, index,
+  preprocessing, build, solve, extract, merge, check, save), with the
+  process's peak RSS after the step and how much the step raised it
+  (includes CP-SAT's own memory);
+- models: variables and constraints per constraint family (the
+  mark_family() sections of the builders) and per CP-SAT constraint kind;
+- solves: the CP-SAT response statistics (conflicts, branches,
+  propagations, restarts, LP iterations, user/deterministic time), the
+  presolve time and the presolved model size read from the search log.
+
+Without --profile the solvers get NO_PROFILE: phase() hands back one
+shared no-op context manager and nothing is timed, walked or logged.
+Profiling turns on the CP-SAT search log (kept in memory), which adds a
+little to the solve time.
+"""
+
+import contextlib
+import json
+import re
+import resource
+import sys
+import time
+from ortools.sat.python import cp_model
+
+from src.solver.model_builder import model_families, model_size
+
+RESPONSE_STATS = ("user_time", "deterministic_time", "num_conflicts", "num_branches", "num_binary_propagations",
+                  "num_integer_propagations", "num_restarts", "num_lp_iterations", "num_booleans",
+                  "num_fixed_booleans", "num_integers")
+PRESOLVE_START = re.compile(r"^Starting presolve at ([0-9.]+)s")
+SEARCH_START = re.compile(r"^Starting search at ([0-9.]+)s")
+# Model summaries arrive as one multi-line entry: "Presolved ... model", "#Variables: 1'504 (...)", "#kLinear2: 10", ...
+PRESOLVED_VARIABLES = re.compile(r"^#Variables: ([0-9']+)", re.MULTILINE)
+PRESOLVED_CONSTRAINTS = re.compile(r"^#k\w+: ([0-9']+)", re.MULTILINE)
+
+
+def peak_rss_kb():
+    """Peak resident set size of this process so far, in KB."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # bytes on macOS, KB on Linux
+
+
+def presolve_stats(log_lines):
+    """Presolve time, search start and presolved model size from a CP-SAT log (last solve in it)."""
+    stats = {"presolve_s": None, "search_start_s": None, "presolved_variables": None, "presolved_constraints": None}
+    presolve_start = None
+    for line in log_lines:
+        if match := PRESOLVE_START.match(line):
+            presolve_start = float(match.group(1))
+        elif match := SEARCH_START.match(line):
+            stats["search_start_s"] = float(match.group(1))
+            if presolve_start is not None:
+                stats["presolve_s"] = round(stats["search_start_s"] - presolve_start, 6)
+        elif line.startswith("Presolved"):
+            if match := PRESOLVED_VARIABLES.search(line):
+                stats["presolved_variables"] = int(match.group(1).replace("'", ""))
+            stats["presolved_constraints"] = sum(int(count.replace("'", "")) for count in PRESOLVED_CONSTRAINTS.findall(line))
+    return stats
+
+
+class RunProfile:
+    """Collects phases, model sizes and solver statistics of one run."""
+
+    def __init__(self, command=None):
+        self.command = list(sys.argv if command is None else command)
+        self.started = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.phases, self.models, self.solves = [], [], []
+        self.log_lines = []
+
+    @contextlib.contextmanager
+    def phase(self, name, stage=None):
+        """Times the `with` block as phase `name` (of `stage`, if any)."""
+        wall, cpu, rss = time.perf_counter(), time.process_time(), peak_rss_kb()
+        try:
+            yield
+        finally:
+            peak = peak_rss_kb()
+            self.phases.append({"phase": name, "stage": stage, "wall_s": round(time.perf_counter() - wall, 6),
+                                "cpu_s": round(time.process_time() - cpu, 6), "peak_rss_kb": peak,
+                                "rss_growth_kb": peak - rss})
+
+    def add_phase(self, name, wall_s, stage=None):
+        """Records a phase timed elsewhere (e.g. the imports, before the profile existed)."""
+        self.phases.append({"phase": name, "stage": stage, "wall_s": round(wall_s, 6), "cpu_s": None,
+                            "peak_rss_kb": None, "rss_growth_kb": None})
+
+    def log_callback(self):
+        """A CP-SAT log callback for the next solve; its lines give the presolve statistics."""
+        self.log_lines = []
+        return self.log_lines.append
+
+    def model(self, built, stage):
+        """Records the size of a built model, per constraint family and kind."""
+        variables, constraints = model_size(built)
+        self.models.append({"stage": stage, "model": type(built).__name__, "variables": variables,
+                            "constraints": constraints, "objective": built.model.HasObjective(),
+                            "families": model_families(built)})
+
+    def solve(self, built, solver, status, stage):
+        """Records the statistics of a finished solve of `built` (race winners only report their wall time)."""
+        record = {"stage": stage, "status": solver.StatusName(status), "wall_s": solver.WallTime()}
+        if isinstance(solver, cp_model.CpSolver):
+            response = solver.ResponseProto()
+            record.update({stat: getattr(response, stat) for stat in RESPONSE_STATS})
+            if built.model.HasObjective():
+                record.update(objective=response.objective_value, bound=response.best_objective_bound)
+            record.update(presolve_stats(self.log_lines))
+        else:
+            record["race"] = True
+        self.solves.append(record)
+
+    def to_json(self):
+        return {"command": self.command, "started": self.started, "phases": self.phases,
+                "models": self.models, "solves": self.solves}
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+        print(f"Profile written to {path}.")
+
+
+class NoProfile:
+    """Stands in for RunProfile when profiling is off; every method does nothing."""
+
+    _no_phase = contextlib.nullcontext()
+
+    def phase(self, name, stage=None):
+        return self._no_phase
+
+    def add_phase(self, name, wall_s, stage=None):
+        pass
+
+    def log_callback(self):
+        return None
+
+    def model(self, built, stage):
+        pass
+
+    def solve(self, built, solver, status, stage):
+        pass
+
+
+NO_PROFILE = NoProfile()
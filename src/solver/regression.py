@@ -0,0 +1,215 @@
+#!/usr/bin/env python
+# regression.py
+"""
+Performance regression check for the model builders and the solver.
+
+A fixed set of cases (the shipped data with each formulation, plus
+generated instances from instance_generator.py) is built and solved with
+fixed CP-SAT parameters: `--workers` search workers (default 1, which makes
+CP-SAT deterministic) and random_seed 0, with no racing. For every case
+the run records:
+- variables and constraints of the built model;
+- pre-processing + build time and solve time (median of `--repeat`);
+- the solver's deterministic time, which does not depend on the machine
+  or its load when one worker is used;
+- the status and the unavailability violations of the solution.
+
+The numbers are compared to data/perf_baseline.json. A case fails when
+its status or violations change, when the model grows by more than
+`--size-tolerance`, or when the deterministic time grows by more than
+`--det-tolerance`. The exit status is 1 if any case fails. Wall times
+(build and solve) move by 50% and more between runs of an unchanged tree,
+so a build or solve time that grows by more than `--tolerance` (and by more
+than `--min-slack` seconds) is only reported as a warning.
+
+`--update` writes the current numbers as the new baseline instead; do this
+after a change that is meant to alter the model, on the machine the
+checks run on. Wall times measured on another machine are only compared
+with a warning.
+
+Usage (from the repository root):
+    python3 -m src.solver.regression [--cases shipped-integer generated-28] [--det-tolerance 0.25]
+        [--size-tolerance 0.0] [--tolerance 0.5] [--min-slack 0.1] [--repeat 5] [--workers 1] [--baseline data/perf_baseline.json] [--update]
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import ortools
+from ortools.sat.python import cp_model
+
+from src.diagnostics.test_unavailability import find_violations
+from src.solver.instance_generator import generate_instance
+from src.solver.model_builder import (MODEL_BUILDERS, SolutionValues, TimetableProblem, apply_solution, load_data,
+                                      model_size, solve)
+
+# name -> (model, generated sections or None for the shipped data). Generated instances have
+# 4.5 teachers and 1 lab room per section, as in scale_benchmark.py, and seed 0.
+CASES = {
+    "shipped-integer": ("integer", None),
+    "shipped-onehot": ("onehot", None),
+    "shipped-interval": ("interval", None),
+    "generated-14": ("integer", 14),
+    "generated-28": ("integer", 28),
+    "generated-28-onehot": ("onehot", 28),
+}
+SEED = 0
+SIZE_METRICS = ("variables", "constraints")
+WALL_METRICS = ("build_s", "solve_s")
+
+
+def case_instance(config_data, timetable_data, sections):
+    """(config, timetable) of a case, with the solver settings fixed and no racing."""
+    if sections is None:
+        config, timetable = copy.deepcopy(config_data), timetable_data
+    else:
+        config, timetable = generate_instance(config_data['settings'], sections, round(4.5 * sections), sections,
+                                              seed=SEED)
+    config['settings']['solver'] = {"default": {"random_seed": SEED}}
+    return config, timetable
+
+
+def measure(config, timetable, model_name, num_workers, repeat):
+    """Builds and solves one case `repeat` times. Returns its metrics (median times)."""
+    build_times, solve_times = [], []
+    for _ in range(repeat):
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            problem = TimetableProblem(config, timetable, config['sections'])
+            built = MODEL_BUILDERS[model_name](problem)
+            build_s = time.perf_counter() - start
+            solver, status = solve(built, config, num_workers, race_processes=0)
+        build_times.append(build_s)
+        solve_times.append(solver.WallTime())
+    result = {"build_s": statistics.median(build_times), "solve_s": statistics.median(solve_times)}
+    result["variables"], result["constraints"] = model_size(built)
+    result["deterministic_time"] = solver.ResponseProto().deterministic_time
+    result["status"] = solver.StatusName(status)
+    result["violations"] = None
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        result["violations"] = find_violations(config, apply_solution(problem, *built.extract(SolutionValues(solver))))
+    return {key: round(value, 6) if isinstance(value, float) else value for key, value in result.items()}
+
+
+def machine():
+    """Where the numbers were measured; wall times are only comparable on the same machine."""
+    return {"platform": platform.platform(), "processor": platform.processor() or platform.machine(),
+            "cpus": os.cpu_count(), "python": platform.python_version(), "ortools": ortools.__version__}
+
+
+def slower(name, key, baseline, current):
+    """Message for a time metric that grew."""
+    growth = current / baseline - 1 if baseline else float('inf')
+    return f"{name}: {key} {baseline:.3f} -> {current:.3f} (+{growth:.0%})"
+
+
+def compare(name, baseline, current, det_tolerance, size_tolerance, tolerance, min_slack):
+    """(failures, warnings) for the metrics of `current` that regressed against `baseline`."""
+    failures, warnings = [], []
+    for key in ("status", "violations"):
+        if current[key] != baseline[key]:
+            failures.append(f"{name}: {key} {baseline[key]} -> {current[key]}")
+    for key in SIZE_METRICS:
+        if current[key] > baseline[key] * (1 + size_tolerance):
+            failures.append(f"{name}: {key} {baseline[key]} -> {current[key]} (+{current[key] / baseline[key] - 1:.1%})")
+    # deterministic_time is in CP-SAT's own units, close to seconds, and repeats exactly with one worker.
+    if current["deterministic_time"] > baseline["deterministic_time"] * (1 + det_tolerance):
+        failures.append(slower(name, "deterministic_time", baseline["deterministic_time"], current["deterministic_time"]))
+    for key in WALL_METRICS:
+        if current[key] > baseline[key] * (1 + tolerance) and current[key] - baseline[key] > min_slack:
+            warnings.append(slower(name, key, baseline[key], current[key]))
+    return failures, warnings
+
+
+def change(baseline, current):
+    """Relative change as a table cell."""
+    if baseline is None or current is None or not isinstance(current, (int, float)):
+        return "-" if current == baseline else "changed"
+    if not baseline:
+        return "+0%" if not current else "new"
+    return f"{current / baseline - 1:+.0%}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check model size and solve time against stored baselines.")
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES),
+                        help="cases to run (default: all)")
+    parser.add_argument("--baseline", default='data/perf_baseline.json', help="stored baseline numbers")
+    parser.add_argument("--update", action="store_true", help="write the current numbers as the new baseline")
+    parser.add_argument("--det-tolerance", type=float, default=0.25,
+                        help="allowed relative growth of the deterministic time (default: 0.25)")
+    parser.add_argument("--size-tolerance", type=float, default=0.0,
+                        help="allowed relative growth of variables and constraints (default: 0.0)")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="relative slowdown of build and solve wall time that is warned about (default: 0.5)")
+    parser.add_argument("--min-slack", type=float, default=0.1,
+                        help="wall-time slowdowns below this many seconds are not warned about (default: 0.1)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per case; the median times are kept (default: 5)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="CP-SAT search workers; 1 keeps the search deterministic (default: 1)")
+    args = parser.parse_args()
+
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    stored = {"machine": None, "workers": args.workers, "cases": {}}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            stored = json.load(f)
+    elif not args.update:
+        print(f"FATAL ERROR: no baseline at {args.baseline}; run with --update first.", file=sys.stderr)
+        sys.exit(1)
+    if not args.update:
+        if stored['workers'] != args.workers:
+            print(f"Warning: the baseline was measured with {stored['workers']} workers, this run uses {args.workers}.")
+        if stored['machine'] != machine():
+            print(f"Warning: the baseline was measured on another machine ({stored['machine']}); "
+                  f"wall times may not be comparable.")
+
+    print(f"\n=== Performance regression ({args.workers} worker(s), median of {args.repeat}) ===")
+    print(f"{'case':<22}{'variables':>11}{'constraints':>13}{'build (s)':>11}{'solve (s)':>11}{'det. time':>11}"
+          f"{'status':>10}{'vs baseline (build/solve)':>27}")
+    results, failures, warnings = {}, [], []
+    for name in args.cases:
+        model_name, sections = CASES[name]
+        config, timetable = case_instance(config_data, timetable_data, sections)
+        current = measure(config, timetable, model_name, args.workers, args.repeat)
+        results[name] = current
+        baseline = stored['cases'].get(name)
+        versus = "no baseline"
+        if baseline and not args.update:
+            versus = f"{change(baseline['build_s'], current['build_s'])} / {change(baseline['solve_s'], current['solve_s'])}"
+            case_failures, case_warnings = compare(name, baseline, current, args.det_tolerance, args.size_tolerance,
+                                                   args.tolerance, args.min_slack)
+            failures += case_failures
+            warnings += case_warnings
+        print(f"{name:<22}{current['variables']:>11}{current['constraints']:>13}{current['build_s']:>11.3f}"
+              f"{current['solve_s']:>11.3f}{current['deterministic_time']:>11.3f}{current['status']:>10}{versus:>27}")
+
+    if args.update:
+        stored = {"machine": machine(), "workers": args.workers, "cases": {**stored['cases'], **results}}
+        os.makedirs(os.path.dirname(args.baseline) or ".", exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(stored, f, indent=2)
+        print(f"\nBaseline for {len(results)} case(s) written to {args.baseline}.")
+        return
+    if warnings:
+        print(f"\nWarning: {len(warnings)} wall time(s) above the baseline (not a failure; wall times are noisy):")
+        for message in warnings:
+            print(f"  -> {message}")
+    if failures:
+        print(f"\n{len(failures)} regression(s):")
+        for message in failures:
+            print(f"  -> {message}")
+        sys.exit(1)
+    print(f"\nNo regressions (tolerance {args.det_tolerance:.0%} on deterministic time, "
+          f"{args.size_tolerance:.0%} on model size).")
+
+
+if __name__ == "__main__":
+    main()
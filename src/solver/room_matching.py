@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# room_matching.py
+"""
+Two-phase lab scheduling.
+
+Phase 1 is a model built with room_matching=True: lab subjects and times
+are scheduled with no room variables, only a limit of two labs (groups A
+and B) per free lab room in each lab slot.
+
+Phase 2 assigns concrete rooms from config.json["lab_rooms"] slot by slot.
+Every lab of a slot may use any room that is free for the whole slot, so
+the phase-1 limit is enough for the rooms to be handed out in order and
+no re-solve is ever needed. This only holds when lab slots do not
+overlap, which IntervalModel checks before building with room_matching.
+"""
+
+from ortools.sat.python import cp_model
+
+from src.solver.model_builder import SolutionValues, solve
+
+
+def assign_rooms(problem, labs):
+    """Fills the room ids of a phase-1 solution: the free rooms of each lab slot, two per section in order."""
+    by_slot = {}
+    for (section, day, lab_slot_idx) in labs:
+        by_slot.setdefault((day, lab_slot_idx), []).append(section)
+
+    assigned = {}
+    for (day, lab_slot_idx), sections in by_slot.items():
+        rooms = problem.lab_room_domains[day, lab_slot_idx]
+        if 2 * len(sections) > len(rooms):
+            raise RuntimeError(f"{len(sections)} labs on {day} at {problem.inv_lab_slot_id_to_name[lab_slot_idx]} "
+                               f"but only {len(rooms)} free lab rooms: phase 1 did not limit the labs per slot.")
+        for i, section in enumerate(sections):
+            gA_idx, _, gB_idx, _ = labs[section, day, lab_slot_idx]
+            assigned[section, day, lab_slot_idx] = (gA_idx, rooms[2 * i], gB_idx, rooms[2 * i + 1])
+    return assigned
+
+
+def solve_two_phase(built, config_data, num_workers=None, stage="joint", race_processes=None,
+                    solution_callback=None, log_callback=None):
+    """
+    Solves phase 1 and assigns the lab rooms. Returns (solver, status, solution);
+    `solution` is (theory, labs) with rooms filled in, or None.
+    """
+    solver, status = solve(built, config_data, num_workers, stage, race_processes, solution_callback, log_callback)
+    if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+        return solver, status, None
+    theory, labs = built.extract(SolutionValues(solver))
+    return solver, status, (theory, assign_rooms(built.problem, labs))
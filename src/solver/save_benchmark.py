@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# save_benchmark.py
+"""
+Compares the two ways of turning a solved model into a timetable:
+
+- deepcopy path (before solution deltas): read every variable with
+  solver.Value, deep-copy the whole timetable and write the solution in,
+  then save the full JSON;
+- delta path: read the variables in one batch (SolutionValues), build the
+  delta of changed cells (solution_delta), merge it copy-on-write
+  (merge_delta), and save only the delta (compact JSON).
+
+The instance in data/ is replicated k times as in build_benchmark.py, with
+the lab rooms copied too so every replica can be solved. Each instance is
+solved once; extraction, merge and save are then timed on that solution.
+
+Usage (from the repository root):
+    python3 -m src.solver.save_benchmark [--factors 1 4 8] [--model integer|onehot|interval] [--workers N] [--repeat 5]
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+from ortools.sat.python import cp_model
+
+from src.solver.build_benchmark import replicate
+from src.solver.model_builder import (MODEL_BUILDERS, SolutionValues, TimetableProblem, delta_to_json, load_data,
+                                      merge_delta, solution_delta, solve)
+from src.solver.timetable import best_time
+
+
+class PerVariableValues:
+    """The old extraction: one solver.Value call per variable."""
+
+    def __init__(self, solver):
+        self.solver = solver
+
+    def __call__(self, variables, indices):
+        return np.array([self.solver.Value(var) for var in variables], dtype=np.int64)
+
+
+def peak_memory(function):
+    """Peak bytes allocated while `function` runs (tracemalloc)."""
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def replicated_instance(config_data, timetable_data, factor):
+    """replicate() with one copy of every lab room per replica."""
+    config, timetable = replicate(config_data, timetable_data, factor)
+    config['lab_rooms'] = [f"{room}#{k}" if k else room for k in range(factor) for room in config_data['lab_rooms']]
+    return config, timetable
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the deepcopy and delta ways of saving a solution.")
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 4, 8],
+                        help="copies of the shipped sections to measure (default: 1 4 8)")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer",
+                        help="model formulation: integer subject vars, one-hot booleans or optional intervals (default: integer)")
+    parser.add_argument("--workers", type=int,
+                        help="CP-SAT search workers (default: settings.solver in config.json)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    workdir = tempfile.mkdtemp()
+    rows = []
+    for factor in args.factors:
+        config, timetable = replicated_instance(config_data, timetable_data, factor)
+        with contextlib.redirect_stdout(io.StringIO()):
+            problem = TimetableProblem(config, timetable, config['sections'])
+            built = MODEL_BUILDERS[args.model](problem)
+            solver, status = solve(built, config, args.workers)
+        if status != cp_model.OPTIMAL and status != cp_model.FEASIBLE:
+            print(f"x{factor}: no solution ({solver.StatusName(status)}), skipped.")
+            continue
+
+        solution = built.extract(SolutionValues(solver))
+        if built.extract(PerVariableValues(solver)) != solution:
+            raise SystemExit(f"x{factor}: batched and per-variable extraction differ.")
+        delta = solution_delta(problem, *solution)
+
+        def deepcopy_apply():
+            return merge_delta(copy.deepcopy(timetable), delta, in_place=True)
+
+        def delta_apply():
+            return merge_delta(timetable, delta)
+
+        if deepcopy_apply() != delta_apply():
+            raise SystemExit(f"x{factor}: the two merge paths differ.")
+        full_path, delta_path = os.path.join(workdir, "full.json"), os.path.join(workdir, "delta.json")
+
+        def save_full():
+            with open(full_path, 'w') as f:
+                json.dump(deepcopy_apply(), f, indent=2)
+
+        def save_delta():
+            with open(delta_path, 'w') as f:
+                json.dump(delta_to_json(delta), f, separators=(",", ":"))
+
+        rows.append((len(config['sections']), sum(len(cells) for cells in delta.values()),
+                     best_time(lambda: built.extract(PerVariableValues(solver)), args.repeat),
+                     best_time(lambda: built.extract(SolutionValues(solver)), args.repeat),
+                     best_time(deepcopy_apply, args.repeat), best_time(delta_apply, args.repeat),
+                     peak_memory(deepcopy_apply), peak_memory(delta_apply),
+                     best_time(save_full, args.repeat), best_time(save_delta, args.repeat),
+                     os.path.getsize(full_path), os.path.getsize(delta_path)))
+
+    print(f"\n=== Saving a solution: deepcopy path vs delta ({args.model} model; ms, KB) ===")
+    print(f"{'sections':>9}{'cells':>7}{'extract V/B':>16}{'merge D/Δ':>16}{'peak mem D/Δ':>18}"
+          f"{'save D/Δ':>16}{'output D/Δ':>18}")
+    for (sections, cells, value_time, batch_time, deepcopy_time, delta_time, deepcopy_mem, delta_mem,
+         full_save, delta_save, full_size, delta_size) in rows:
+        print(f"{sections:>9}{cells:>7}{1000 * value_time:>8.2f}/{1000 * batch_time:<7.2f}"
+              f"{1000 * deepcopy_time:>8.2f}/{1000 * delta_time:<7.2f}"
+              f"{deepcopy_mem / 1024:>9.0f}/{delta_mem / 1024:<8.0f}"
+              f"{1000 * full_save:>8.2f}/{1000 * delta_save:<7.2f}"
+              f"{full_size / 1024:>9.1f}/{delta_size / 1024:<8.1f}")
+    print("V = solver.Value per variable, B = SolutionValues; D = deepcopy path, Δ = delta path.")
+
+
+if __name__ == "__main__":
+    main()
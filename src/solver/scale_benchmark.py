@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# scale_benchmark.py
+"""
+Solves synthetic instances of growing size and records where the model
+stops scaling.
+
+For every size (number of sections) and seed, instance_generator.py builds
+an instance with teachers and lab rooms in proportion to the sections, and
+the joint model is built and solved in-process. One row per run records
+the model size, pre-processing, build and solve time, the time to the
+first solution, the status and the unavailability violations of the
+result. The table is printed and written as CSV.
+
+Usage (from the repository root):
+    python3 -m src.solver.scale_benchmark [--sizes 7 14 28 56] [--seeds 0 1] [--model integer|onehot|interval]
+        [--teachers-per-section 4.5] [--lab-rooms-per-section 1.0] [--assigned 0.1] [--unavailable 0.05]
+        [--time-limit 60] [--workers N] [--output outputs/scale_benchmark.csv]
+"""
+
+import argparse
+import contextlib
+import csv
+import io
+import os
+import time
+from ortools.sat.python import cp_model
+
+from src.diagnostics.test_unavailability import find_violations
+from src.solver.instance_generator import generate_instance
+from src.solver.model_builder import (MODEL_BUILDERS, FirstSolutionTimer, SolutionValues, TimetableProblem, apply_solution,
+                                      load_data, model_size, solve)
+
+COLUMNS = ["sections", "teachers", "lab_rooms", "seed", "model", "variables", "constraints", "preprocessing_s",
+           "build_s", "solve_s", "first_solution_s", "status", "violations"]
+
+
+def run_instance(config, timetable, model_name="integer", num_workers=None):
+    """Builds and solves the joint model of one instance. Returns a dict with the COLUMNS it measured."""
+    row = {"variables": None, "constraints": None, "preprocessing_s": None, "build_s": None, "solve_s": None,
+           "first_solution_s": None, "violations": None}
+    messages = io.StringIO()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(messages):
+        try:
+            start = time.perf_counter()
+            problem = TimetableProblem(config, timetable, config['sections'])
+            row["preprocessing_s"] = time.perf_counter() - start
+            start = time.perf_counter()
+            built = MODEL_BUILDERS[model_name](problem)
+            row["build_s"] = time.perf_counter() - start
+        except ValueError as e:
+            # Empty domains and impossible frequency rules are found before solving.
+            details = [line.strip(" ->") for line in messages.getvalue().splitlines() if line.strip()]
+            row["status"] = "INVALID"
+            row["error"] = f"{str(e).replace(' (see above)', '')} First: {details[0]}" if details else str(e)
+            return row
+        row["variables"], row["constraints"] = model_size(built)
+        timer = FirstSolutionTimer()
+        solver, status = solve(built, config, num_workers, race_processes=0, solution_callback=timer)
+        row["solve_s"] = solver.WallTime()
+        row["first_solution_s"] = timer.first_solution_time
+        row["status"] = solver.StatusName(status)
+        if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+            row["violations"] = find_violations(config, apply_solution(problem, *built.extract(SolutionValues(solver))))
+    return row
+
+
+def width(column):
+    """Printed width of a table column."""
+    return max(len(column), 10) + 2
+
+
+def format_cell(value):
+    """A table cell: "-" for missing values, 3 decimals for times."""
+    if value is None:
+        return "-"
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve synthetic instances of growing size and tabulate the results.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[7, 14, 28, 56],
+                        help="numbers of sections to generate (default: 7 14 28 56)")
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0], help="instance seeds per size (default: 0)")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer",
+                        help="model formulation: integer subject vars, one-hot booleans or optional intervals (default: integer)")
+    parser.add_argument("--workers", type=int,
+                        help="CP-SAT search workers (default: settings.solver in config.json)")
+    parser.add_argument("--teachers-per-section", type=float, default=4.5,
+                        help="teachers generated per section (data/ has about 4.7; default: 4.5)")
+    parser.add_argument("--lab-rooms-per-section", type=float, default=1.0,
+                        help="lab rooms generated per section (data/ has about 1.1; default: 1.0)")
+    parser.add_argument("--assigned", type=float, default=0.1,
+                        help="fraction of each section's cells pre-assigned (default: 0.1)")
+    parser.add_argument("--unavailable", type=float, default=0.05,
+                        help="fraction of the week each teacher is unavailable (default: 0.05)")
+    parser.add_argument("--time-limit", type=float, default=60, help="solver time limit per instance (default: 60)")
+    parser.add_argument("--output", default='outputs/scale_benchmark.csv', help="CSV table of the results")
+    args = parser.parse_args()
+
+    base_config, _ = load_data('data/config.json', 'data/data.json')
+    settings = dict(base_config['settings'], solver_timeout_seconds=args.time_limit)
+    rows = []
+    print(f"\n=== Scaling on synthetic instances ({args.model} model, {args.time_limit:g}s limit) ===")
+    print("".join(f"{name:>{width(name)}}" for name in COLUMNS[:4] + COLUMNS[5:]))
+    for size in args.sizes:
+        for seed in args.seeds:
+            teachers = max(1, round(args.teachers_per_section * size))
+            lab_rooms = max(2, round(args.lab_rooms_per_section * size))
+            row = {"sections": size, "teachers": teachers, "lab_rooms": lab_rooms, "seed": seed, "model": args.model}
+            try:
+                config, timetable = generate_instance(settings, size, teachers, lab_rooms, args.assigned,
+                                                      args.unavailable, seed)
+            except ValueError as e:
+                row.update(status="INVALID", error=str(e))
+            else:
+                row.update(run_instance(config, timetable, args.model, args.workers))
+            rows.append(row)
+            print("".join(f"{format_cell(row.get(name)):>{width(name)}}" for name in COLUMNS[:4] + COLUMNS[5:]))
+            if row.get("error"):
+                print(f"  -> {row['error']}")
+
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS + ["error"])
+        writer.writeheader()
+        writer.writerows(rows)
+    solved = [row["sections"] for row in rows if row["status"] in ("OPTIMAL", "FEASIBLE")]
+    largest = f"{max(solved)} sections" if solved else "none"
+    print(f"\nLargest instance solved within {args.time_limit:g}s: {largest}. Table written to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,506 @@
+#!/usr/bin/env python
+# snapshot.py
+"""
+Memory-mapped binary timetable snapshots (.ttsnap).
+
+A JSON timetable has to be parsed completely before any cell can be read.
+A snapshot is laid out so that one section or one teacher can be read
+straight from an `mmap` of the file:
+
+    header       magic, version, schema, axis sizes, block directory
+    strings      one table shared by all fields: u32 offsets + UTF-8 bytes
+                 (code 0 = key absent, code 1 = null)
+    axes         string codes of the days, sections and slots
+    layout       u32 per (day, section): position in the day's list
+                 (solver schema) or 1 if the section has that day (raw schema)
+    records      fixed-width cells, u32 (status, subject, teacher, room),
+                 section-major: records[section][day][slot]
+    postings     teacher name -> flat record indices, names sorted for
+                 binary search ("A / B" and "A,B" count for both names)
+    irregular    cells that do not fit a record, as JSON (usually empty)
+
+Both timetable schemas are supported and round trip losslessly (the JSON
+read back is equal to the original; only key order inside a cell may change):
+- solver schema (data.json, outputs/updated_timetable.json):
+  {day: [{"section": ..., slot: [cell]}]}
+- raw schema (data/raw_inputs/*-tt.json):
+  {section: {day: [{"time": slot, ...cell}]}}
+
+Usage (from the repository root):
+    python3 -m src.solver.snapshot pack outputs/updated_timetable.json outputs/updated_timetable.ttsnap
+    python3 -m src.solver.snapshot unpack outputs/updated_timetable.ttsnap restored.json
+    python3 -m src.solver.snapshot bench [--factor 64] [--repeat 5]   # load-time comparison
+"""
+
+import argparse
+import bisect
+import json
+import mmap
+import os
+import re
+import struct
+import sys
+import tempfile
+
+import numpy as np
+
+from src.solver.timetable import ABSENT, FIELDS, Timetable, best_time
+
+MAGIC = b"TTSNAP\0\0"
+VERSION = 1
+SOLVER_SCHEMA, RAW_SCHEMA = 0, 1
+NULL = 1  # string code of a JSON null; ABSENT (0) means the key is missing
+NO_POSITION = 0xFFFFFFFF
+BLOCKS = ("string_offsets", "string_data", "axes", "layout", "records",
+          "posting_names", "posting_starts", "posting_cells", "irregular")
+HEADER = struct.Struct("<8sHHIIII" + "QQ" * len(BLOCKS))
+RAW_CELL_KEYS = frozenset(FIELDS) | {"time"}
+
+
+def teacher_names(value):
+    """Names in a teacher cell: "SK / SS" (solver schema) or "CL1,BJ,SP" (raw schema)."""
+    return [name.strip() for name in re.split(r"[/,]", value) if name.strip()] if value else []
+
+
+# --- JSON -> arrays ---
+
+def raw_to_timetable(raw_data):
+    """
+    Raw-schema timetable as a Timetable (days, sections and "time" slots)
+    plus {(section, day): list} for the day lists that do not fit the arrays.
+    """
+    sections, days, slots = list(raw_data), {}, {}
+    for section_days in raw_data.values():
+        for day, cells in section_days.items():
+            days.setdefault(day)
+            for cell in cells if type(cells) is list else []:
+                if type(cell) is dict and type(cell.get('time')) is str:
+                    slots.setdefault(cell['time'])
+    tt = Timetable(days, sections, slots)
+    present, irregular = set(), {}
+    for s, section in enumerate(sections):
+        for day, cells in raw_data[section].items():
+            d = tt.day_index[day]
+            present.add((d, s))
+            if not regular_raw_day(tt, cells):
+                irregular[d, s] = cells
+                continue
+            for cell in cells:
+                t = tt.slot_index[cell['time']]
+                for field in FIELDS:
+                    if field in cell:
+                        tt.codes[field][d, s, t] = tt.tables[field].intern(cell[field])
+    return tt, present, irregular
+
+
+def regular_raw_day(tt, cells):
+    """True if a raw day list is cells with string/null fields, in increasing slot order."""
+    if type(cells) is not list:
+        return False
+    last = -1
+    for cell in cells:
+        if (type(cell) is not dict or 'status' not in cell or type(cell.get('time')) is not str
+                or not cell.keys() <= RAW_CELL_KEYS or not all(v is None or type(v) is str for v in cell.values())):
+            return False
+        t = tt.slot_index[cell['time']]
+        if t <= last:
+            return False
+        last = t
+    return True
+
+
+def schema_of(data):
+    """SOLVER_SCHEMA or RAW_SCHEMA; raises ValueError for anything else."""
+    if type(data) is dict and data and all(type(v) is list for v in data.values()):
+        return SOLVER_SCHEMA
+    if type(data) is dict and data and all(type(v) is dict for v in data.values()):
+        return RAW_SCHEMA
+    raise ValueError("Not a timetable: expected {day: [section entries]} or {section: {day: [cells]}}.")
+
+
+# --- Writing ---
+
+def pack(data, path):
+    """Writes a JSON timetable (either schema) as a snapshot. Returns the file size in bytes."""
+    schema = schema_of(data)
+    if schema == SOLVER_SCHEMA:
+        tt = Timetable.from_json(data)
+        layout = np.full((len(tt.days), len(tt.sections)), NO_POSITION, dtype=np.uint32)
+        for d, day in enumerate(tt.days):
+            layout[d, tt.order[day]] = np.arange(len(tt.order[day]), dtype=np.uint32)
+        irregular = {f"{d},{s},{t}": cell for (d, s, t), cell in tt.irregular.items()}
+    else:
+        tt, present, raw_irregular = raw_to_timetable(data)
+        layout = np.full((len(tt.days), len(tt.sections)), NO_POSITION, dtype=np.uint32)
+        for d, s in present:
+            layout[d, s] = 1
+        irregular = {f"{d},{s}": cells for (d, s), cells in raw_irregular.items()}
+
+    # One string table for every field and axis; each field's codes are remapped into it.
+    strings = {}
+
+    def code(value):
+        return NULL if value is None else strings.setdefault(value, len(strings) + 2)
+
+    remapped = []
+    for field in FIELDS:
+        table = tt.tables[field].values
+        lookup = np.array([ABSENT] + [code(v) for v in table[1:]], dtype=np.uint32)
+        remapped.append(lookup[tt.codes[field]])
+    records = np.ascontiguousarray(np.stack(remapped, axis=-1).transpose(1, 0, 2, 3))
+    axes = np.array([code(v) for v in tt.days + tt.sections + tt.slots], dtype=np.uint32)
+
+    # Teacher postings over the flat (section, day, slot) record index
+    flat_teachers = records[..., FIELDS.index('teacher')].ravel()
+    values = [None, None] + list(strings)
+    postings = {}
+    for teacher_code in np.unique(flat_teachers).tolist():
+        if teacher_code in (ABSENT, NULL):
+            continue
+        cells = np.flatnonzero(flat_teachers == teacher_code)
+        for name in teacher_names(values[teacher_code]):
+            postings.setdefault(name, []).append(cells)
+    names = sorted(postings)
+    posting_names = np.array([code(name) for name in names], dtype=np.uint32)
+    posting_cells = [np.unique(np.concatenate(postings[name])) for name in names]
+    posting_starts = np.zeros(len(names) + 1, dtype=np.uint32)
+    posting_starts[1:] = np.cumsum([len(cells) for cells in posting_cells])
+    posting_cells = np.concatenate(posting_cells).astype(np.uint32) if posting_cells else np.zeros(0, dtype=np.uint32)
+
+    encoded = [s.encode('utf-8') for s in strings]
+    string_offsets = np.zeros(len(encoded) + 3, dtype=np.uint32)  # codes 0 and 1 are empty
+    string_offsets[3:] = np.cumsum([len(b) for b in encoded])
+    blocks = {
+        "string_offsets": string_offsets.tobytes(),
+        "string_data": b"".join(encoded),
+        "axes": axes.tobytes(),
+        "layout": layout.tobytes(),
+        "records": records.astype('<u4').tobytes(),
+        "posting_names": posting_names.tobytes(),
+        "posting_starts": posting_starts.tobytes(),
+        "posting_cells": posting_cells.tobytes(),
+        "irregular": json.dumps(irregular).encode('utf-8') if irregular else b"",
+    }
+
+    # Blocks start on 8-byte boundaries so NumPy can view them in place.
+    directory, offset = [], HEADER.size
+    for name in BLOCKS:
+        offset += -offset % 8
+        directory += [offset, len(blocks[name])]
+        offset += len(blocks[name])
+    header = HEADER.pack(MAGIC, VERSION, schema, len(tt.days), len(tt.sections), len(tt.slots),
+                         len(string_offsets) - 1, *directory)
+    with open(path, 'wb') as f:
+        f.write(header)
+        for name, (block_offset, _) in zip(BLOCKS, zip(directory[::2], directory[1::2])):
+            f.write(b"\0" * (block_offset - f.tell()))
+            f.write(blocks[name])
+    return os.path.getsize(path)
+
+
+# --- Reading ---
+
+class Snapshot:
+    """
+    Read-only view of a snapshot file. Opening it reads the header and the
+    axis names only; cells are read from the mapped file on demand.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.schema, num_days, num_sections, num_slots, num_strings, *directory = \
+            HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != VERSION:
+            self._map.close()
+            raise ValueError(f"{path} is not a version {VERSION} timetable snapshot.")
+        self.blocks = {name: (directory[2 * i], directory[2 * i + 1]) for i, name in enumerate(BLOCKS)}
+        self.string_offsets = self._array("string_offsets")
+        self.records = self._array("records").reshape(num_sections, num_days, num_slots, len(FIELDS))
+        self.layout = self._array("layout").reshape(num_days, num_sections)
+        axes = [self.string(code) for code in self._array("axes").tolist()]
+        self.days = axes[:num_days]
+        self.sections = axes[num_days:num_days + num_sections]
+        self.slots = axes[num_days + num_sections:]
+        self.section_index = {s: i for i, s in enumerate(self.sections)}
+
+    def _array(self, block):
+        offset, length = self.blocks[block]
+        return np.frombuffer(self._map, dtype='<u4', count=length // 4, offset=offset)
+
+    def close(self):
+        # Views into the map must be released before it can be closed.
+        self.string_offsets = self.records = self.layout = None
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def string(self, code):
+        """The string of a code (None for NULL and ABSENT)."""
+        if code in (ABSENT, NULL):
+            return None
+        start, end = self.string_offsets[code], self.string_offsets[code + 1]
+        data_offset = self.blocks["string_data"][0]
+        return self._map[data_offset + int(start):data_offset + int(end)].decode('utf-8')
+
+    def _cell(self, record):
+        status, *rest = record.tolist()
+        cell = {"status": self.string(status)}
+        for field, code in zip(FIELDS[1:], rest):
+            if code != ABSENT:
+                cell[field] = self.string(code)
+        return cell
+
+    def _irregular(self):
+        offset, length = self.blocks["irregular"]
+        return json.loads(self._map[offset:offset + length]) if length else {}
+
+    def section_cells(self, section):
+        """[(day, slot, cell)] of one section, read from its records only."""
+        s = self.section_index[section]
+        records = self.records[s]
+        days_present = self.layout[:, s] != NO_POSITION
+        irregular = self._irregular()
+        cells = []
+        for d, t in zip(*np.nonzero((records[:, :, 0] != ABSENT) & days_present[:, None])):
+            cells.append((self.days[d], self.slots[t], self._cell(records[d, t])))
+        for key, value in irregular.items():
+            d, s_key, *t = map(int, key.split(","))
+            if s_key == s:
+                cells.append((self.days[d], self.slots[t[0]] if t else None, value))
+        return cells
+
+    def teacher_cells(self, teacher):
+        """[(day, section, slot, cell)] of every record that lists `teacher` (binary search on the postings)."""
+        names = self._array("posting_names")
+        i = bisect.bisect_left(_Strings(self, names), teacher)
+        if i == len(names) or self.string(int(names[i])) != teacher:
+            return []
+        starts = self._array("posting_starts")
+        num_days, num_slots = len(self.days), len(self.slots)
+        cells = []
+        for flat in self._array("posting_cells")[starts[i]:starts[i + 1]].tolist():
+            s, rest = divmod(flat, num_days * num_slots)
+            d, t = divmod(rest, num_slots)
+            cells.append((self.days[d], self.sections[s], self.slots[t], self._cell(self.records[s, d, t])))
+        return cells
+
+    def to_json(self):
+        """The whole timetable in its original schema (equal to the JSON that was packed)."""
+        strings = [None, None] + [self.string(code) for code in range(2, len(self.string_offsets) - 1)]
+        records = self.records.tolist()
+        irregular = self._irregular()
+        data = {}
+        if self.schema == SOLVER_SCHEMA:
+            for d, day in enumerate(self.days):
+                positions = self.layout[d].tolist()
+                day_list = [None] * sum(p != NO_POSITION for p in positions)
+                for s, position in enumerate(positions):
+                    if position == NO_POSITION:
+                        continue
+                    section_obj = {"section": self.sections[s]}
+                    for t, slot in enumerate(self.slots):
+                        if f"{d},{s},{t}" in irregular:
+                            section_obj[slot] = irregular[f"{d},{s},{t}"]
+                        elif records[s][d][t][0] != ABSENT:
+                            section_obj[slot] = [self._decode(records[s][d][t], strings)]
+                    day_list[position] = section_obj
+                data[day] = day_list
+        else:
+            for s, section in enumerate(self.sections):
+                section_days = data[section] = {}
+                for d, day in enumerate(self.days):
+                    if self.layout[d, s] == NO_POSITION:
+                        continue
+                    if f"{d},{s}" in irregular:
+                        section_days[day] = irregular[f"{d},{s}"]
+                        continue
+                    section_days[day] = [{"time": slot, **self._decode(records[s][d][t], strings)}
+                                         for t, slot in enumerate(self.slots) if records[s][d][t][0] != ABSENT]
+        return data
+
+    @staticmethod
+    def _decode(record, strings):
+        cell = {"status": strings[record[0]]}
+        for field, code in zip(FIELDS[1:], record[1:]):
+            if code != ABSENT:
+                cell[field] = strings[code]
+        return cell
+
+    def to_timetable(self):
+        """The solver-schema snapshot as a Timetable, without going through JSON."""
+        if self.schema != SOLVER_SCHEMA:
+            raise ValueError("Only solver-schema snapshots ({day: [section entries]}) can be loaded as a Timetable.")
+        if self.blocks["irregular"][1]:
+            return Timetable.from_json(self.to_json())
+        tt = Timetable(self.days, self.sections, self.slots)
+        shared = self.records.transpose(1, 0, 2, 3)
+        for i, field in enumerate(FIELDS):
+            used, codes = np.unique(shared[..., i], return_inverse=True)
+            lookup = [ABSENT if c == ABSENT else tt.tables[field].intern(self.string(c)) for c in used.tolist()]
+            tt.codes[field] = np.array(lookup, dtype=np.uint16)[codes].reshape(shared.shape[:3])
+        for d, day in enumerate(self.days):
+            positions = self.layout[d].tolist()
+            tt.order[day] = sorted((s for s, p in enumerate(positions) if p != NO_POSITION), key=positions.__getitem__)
+        return tt
+
+
+class _Strings:
+    """Sequence of the strings behind `codes`, decoded on access (for bisect)."""
+
+    def __init__(self, snapshot, codes):
+        self.snapshot, self.codes = snapshot, codes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        return self.snapshot.string(int(self.codes[i]))
+
+
+def unpack(path, json_path):
+    """Writes a snapshot back to JSON in the layout of updated_timetable.json."""
+    with Snapshot(path) as snapshot:
+        data = snapshot.to_json()
+    with open(json_path, 'w') as f:
+        json.dump(data, f, indent=2)
+
+
+# --- Load-time comparison ---
+
+def first_teacher(data):
+    """Some teacher name of a timetable, for the lookup benchmark."""
+    for value in data.values():
+        for entry in value if type(value) is list else value.values():
+            for cell in entry.values() if type(entry) is dict else entry:
+                info = cell[0] if type(cell) is list and cell and type(cell[0]) is dict else cell
+                names = teacher_names(info.get('teacher')) if type(info) is dict else []
+                if names:
+                    return names[0]
+    return None
+
+
+def json_section(path, schema, section):
+    """One section's cells the JSON way: parse everything, then pick it out."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    if schema == RAW_SCHEMA:
+        return data[section]
+    return [obj for day_list in data.values() for obj in day_list if obj['section'] == section]
+
+
+def json_teacher(path, teacher):
+    """Every cell of one teacher the JSON way."""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    found = []
+    for value in data.values():
+        for entry in value if type(value) is list else value.values():
+            for cell in entry.values() if type(entry) is dict else entry:
+                info = cell[0] if type(cell) is list and cell and type(cell[0]) is dict else cell
+                if type(info) is dict and teacher in teacher_names(info.get('teacher')):
+                    found.append(info)
+    return found
+
+
+def snapshot_section(path, section):
+    with Snapshot(path) as snapshot:
+        return snapshot.section_cells(section)
+
+
+def snapshot_teacher(path, teacher):
+    with Snapshot(path) as snapshot:
+        return snapshot.teacher_cells(teacher)
+
+
+def bench_files(factor):
+    """The shipped timetables, plus data.json replicated `factor` times."""
+    files = ['outputs/updated_timetable.json'] + [f"data/raw_inputs/{name}" for name in (
+        "first-year-tt.json", "first-mtech-tt.json", "third-btech-tt.json", "fifth-btech-tt.json")]
+    files = [f for f in files if os.path.exists(f)]
+    if factor > 1:
+        from src.solver.build_benchmark import replicate
+        from src.solver.model_builder import load_data
+        config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+        _, timetable = replicate(config_data, timetable_data, factor)
+        path = os.path.join(tempfile.mkdtemp(), f"data-x{factor}.json")
+        with open(path, 'w') as f:
+            json.dump(timetable, f, indent=2)
+        files.append(path)
+    return files
+
+
+def bench(factor, repeat):
+    print("\n=== Snapshot vs JSON load times (ms, fastest of each) ===")
+    print(f"{'file':<24}{'JSON (KB)':>10}{'snap (KB)':>10}{'json.load':>11}{'open':>8}"
+          f"{'section J/S':>16}{'teacher J/S':>16}{'full decode':>13}")
+    workdir = tempfile.mkdtemp()
+    for path in bench_files(factor):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        snap_path = os.path.join(workdir, os.path.basename(path).replace('.json', '.ttsnap'))
+        snap_size = pack(data, snap_path)
+        with Snapshot(snap_path) as snapshot:
+            if snapshot.to_json() != data:
+                raise SystemExit(f"Round trip differs for {path}.")
+            section, schema = snapshot.sections[-1], snapshot.schema
+        teacher = first_teacher(data)
+
+        def load():
+            with open(path, 'r') as f:
+                json.load(f)
+
+        def open_snapshot():
+            Snapshot(snap_path).close()
+
+        def decode():
+            with Snapshot(snap_path) as snapshot:
+                snapshot.to_json()
+
+        times = [best_time(function, repeat) * 1000 for function in (
+            load, open_snapshot,
+            lambda: json_section(path, schema, section), lambda: snapshot_section(snap_path, section),
+            lambda: json_teacher(path, teacher), lambda: snapshot_teacher(snap_path, teacher),
+            decode)]
+        print(f"{os.path.basename(path):<24}{os.path.getsize(path) / 1024:>10.1f}{snap_size / 1024:>10.1f}"
+              f"{times[0]:>11.2f}{times[1]:>8.2f}{times[2]:>8.2f}/{times[3]:<7.2f}"
+              f"{times[4]:>8.2f}/{times[5]:<7.2f}{times[6]:>13.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert timetables to and from binary snapshots.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    pack_parser = commands.add_parser("pack", help="JSON timetable -> snapshot")
+    pack_parser.add_argument("json_path")
+    pack_parser.add_argument("snapshot_path")
+    unpack_parser = commands.add_parser("unpack", help="snapshot -> JSON timetable")
+    unpack_parser.add_argument("snapshot_path")
+    unpack_parser.add_argument("json_path")
+    bench_parser = commands.add_parser("bench", help="compare load times against the JSON files")
+    bench_parser.add_argument("--factor", type=int, default=64,
+                              help="also measure data.json replicated this many times (default: 64; 1 to skip)")
+    bench_parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    try:
+        if args.command == "pack":
+            with open(args.json_path, 'r') as f:
+                data = json.load(f)
+            size = pack(data, args.snapshot_path)
+            print(f"Wrote {args.snapshot_path} ({size / 1024:.1f} KB, JSON was {os.path.getsize(args.json_path) / 1024:.1f} KB).")
+        elif args.command == "unpack":
+            unpack(args.snapshot_path, args.json_path)
+            print(f"Wrote {args.json_path}.")
+        else:
+            bench(args.factor, args.repeat)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
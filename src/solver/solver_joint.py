@@ -0,0 +1,382 @@
+#!/usr/bin/env python
+# solver_joint.py
+"""
+Solves EVERY section in config.json["sections"] with one CP-SAT model.
+
+Unlike the 3rd -> 5th -> 7th chain, no semester is frozen before the
+next one is solved, so teacher and room clashes between semesters are
+resolved jointly and the model is built and solved only once.
+
+Reads from:
+- data/config.json (rules, subjects, rooms, labs)
+- data/data.json (base timetable skeleton)
+
+Writes to:
+- outputs/updated_timetable.json (solved timetable)
+
+Usage (from the repository root):
+    python3 -m src.solver.solver_joint [--workers N] [--race N] [--model integer|onehot|interval] [--lab-rooms model|matching]
+    python3 -m src.solver.solver_joint --compare-models
+    python3 -m src.solver.solver_joint --compare-lab-rooms
+    python3 -m src.solver.solver_joint [--symmetry-breaking] [--compare-symmetry [SEEDS]]
+    python3 -m src.solver.solver_joint --warm-start [PATH] [--compare-cold]
+    python3 -m src.solver.solver_joint --benchmark 3
+    python3 -m src.solver.solver_joint --objective [--stream PATH] [--time-limit SECONDS]
+    python3 -m src.solver.solver_joint --profile outputs/profile.json
+    python3 -m src.solver.solver_joint --corpus corpus
+    python3 -m src.solver.solver_joint --explain [minimal]
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from ortools.sat.python import cp_model
+
+from src.solver.model_builder import (MODEL_BUILDERS, FirstSolutionTimer, SolutionStreamer, SolutionValues,
+                                      TimetableProblem, add_soft_objective, apply_solution, load_data, model_size,
+                                      report_objective, save_timetable, solve)
+from src.solver.corpus import NO_CORPUS, SolveCorpus
+from src.solver.engine import (add_corpus_argument, add_explain_argument, add_objective_arguments,
+                               add_warm_start_argument, add_warm_start_hints, load_previous_timetable)
+from src.solver.infeasibility import report_conflicts
+from src.solver.profiler import NO_PROFILE, RunProfile
+from src.solver.room_matching import solve_two_phase
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SEQUENTIAL_STAGES = ["solver_3rd", "solver_5th", "solver_7th"]
+LAB_ROOM_MODES = ["model", "matching"]
+
+
+def solve_joint(config_data, timetable_data, num_workers=None, model_name="integer", race_processes=None,
+                previous_timetable=None, lab_rooms="model", symmetry_breaking=False, objective=False, stream_path=None,
+                profile=NO_PROFILE, corpus=NO_CORPUS, explain=None):
+    """
+    Builds and solves one model for all sections, hinted with `previous_timetable` if given.
+    With lab_rooms="matching", lab rooms are assigned after the solve (see room_matching.py).
+    With `objective`, minimizes settings.objective (see add_soft_objective); with
+    `stream_path`, writes every improving solution there as it is found.
+    Phases, model size and solver statistics go to `profile` (see profiler.py),
+    and the solve to `corpus` (see corpus.py). With `explain` ("core" or
+    "minimal"), an infeasible model prints the rules that conflict.
+    Returns the solved timetable, or None if no solution was found.
+    """
+    if stream_path and lab_rooms == "matching":
+        raise ValueError("--stream needs lab rooms in the model: matched rooms are only known after the solve.")
+    with profile.phase("preprocessing", "joint"):
+        problem = TimetableProblem(config_data, timetable_data, config_data['sections'])
+    with profile.phase("build", "joint"):
+        try:
+            built = MODEL_BUILDERS[model_name](problem, room_matching=(lab_rooms == "matching"),
+                                               symmetry_breaking=symmetry_breaking)
+        except ValueError:
+            if explain:
+                report_conflicts(problem, explain == "minimal")
+            raise
+        if previous_timetable is not None:
+            add_warm_start_hints(problem, built, previous_timetable)
+        if objective:
+            add_soft_objective(built, config_data['settings'].get('objective', {}))
+            race_processes = 0  # a race keeps only the winner's final solution
+    profile.model(built, "joint")
+
+    print(f"\nStarting joint solver for {len(problem.sections_to_solve)} sections...")
+    timer = SolutionStreamer(built, stream_path) if stream_path else FirstSolutionTimer()
+    with profile.phase("solve", "joint"):
+        solver, status, solution = solve_built(built, config_data, num_workers, 0 if stream_path else race_processes,
+                                               timer, profile.log_callback())
+    profile.solve(built, solver, status, "joint")
+    corpus.record(built, config_data, "joint", solver, status, num_workers, 0 if stream_path else race_processes)
+    if timer.first_solution_time is not None:
+        print(f"First solution found after {timer.first_solution_time:.3f}s")
+
+    if solution is not None:
+        if objective:
+            report_objective(built, solver)
+        with profile.phase("merge", "joint"):
+            return apply_solution(problem, *solution)
+    if status == cp_model.INFEASIBLE:
+        print("No solution found: The problem is infeasible.")
+        if explain:
+            report_conflicts(problem, explain == "minimal")
+        else:
+            print("Check constraints, especially room/teacher clashes or lack of 'Free' slots for labs.")
+    else:
+        print(f"No solution found. Solver status: {solver.StatusName(status)}")
+    return None
+
+
+def solve_built(built, config_data, num_workers=None, race_processes=None, solution_callback=None, log_callback=None):
+    """Solves a built model, matching lab rooms afterwards if it was built with room_matching. Returns (solver, status, solution)."""
+    if built.room_matching:
+        return solve_two_phase(built, config_data, num_workers, race_processes=race_processes,
+                               solution_callback=solution_callback, log_callback=log_callback)
+    solver, status = solve(built, config_data, num_workers, race_processes=race_processes, solution_callback=solution_callback,
+                           log_callback=log_callback)
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        return solver, status, built.extract(SolutionValues(solver))
+    return solver, status, None
+
+
+def warm_start_report(config_data, timetable_data, previous_timetable, num_workers=None, model_name="integer"):
+    """Solves cold and warm-started and prints how much sooner the first solution arrived."""
+    rows = []
+    for mode in ("cold", "warm"):
+        problem = TimetableProblem(config_data, timetable_data, config_data['sections'])
+        built = MODEL_BUILDERS[model_name](problem)
+        kept, total = add_warm_start_hints(problem, built, previous_timetable) if mode == "warm" else (0, 0)
+        timer = FirstSolutionTimer()
+        solver, status = solve(built, config_data, num_workers, race_processes=0, solution_callback=timer)
+        rows.append((mode, f"{kept}/{total}", timer.first_solution_time, solver.WallTime(), solver.StatusName(status)))
+
+    print("\n=== Warm Start Report ===")
+    print(f"{'mode':<6}{'hints':>12}{'first sol (s)':>15}{'total (s)':>11}  status")
+    for mode, hints, first, wall, status_name in rows:
+        first_text = f"{first:.3f}" if first is not None else "-"
+        print(f"{mode:<6}{hints:>12}{first_text:>15}{wall:>11.3f}  {status_name}")
+    cold_first, warm_first = rows[0][2], rows[1][2]
+    if cold_first is not None and warm_first is not None:
+        print(f"First solution arrived {cold_first - warm_first:.3f}s sooner with the warm start.")
+
+
+def timetable_is_complete(config_data, timetable_data):
+    """True if no section has "To Be Assigned" slots left and every lab is placed."""
+    for section in config_data['sections']:
+        lab_hours = 0
+        for day in config_data['settings']['days']:
+            section_obj = next(s for s in timetable_data[day] if s['section'] == section)
+            for slot in config_data['settings']['all_slots']:
+                if slot not in section_obj: continue
+                slot_info = section_obj[slot][0]
+                if slot_info['status'] == "To Be Assigned":
+                    return False
+                if "(G-A)" in str(slot_info.get('subject', '')):
+                    lab_hours += 1
+        if lab_hours != 2 * len(config_data['labs'].get(section, [])):
+            return False
+    return True
+
+
+def compare_models(config_data, timetable_data, num_workers=None):
+    """Builds and solves the joint problem with every model builder and prints their sizes and times."""
+    rows = []
+    for model_name, builder in MODEL_BUILDERS.items():
+        start = time.perf_counter()
+        problem = TimetableProblem(config_data, timetable_data, config_data['sections'])
+        built = builder(problem)
+        build_time = time.perf_counter() - start
+        num_vars, num_constraints = model_size(built)
+        solver, status = solve(built, config_data, num_workers)
+        rows.append((model_name, num_vars, num_constraints, build_time, solver.WallTime(), solver.StatusName(status)))
+
+    print("\n=== Model Comparison (all sections) ===")
+    print(f"{'model':<10}{'variables':>11}{'constraints':>13}{'build (s)':>11}{'solve (s)':>11}  status")
+    for model_name, num_vars, num_constraints, build_time, solve_time, status_name in rows:
+        print(f"{model_name:<10}{num_vars:>11}{num_constraints:>13}{build_time:>11.3f}{solve_time:>11.3f}  {status_name}")
+
+
+def compare_lab_rooms(config_data, timetable_data, num_workers=None):
+    """Solves the joint problem with lab rooms in the model and with two-phase room matching, for every model."""
+    rows = []
+    for model_name, builder in MODEL_BUILDERS.items():
+        for mode in LAB_ROOM_MODES:
+            start = time.perf_counter()
+            problem = TimetableProblem(config_data, timetable_data, config_data['sections'])
+            built = builder(problem, room_matching=(mode == "matching"))
+            build_time = time.perf_counter() - start
+            num_vars, num_constraints = model_size(built)
+            start = time.perf_counter()
+            if mode == "matching":
+                solver, status, _ = solve_two_phase(built, config_data, num_workers, race_processes=0)
+            else:
+                solver, status = solve(built, config_data, num_workers, race_processes=0)
+            solve_time = time.perf_counter() - start
+            rows.append((model_name, mode, num_vars, num_constraints, build_time, solve_time, solver.StatusName(status)))
+
+    print("\n=== Lab Rooms: In-Model vs Two-Phase Matching (all sections) ===")
+    print(f"{'model':<10}{'lab rooms':<10}{'variables':>11}{'constraints':>13}{'build (s)':>11}{'solve (s)':>11}  status")
+    for model_name, mode, num_vars, num_constraints, build_time, solve_time, status_name in rows:
+        print(f"{model_name:<10}{mode:<10}{num_vars:>11}{num_constraints:>13}{build_time:>11.3f}{solve_time:>11.3f}  {status_name}")
+
+
+def tightest_infeasible_rooms(config_data, timetable_data):
+    """
+    The shipped instance with lab rooms dropped from the end of config.json["lab_rooms"]
+    until it becomes infeasible, or None if even a single room is feasible.
+    """
+    for count in range(len(config_data['lab_rooms']) - 1, 0, -1):
+        config = copy.deepcopy(config_data)
+        config['lab_rooms'] = config_data['lab_rooms'][:count]
+        with contextlib.redirect_stdout(io.StringIO()):
+            built = MODEL_BUILDERS["onehot"](TimetableProblem(config, timetable_data, config['sections']), room_matching=True)
+            _, status = solve(built, config, race_processes=0)
+        if status == cp_model.INFEASIBLE:
+            return config
+    return None
+
+
+def compare_symmetry(config_data, timetable_data, num_workers=None, repeats=3):
+    """
+    Solves every model with and without symmetry breaking, on the shipped data and
+    on its tightest infeasible lab-room variant, and prints the median time to the
+    first solution (or to the infeasibility proof) over `repeats` random seeds.
+    """
+    instances = [("shipped", config_data)]
+    infeasible = tightest_infeasible_rooms(config_data, timetable_data)
+    if infeasible is not None:
+        instances.append((f"{len(infeasible['lab_rooms'])} lab rooms", infeasible))
+
+    rows = []
+    for instance_name, config in instances:
+        for model_name, builder in MODEL_BUILDERS.items():
+            for symmetry_breaking in (False, True):
+                times, statuses = [], set()
+                for seed in range(repeats):
+                    seeded = copy.deepcopy(config)
+                    seeded['settings']['solver'].setdefault('stages', {}).setdefault('joint', {})['random_seed'] = seed
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        built = builder(TimetableProblem(seeded, timetable_data, seeded['sections']),
+                                        symmetry_breaking=symmetry_breaking)
+                        timer = FirstSolutionTimer()
+                        solver, status = solve(built, seeded, num_workers, race_processes=0, solution_callback=timer)
+                    times.append(timer.first_solution_time if timer.first_solution_time is not None else solver.WallTime())
+                    statuses.add(solver.StatusName(status))
+                rows.append((instance_name, model_name, "on" if symmetry_breaking else "off",
+                             statistics.median(times), "/".join(sorted(statuses))))
+
+    print(f"\n=== Symmetry Breaking (median of {repeats} seeds) ===")
+    print(f"{'instance':<16}{'model':<10}{'symmetry':<10}{'first sol / proof (s)':>22}  status")
+    for instance_name, model_name, mode, seconds, status_name in rows:
+        print(f"{instance_name:<16}{model_name:<10}{mode:<10}{seconds:>22.3f}  {status_name}")
+
+
+def run_benchmark(runs, num_workers, model_name="integer"):
+    """
+    Times the sequential chain (three interpreter launches, as in generate.sh)
+    against the joint solver (one launch). Each run uses a scratch copy of
+    data/ so the real outputs/ folder is left alone.
+    """
+    env = dict(os.environ, PYTHONPATH=REPO_ROOT)
+    commands = {
+        "sequential": [[sys.executable, "-m", f"src.solver.{stage}"] for stage in SEQUENTIAL_STAGES],
+        "joint": [[sys.executable, "-m", "src.solver.solver_joint", "--model", model_name]
+                  + (["--workers", str(num_workers)] if num_workers else [])],
+    }
+    results = {mode: [] for mode in commands}
+    with open(os.path.join(REPO_ROOT, "data", "config.json"), 'r') as f:
+        config_data = json.load(f)
+
+    for run in range(runs):
+        for mode, mode_commands in commands.items():
+            with tempfile.TemporaryDirectory() as workdir:
+                shutil.copytree(os.path.join(REPO_ROOT, "data"), os.path.join(workdir, "data"))
+                os.makedirs(os.path.join(workdir, "outputs"))
+                start = time.perf_counter()
+                ok = True
+                for command in mode_commands:
+                    completed = subprocess.run(command, cwd=workdir, env=env,
+                                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                    if completed.returncode != 0:
+                        ok = False
+                        break
+                elapsed = time.perf_counter() - start
+
+                output_path = os.path.join(workdir, "outputs", "updated_timetable.json")
+                if ok and os.path.exists(output_path):
+                    with open(output_path, 'r') as f:
+                        ok = timetable_is_complete(config_data, json.load(f))
+                else:
+                    ok = False
+            results[mode].append((elapsed, ok))
+            print(f"  run {run + 1}/{runs} {mode:<10} {elapsed:7.2f}s {'solved' if ok else 'FAILED'}")
+
+    print("\n=== Joint vs Sequential Benchmark ===")
+    print(f"{'mode':<12}{'success':>10}{'mean (s)':>10}{'min (s)':>10}{'max (s)':>10}")
+    for mode, rows in results.items():
+        times = [t for t, _ in rows]
+        successes = sum(1 for _, ok in rows if ok)
+        print(f"{mode:<12}{f'{successes}/{len(rows)}':>10}{sum(times) / len(times):>10.2f}{min(times):>10.2f}{max(times):>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve all semesters with one CP-SAT model.")
+    parser.add_argument("--workers", type=int,
+                        help="CP-SAT search workers (default: settings.solver in config.json)")
+    parser.add_argument("--race", type=int, metavar="N",
+                        help="race N solver processes with different seeds (default: settings.solver.race.processes)")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer",
+                        help="model formulation: integer subject vars, one-hot booleans or optional intervals (default: integer)")
+    parser.add_argument("--compare-models", action="store_true",
+                        help="report variable/constraint counts and solve time for every model formulation")
+    parser.add_argument("--lab-rooms", choices=LAB_ROOM_MODES, default="model",
+                        help="assign lab rooms in the model, or by matching after scheduling the labs (default: model)")
+    parser.add_argument("--compare-lab-rooms", action="store_true",
+                        help="benchmark in-model lab rooms against two-phase room matching")
+    parser.add_argument("--symmetry-breaking", action="store_true",
+                        help="add symmetry-breaking constraints for interchangeable lab rooms and lab groups")
+    parser.add_argument("--compare-symmetry", type=int, nargs="?", const=3, metavar="SEEDS",
+                        help="time the first solution and the infeasibility proof with and without symmetry breaking")
+    add_warm_start_argument(parser)
+    parser.add_argument("--compare-cold", action="store_true",
+                        help="with --warm-start, also solve without hints and report the time difference")
+    parser.add_argument("--output", default='outputs/updated_timetable.json')
+    parser.add_argument("--benchmark", type=int, metavar="RUNS",
+                        help="compare wall time and success rate against the sequential chain")
+    add_objective_arguments(parser)
+    parser.add_argument("--profile", metavar="PATH",
+                        help="write per-phase timings, model sizes and solver statistics of this run as JSON")
+    add_corpus_argument(parser)
+    add_explain_argument(parser)
+    args = parser.parse_args()
+
+    if args.benchmark:
+        run_benchmark(args.benchmark, args.workers, args.model)
+        return
+
+    profile = RunProfile() if args.profile else NO_PROFILE
+    with profile.phase("load JSON"):
+        config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    if args.time_limit is not None:
+        config_data['settings']['solver_timeout_seconds'] = args.time_limit
+    if args.compare_models:
+        compare_models(config_data, timetable_data, args.workers)
+        return
+    if args.compare_lab_rooms:
+        compare_lab_rooms(config_data, timetable_data, args.workers)
+        return
+    if args.compare_symmetry:
+        compare_symmetry(config_data, timetable_data, args.workers, args.compare_symmetry)
+        return
+    previous_timetable = load_previous_timetable(args.warm_start) if args.warm_start else None
+    try:
+        if previous_timetable is not None and args.compare_cold:
+            warm_start_report(config_data, timetable_data, previous_timetable, args.workers, args.model)
+            return
+        solved = solve_joint(config_data, timetable_data, args.workers, args.model, args.race, previous_timetable,
+                             args.lab_rooms, args.symmetry_breaking, args.objective, args.stream, profile,
+                             SolveCorpus(args.corpus) if args.corpus else NO_CORPUS, args.explain)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        print("Please correct config.json/data.json and try again.", file=sys.stderr)
+        sys.exit(1)
+
+    if solved is not None:
+        print(f"Solution found for all sections. Saving to {args.output}...")
+        with profile.phase("save"):
+            save_timetable(solved, args.output)
+    if args.profile:
+        profile.save(args.profile)
+    if solved is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
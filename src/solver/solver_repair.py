@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# solver_repair.py
+"""
+Repairs an existing timetable after a small change (one teacher's
+unavailability, one pre-assigned class in data.json) instead of
+re-solving every section.
+
+1. Find the (section, day) cells touching the changed teacher or room.
+   Changes are detected automatically (pre-assigned cells in data.json
+   that differ from the current timetable, classes that now fall in a
+   teacher's unavailable slot) and can be added with --teacher / --room.
+2. Reopen only those cells (back to their data.json state) and keep every
+   other cell fixed to its current value.
+3. Re-solve the neighbourhood, minimising the number of changed values.
+4. If that is infeasible, or a reopened cell has no possible value, grow
+   the neighbourhood and try again:
+   whole week of the affected sections -> sections sharing a teacher or
+   room with them -> every section.
+
+Reads from:
+- data/config.json, data/data.json
+- outputs/updated_timetable.json (current timetable)
+
+Writes to:
+- outputs/updated_timetable.json (repaired timetable)
+
+Usage (from the repository root):
+    python3 -m src.solver.solver_repair [--teacher T ...] [--room R ...] [--current PATH] [--model integer|onehot|interval]
+"""
+
+import argparse
+import copy
+import json
+import sys
+from ortools.sat.python import cp_model
+
+from src.solver.model_builder import (MODEL_BUILDERS, SolutionValues, TimetableProblem, load_data, apply_solution,
+                                      mark_family, previous_assignments, save_timetable, solve, split_names,
+                                      teacher_unavailability)
+
+
+def find_section_obj(timetable_data, day, section):
+    """Returns the entry of `section` on `day`, or None."""
+    return next((obj for obj in timetable_data.get(day, []) if obj['section'] == section), None)
+
+
+def detect_changes(config_data, base_data, current_data):
+    """
+    Compares data.json with the current timetable. Returns (teachers, rooms, cells):
+    the resources of pre-assigned classes that differ, teachers now booked in an
+    unavailable slot, and the (section, day) cells where this happens.
+    """
+    teachers, rooms, cells = set(), set(), set()
+    unavailable = teacher_unavailability(config_data)
+    for day in config_data['settings']['days']:
+        for section in config_data['sections']:
+            base_obj = find_section_obj(base_data, day, section)
+            current_obj = find_section_obj(current_data, day, section)
+            if base_obj is None or current_obj is None:
+                continue
+            for slot in config_data['settings']['all_slots']:
+                if slot not in base_obj or slot not in current_obj:
+                    continue
+                base_info, current_info = base_obj[slot][0], current_obj[slot][0]
+                if base_info['status'] == "Assigned" and any(
+                        base_info.get(k) != current_info.get(k) for k in ('status', 'subject', 'teacher', 'room')):
+                    print(f"  -> Pre-assigned class changed: {section} {day} {slot}")
+                    cells.add((section, day))
+                    for info in (base_info, current_info):
+                        teachers.update(split_names(info.get('teacher')))
+                        rooms.update(split_names(info.get('room')))
+                if current_info.get('status') == "Assigned":
+                    for teacher in split_names(current_info.get('teacher')):
+                        if slot in unavailable.get(teacher, {}).get(day, []):
+                            print(f"  -> {teacher} is no longer available for {section} on {day} at {slot}")
+                            teachers.add(teacher)
+                            cells.add((section, day))
+    return teachers, rooms, cells
+
+
+def touching_cells(config_data, current_data, teachers, rooms):
+    """(section, day) cells of the current timetable with a class by one of `teachers` or in one of `rooms`."""
+    cells = set()
+    for day in config_data['settings']['days']:
+        for section_obj in current_data[day]:
+            for slot in config_data['settings']['all_slots']:
+                if slot not in section_obj or section_obj[slot][0].get('status') != "Assigned":
+                    continue
+                slot_info = section_obj[slot][0]
+                if (teachers & set(split_names(slot_info.get('teacher')))
+                        or rooms & set(split_names(slot_info.get('room')))):
+                    cells.add((section_obj['section'], day))
+    return cells
+
+
+def section_resources(config_data, section):
+    """Teachers and the theory room a section uses according to config.json."""
+    resources = {teacher for _, teacher in config_data['subjects'][section]}
+    resources.add(config_data['section_theory_rooms'][section])
+    return resources
+
+
+def grow_neighbourhood(config_data, cells):
+    """
+    The next, larger neighbourhood: first the whole week of every affected
+    section, then also the sections sharing a teacher or theory room with them,
+    then everything.
+    """
+    days = config_data['settings']['days']
+    sections = {section for section, _ in cells}
+    whole_week = {(section, day) for section in sections for day in days}
+    if whole_week != cells:
+        return whole_week
+    used = set().union(*(section_resources(config_data, s) for s in sections))
+    neighbours = {s for s in config_data['sections'] if section_resources(config_data, s) & used}
+    if neighbours != sections:
+        return {(section, day) for section in neighbours for day in days}
+    return {(section, day) for section in config_data['sections'] for day in days}
+
+
+def reopen(config_data, base_data, current_data, cells):
+    """The current timetable with every cell in `cells` put back to its data.json state."""
+    timetable = copy.deepcopy(current_data)
+    for day in config_data['settings']['days']:
+        for i, section_obj in enumerate(timetable[day]):
+            if (section_obj['section'], day) in cells:
+                timetable[day][i] = copy.deepcopy(find_section_obj(base_data, day, section_obj['section']))
+    return timetable
+
+
+def changed_slots(config_data, before, after):
+    """(section, day, slot) of every slot whose class differs between two timetables."""
+    changed = []
+    for day in config_data['settings']['days']:
+        for section in config_data['sections']:
+            before_obj, after_obj = find_section_obj(before, day, section), find_section_obj(after, day, section)
+            for slot in config_data['settings']['all_slots']:
+                if slot in before_obj and slot in after_obj and before_obj[slot][0] != after_obj[slot][0]:
+                    changed.append((section, day, slot))
+    return changed
+
+
+def solve_neighbourhood(config_data, base_data, current_data, cells, num_workers=None, model_name="integer"):
+    """
+    Re-solves `cells` with every other cell fixed, minimising the number of
+    changed values. Returns (solver, status, timetable); the timetable is None
+    unless a solution was found. Raises the builder's ValueError if a
+    reopened cell has no possible value.
+    """
+    sections = [s for s in config_data['sections'] if any(s == section for section, _ in cells)]
+    timetable = reopen(config_data, base_data, current_data, cells)
+    problem = TimetableProblem(config_data, timetable, sections)
+    # Free lab slots on the days that were not reopened belong to fixed cells too.
+    problem.keep_open(cells)
+    built = MODEL_BUILDERS[model_name](problem)
+
+    theory, labs, hinted_sections, kept, total = previous_assignments(problem, current_data)
+    built.add_hints(theory, labs, hinted_sections)
+    mark_family(built, "change literals")
+    built.model.Minimize(sum(built.change_literals(theory, labs, hinted_sections)))
+
+    solver, status = solve(built, config_data, num_workers, stage="repair")
+    if status == cp_model.OPTIMAL or status == cp_model.FEASIBLE:
+        theory, labs = built.extract(SolutionValues(solver))
+        return solver, status, apply_solution(problem, theory, labs)
+    return solver, status, None
+
+
+def repair(config_data, base_data, current_data, cells, num_workers=None, model_name="integer"):
+    """
+    Re-solves `cells` with every other cell fixed, growing the neighbourhood
+    while the model is infeasible or a cell has no possible value (the
+    builder's ValueError). Returns the repaired timetable, or None.
+    """
+    all_cells = {(s, d) for s in config_data['sections'] for d in config_data['settings']['days']}
+    while True:
+        sections = [s for s in config_data['sections'] if any(s == section for section, _ in cells)]
+        print(f"\nRepairing {len(cells)} of {len(all_cells)} (section, day) cells across sections {sections}...")
+        try:
+            solver, status, repaired = solve_neighbourhood(config_data, base_data, current_data, cells,
+                                                           num_workers, model_name)
+        except ValueError as e:
+            if cells == all_cells:
+                raise
+            print(f"Neighbourhood cannot be built: {e} Growing it...")
+            cells = grow_neighbourhood(config_data, cells)
+            continue
+
+        if repaired is not None:
+            return repaired
+        if status != cp_model.INFEASIBLE:
+            print(f"No solution found. Solver status: {solver.StatusName(status)}")
+            return None
+        if cells == all_cells:
+            print("No solution found: The problem is infeasible even with every cell reopened.")
+            return None
+        print("Neighbourhood is infeasible. Growing it...")
+        cells = grow_neighbourhood(config_data, cells)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Repair the current timetable around a changed teacher or room.")
+    parser.add_argument("--teacher", action="append", default=[], help="changed teacher (repeatable)")
+    parser.add_argument("--room", action="append", default=[], help="changed room (repeatable)")
+    parser.add_argument("--current", default='outputs/updated_timetable.json',
+                        help="timetable to repair (default: outputs/updated_timetable.json)")
+    parser.add_argument("--output", default='outputs/updated_timetable.json')
+    parser.add_argument("--workers", type=int,
+                        help="CP-SAT search workers (default: settings.solver in config.json)")
+    parser.add_argument("--model", choices=sorted(MODEL_BUILDERS), default="integer",
+                        help="model formulation: integer subject vars, one-hot booleans or optional intervals (default: integer)")
+    args = parser.parse_args()
+
+    config_data, base_data = load_data('data/config.json', 'data/data.json')
+    try:
+        with open(args.current, 'r') as f:
+            current_data = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError) as e:
+        print(f"Error: Cannot read the current timetable {args.current} ({e}). Run the full solver first.", file=sys.stderr)
+        sys.exit(1)
+
+    print("Looking for changes against the current timetable...")
+    teachers, rooms, cells = detect_changes(config_data, base_data, current_data)
+    teachers.update(args.teacher)
+    rooms.update(args.room)
+    cells |= touching_cells(config_data, current_data, teachers, rooms)
+    if not cells:
+        print("Nothing to repair: no class touches a changed teacher or room.")
+        return
+    print(f"Changed teachers: {sorted(teachers) or '-'}; changed rooms: {sorted(rooms) or '-'}")
+
+    try:
+        repaired = repair(config_data, base_data, current_data, cells, args.workers, args.model)
+    except ValueError as e:
+        print(f"FATAL ERROR: {e}", file=sys.stderr)
+        print("Please correct config.json/data.json and try again.", file=sys.stderr)
+        sys.exit(1)
+
+    if repaired is None:
+        sys.exit(1)
+    changed = changed_slots(config_data, current_data, repaired)
+    print(f"Repair changed {len(changed)} slot(s):")
+    for section, day, slot in changed:
+        print(f"  {section} {day} {slot}")
+    save_timetable(repaired, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# solver_settings.py
+"""
+CP-SAT parameters and seed racing, driven by config.json["settings"]["solver"].
+
+    "solver": {
+      "default": {"num_workers": 0},
+      "stages":  {"7th": {"linearization_level": 2}, "joint": {...}},
+      "race": {"processes": 0, "base_seed": 0, "portfolio": [{...}, ...]},
+      "tuned_file": "data/tuned_parameters.json"
+    }
+
+Any SatParameters field can be set by name; enum fields take their value
+name (e.g. "search_branching": "FIXED_SEARCH"). `settings.solver_timeout_seconds`
+is still the default time limit.
+
+`tuned_file` is written by autotune.py. When it exists, the parameter set
+it holds for a stage is applied after `default` and before `stages`, so
+settings written in config.json still win.
+
+Race mode starts `race.processes` solver processes on the same model, each
+with its own `random_seed` and a parameter set taken in turn from
+`race.portfolio`. The first process that finds a solution (or proves
+infeasibility) wins and the others are terminated.
+"""
+
+import json
+import multiprocessing
+import os
+import queue
+import sys
+from ortools.sat.python import cp_model
+
+STATUS_NAMES = {int(getattr(cp_model, name)): name
+                for name in ("UNKNOWN", "MODEL_INVALID", "FEASIBLE", "INFEASIBLE", "OPTIMAL")}
+DEFINITIVE_STATUSES = (cp_model.OPTIMAL, cp_model.FEASIBLE, cp_model.INFEASIBLE)
+_tuned_cache = {}  # path -> (modification time, contents)
+
+
+def tuned_parameters(config_data, stage):
+    """The parameter set autotune.py saved for `stage` in settings.solver.tuned_file ({} if none)."""
+    path = config_data['settings'].get('solver', {}).get('tuned_file')
+    if not path or not os.path.exists(path):
+        return {}
+    mtime = os.path.getmtime(path)
+    if path not in _tuned_cache or _tuned_cache[path][0] != mtime:
+        with open(path) as f:
+            _tuned_cache[path] = (mtime, json.load(f))
+    return _tuned_cache[path][1].get('classes', {}).get(stage, {}).get('parameters', {})
+
+
+def stage_parameters(config_data, stage):
+    """
+    Parameters for `stage`: the time limit, then settings.solver.default, the
+    tuned set for `stage` (settings.solver.tuned_file), then settings.solver.stages[stage].
+    """
+    settings = config_data['settings']
+    solver_settings = settings.get('solver', {})
+    params = {"max_time_in_seconds": settings['solver_timeout_seconds']}
+    params.update(solver_settings.get('default', {}))
+    params.update(tuned_parameters(config_data, stage))
+    params.update(solver_settings.get('stages', {}).get(stage, {}))
+    return params
+
+
+def configure(solver, params):
+    """Applies a {field: value} dict to solver.parameters. Raises ValueError on unknown fields or values."""
+    lines = []
+    for field, value in params.items():
+        if isinstance(value, bool):
+            value = "true" if value else "false"
+        lines.append(f"{field}: {value}")
+    text = "\n".join(lines)
+    if hasattr(solver.parameters, "merge_text_format"):
+        if not solver.parameters.merge_text_format(text):
+            raise ValueError(f"Invalid CP-SAT parameters in settings.solver: {params}")
+    else:
+        from google.protobuf import text_format
+        try:
+            text_format.Merge(text, solver.parameters)
+        except text_format.ParseError as e:
+            raise ValueError(f"Invalid CP-SAT parameters in settings.solver: {e}")
+
+
+def race_parameter_sets(config_data, stage, processes):
+    """One parameter dict per race process: stage parameters + a portfolio entry + a distinct seed."""
+    race = config_data['settings'].get('solver', {}).get('race', {})
+    portfolio = race.get('portfolio') or [{}]
+    base_seed = race.get('base_seed', 0)
+    param_sets = []
+    for i in range(processes):
+        # Each process is one search thread unless the portfolio entry says otherwise.
+        params = dict(stage_parameters(config_data, stage), num_workers=1)
+        params.update(portfolio[i % len(portfolio)])
+        params['random_seed'] = base_seed + i
+        param_sets.append(params)
+    return param_sets
+
+
+class RaceResult:
+    """The winning process's solution, readable like a CpSolver (Value, WallTime, StatusName)."""
+
+    def __init__(self, solution, wall_time):
+        self.solution = solution
+        self.wall_time = wall_time
+
+    def Value(self, var):
+        index = var.Index()
+        if index < 0:
+            return 1 - self.solution[-index - 1]
+        return self.solution[index]
+
+    def BooleanValue(self, literal):
+        return bool(self.Value(literal))
+
+    def WallTime(self):
+        return self.wall_time
+
+    def StatusName(self, status):
+        return STATUS_NAMES.get(int(status), str(status))
+
+
+def model_from_text(model_text):
+    """A CpModel read back from str(model.Proto()) (the text format)."""
+    model = cp_model.CpModel()
+    if hasattr(model.Proto(), "parse_text_format"):
+        model.Proto().parse_text_format(model_text)
+    else:
+        from google.protobuf import text_format
+        text_format.Merge(model_text, model.Proto())
+    return model
+
+
+def _race_worker(index, model_text, params, results):
+    """Solves one copy of the model and reports (index, status, solution, wall_time)."""
+    model = model_from_text(model_text)
+    solver = cp_model.CpSolver()
+    configure(solver, params)
+    status = solver.Solve(model)
+    solution = list(solver.ResponseProto().solution) if status in (cp_model.OPTIMAL, cp_model.FEASIBLE) else []
+    results.put((index, int(status), solution, solver.WallTime()))
+
+
+def race(model, param_sets):
+    """
+    Runs one process per parameter set and returns (RaceResult, status) for the
+    first definitive answer. Losing processes are terminated.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    model_text = str(model.Proto())
+    processes = [ctx.Process(target=_race_worker, args=(i, model_text, params, results), daemon=True)
+                 for i, params in enumerate(param_sets)]
+    print(f"Racing {len(processes)} solver processes (seeds {param_sets[0]['random_seed']}..{param_sets[-1]['random_seed']})...")
+    for process in processes:
+        process.start()
+
+    best = (RaceResult([], 0.0), cp_model.UNKNOWN)
+    finished = 0
+    try:
+        while finished < len(processes):
+            try:
+                index, status, solution, wall_time = results.get(timeout=1)
+            except queue.Empty:
+                if not any(p.is_alive() for p in processes) and results.empty():
+                    print("Error: every race process exited without a result.", file=sys.stderr)
+                    break
+                continue
+            finished += 1
+            print(f"  -> Process {index} finished: {STATUS_NAMES.get(status, status)} after {wall_time:.2f}s")
+            best = (RaceResult(solution, wall_time), status)
+            if status in DEFINITIVE_STATUSES:
+                print(f"Process {index} wins the race ({param_sets[index]}).")
+                break
+    finally:
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+            process.join()
+    return best
+
+
+def run_solver(model, config_data, stage, num_workers=None, race_processes=None, solution_callback=None,
+               log_callback=None):
+    """
+    Solves `model` with the settings for `stage`. Races several processes when
+    `race_processes` (or settings.solver.race.processes) is above 1; a
+    `solution_callback`, and a `log_callback` that receives the CP-SAT search
+    log line by line, are only used for in-process solves.
+    Returns (solver, status); `solver` answers Value() either way.
+    """
+    if race_processes is None:
+        race_processes = config_data['settings'].get('solver', {}).get('race', {}).get('processes', 0)
+    if race_processes and race_processes > 1:
+        return race(model, race_parameter_sets(config_data, stage, race_processes))
+
+    solver = cp_model.CpSolver()
+    params = stage_parameters(config_data, stage)
+    if num_workers:
+        params['num_workers'] = num_workers
+    if log_callback is not None:
+        params.update(log_search_progress=True, log_to_stdout=False)
+        solver.log_callback = log_callback
+    configure(solver, params)
+    status = solver.Solve(model, solution_callback)
+    return solver, status
@@ -0,0 +1,301 @@
+#!/usr/bin/env python
+# timetable.py
+"""
+Array-backed timetable.
+
+data.json / updated_timetable.json store every cell as
+timetable[day][list_index][slot][0] = {"status", "subject", "teacher", "room"},
+so every lookup walks nested lists and string-keyed dicts, and every
+consumer rebuilds a section index map first. `Timetable` keeps the same
+data as one small-integer code per field in NumPy arrays shaped
+day × section × slot, with one interned string table per field:
+
+    codes["teacher"][d, s, t] -> tables["teacher"][code] -> "SK / SS"
+
+Code 0 means "absent": a slot missing from a section entry (status) or a
+key missing from a cell (subject/teacher/room). None is interned like any
+other value, so the JSON round trip is lossless. Cells that do not fit
+(more than one entry, extra keys) are kept verbatim in `irregular`.
+
+Usage (from the repository root):
+    python3 -m src.solver.timetable [--factors 1 4 16] [--repeat 5]   # memory/lookup benchmark
+"""
+
+import argparse
+import copy
+import json
+import sys
+import time
+
+import numpy as np
+
+FIELDS = ("status", "subject", "teacher", "room")
+FIELD_SET = frozenset(FIELDS)
+ABSENT = 0
+
+
+class StringTable:
+    """Interned values of one field. Code 0 is reserved for "absent"."""
+
+    def __init__(self):
+        self.values = [None]
+        self.codes = {}
+        self._split = {}
+
+    def intern(self, value):
+        """Code of `value`, adding it if it is new."""
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def code(self, value):
+        """Code of `value`, or None if it was never interned."""
+        return self.codes.get(value)
+
+    def names(self, code):
+        """The value of `code` split like a "T1 / T2" cell (cached per code)."""
+        names = self._split.get(code)
+        if names is None:
+            value = self.values[code] if code != ABSENT else None
+            names = self._split[code] = [v.strip() for v in str(value).split('/') if v.strip()] if value else []
+        return names
+
+    def __len__(self):
+        return len(self.values)
+
+
+class Timetable:
+    """
+    day × section × slot code arrays for the four cell fields, plus the
+    per-day order of the section entries so to_json() reproduces the file.
+    """
+
+    def __init__(self, days, sections, slots, tables=None):
+        self.days, self.sections, self.slots = list(days), list(sections), list(slots)
+        self.day_index = {d: i for i, d in enumerate(self.days)}
+        self.section_index = {s: i for i, s in enumerate(self.sections)}
+        self.slot_index = {t: i for i, t in enumerate(self.slots)}
+        shape = (len(self.days), len(self.sections), len(self.slots))
+        self.codes = {field: np.zeros(shape, dtype=np.uint16) for field in FIELDS}
+        self.tables = tables if tables is not None else {field: StringTable() for field in FIELDS}
+        self.order = {day: [] for day in self.days}  # section indices in each day's list
+        self.irregular = {}  # (d, s, t) -> cell list kept as-is
+
+    @classmethod
+    def from_json(cls, timetable_data, slots=(), tables=None):
+        """
+        Builds the arrays from the JSON structure. `slots` (e.g. config
+        all_slots) fixes the first slot columns; any other key of a section
+        entry becomes an extra column. Pass another timetable's `tables` to
+        share its codes (so the arrays of both can be compared directly).
+        """
+        sections, all_slots = {}, dict.fromkeys(slots)
+        for section_objs in timetable_data.values():
+            for section_obj in section_objs:
+                sections.setdefault(section_obj['section'])
+                all_slots.update(dict.fromkeys(k for k in section_obj if k != 'section'))
+        tt = cls(timetable_data, sections, all_slots, tables)
+        intern = [tt.tables[f].intern for f in FIELDS]
+        # Codes are collected in flat lists and written to the arrays in one go.
+        positions, codes = [], []
+        num_sections, num_slots = len(tt.sections), len(tt.slots)
+
+        for d, day in enumerate(tt.days):
+            for section_obj in timetable_data[day]:
+                s = tt.section_index[section_obj['section']]
+                tt.order[day].append(s)
+                base = (d * num_sections + s) * num_slots
+                for key, cell in section_obj.items():
+                    if key == 'section':
+                        continue
+                    t = tt.slot_index[key]
+                    try:
+                        if type(cell) is not list or len(cell) != 1 or not cell[0].keys() <= FIELD_SET:
+                            raise TypeError
+                        info = cell[0]
+                        # Unhashable values (lists, dicts) raise TypeError in intern().
+                        row = (intern[0](info['status']),
+                               intern[1](info['subject']) if 'subject' in info else ABSENT,
+                               intern[2](info['teacher']) if 'teacher' in info else ABSENT,
+                               intern[3](info['room']) if 'room' in info else ABSENT)
+                    except (AttributeError, KeyError, TypeError):
+                        tt.irregular[d, s, t] = copy.deepcopy(cell)
+                        continue
+                    positions.append(base + t)
+                    codes.append(row)
+        if codes:
+            columns = np.array(codes, dtype=np.uint16)
+            for i, field in enumerate(FIELDS):
+                tt.codes[field].flat[positions] = columns[:, i]
+        return tt
+
+    def to_json(self):
+        """The JSON structure again (equal to the one from_json was given)."""
+        values = [self.tables[f].values for f in FIELDS]
+        codes = [self.codes[f].tolist() for f in FIELDS]
+        timetable_data = {}
+        for d, day in enumerate(self.days):
+            day_list = []
+            for s in self.order[day]:
+                section_obj = {"section": self.sections[s]}
+                for t, slot in enumerate(self.slots):
+                    if (d, s, t) in self.irregular:
+                        section_obj[slot] = copy.deepcopy(self.irregular[d, s, t])
+                        continue
+                    if codes[0][d][s][t] == ABSENT:
+                        continue
+                    cell = {"status": values[0][codes[0][d][s][t]]}
+                    for i in (1, 2, 3):
+                        if codes[i][d][s][t] != ABSENT:
+                            cell[FIELDS[i]] = values[i][codes[i][d][s][t]]
+                    section_obj[slot] = [cell]
+                day_list.append(section_obj)
+            timetable_data[day] = day_list
+        return timetable_data
+
+    @classmethod
+    def load(cls, path, slots=()):
+        with open(path, 'r') as f:
+            return cls.from_json(json.load(f), slots)
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_json(), f, indent=2)
+
+    def mask(self, field, value):
+        """Boolean day × section × slot array of the cells whose `field` is `value`."""
+        code = self.tables[field].code(value)
+        if code is None:
+            return np.zeros(self.codes[field].shape, dtype=bool)
+        return self.codes[field] == code
+
+    def cell(self, day, section, slot):
+        """The cell dict of one slot as in the JSON (None if the slot is absent)."""
+        d, s, t = self.day_index[day], self.section_index[section], self.slot_index[slot]
+        if (d, s, t) in self.irregular:
+            return self.irregular[d, s, t][0]
+        if self.codes['status'][d, s, t] == ABSENT:
+            return None
+        return {f: self.tables[f].values[self.codes[f][d, s, t]] for f in FIELDS
+                if f == 'status' or self.codes[f][d, s, t] != ABSENT}
+
+    def set_cell(self, day, section, slot, cell):
+        """Writes one slot's cell list (as in the JSON), e.g. after a solution was applied to the JSON."""
+        d, s, t = self.day_index[day], self.section_index[section], self.slot_index[slot]
+        self.irregular.pop((d, s, t), None)
+        info = cell[0] if type(cell) is list and len(cell) == 1 and type(cell[0]) is dict else None
+        if info is None or 'status' not in info or not info.keys() <= FIELD_SET:
+            self.irregular[d, s, t] = copy.deepcopy(cell)
+            return
+        for field in FIELDS:
+            self.codes[field][d, s, t] = self.tables[field].intern(info[field]) if field in info else ABSENT
+
+    def occupancy(self, field, positions):
+        """
+        {name: day × slot count array} for the names in `field` of the cells
+        at `positions` (a boolean day × section × slot mask); "A / B" values
+        count for both names.
+        """
+        table = self.tables[field]
+        num_days, _, num_slots = positions.shape
+        d, s, t = np.nonzero(positions)
+        used, which = np.unique(self.codes[field][d, s, t], return_inverse=True)
+        # One bincount over (code, day, slot) instead of one full-array compare per code.
+        per_code = np.bincount(which * (num_days * num_slots) + d * num_slots + t,
+                               minlength=len(used) * num_days * num_slots).reshape(len(used), num_days, num_slots)
+        counts = {}
+        for code, per_slot in zip(used.tolist(), per_code):
+            if code == ABSENT:
+                continue
+            for name in table.names(code):
+                counts[name] = counts[name] + per_slot if name in counts else per_slot
+        return counts
+
+    def nbytes(self):
+        """Bytes held by the code arrays and the string tables."""
+        arrays = sum(a.nbytes for a in self.codes.values())
+        strings = sum(sys.getsizeof(v) for table in self.tables.values() for v in table.values[1:])
+        return arrays + strings
+
+
+def deep_size(obj, seen=None):
+    """Bytes of `obj` and everything it references (for the benchmark)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(k, seen) + deep_size(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(v, seen) for v in obj)
+    return size
+
+
+def best_time(function, repeat):
+    """Fastest of `repeat` calls, in seconds."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def dict_lookups(config_data, timetable_data):
+    """The dict walks of the solvers: section index map, TBA cells and teacher occupancy."""
+    days, slots = config_data['settings']['days'], config_data['settings']['all_slots']
+    section_index_map = {d: {obj['section']: i for i, obj in enumerate(timetable_data[d])} for d in days}
+    tba, busy = 0, {}
+    for day in days:
+        for section in section_index_map[day]:
+            section_obj = timetable_data[day][section_index_map[day][section]]
+            for slot in slots:
+                if slot not in section_obj: continue
+                slot_info = section_obj[slot][0]
+                if slot_info['status'] == "To Be Assigned":
+                    tba += 1
+                elif slot_info['status'] == "Assigned":
+                    for teacher in [v.strip() for v in str(slot_info.get('teacher') or '').split('/') if v.strip()]:
+                        busy[teacher] = busy.get(teacher, 0) + 1
+    return tba, busy
+
+
+def array_lookups(tt):
+    """The same answers from the arrays."""
+    tba = int(tt.mask('status', "To Be Assigned").sum())
+    busy = {name: int(count.sum()) for name, count in tt.occupancy('teacher', tt.mask('status', "Assigned")).items()}
+    return tba, busy
+
+
+def main():
+    from src.solver.build_benchmark import replicate
+    from src.solver.model_builder import load_data
+
+    parser = argparse.ArgumentParser(description="Compare memory and lookup time of the JSON dicts and the arrays.")
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 4, 16],
+                        help="copies of the shipped sections to measure (default: 1 4 16)")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per measurement; the fastest is reported")
+    args = parser.parse_args()
+
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    slots = config_data['settings']['all_slots']
+    print("\n=== Timetable: JSON dicts vs arrays ===")
+    print(f"{'sections':>9}{'dict (KB)':>11}{'arrays (KB)':>13}{'import (ms)':>13}{'dict walk (ms)':>16}{'arrays (ms)':>13}")
+    for factor in args.factors:
+        config, timetable = replicate(config_data, timetable_data, factor)
+        tt = Timetable.from_json(timetable, slots)
+        if tt.to_json() != timetable or array_lookups(tt) != dict_lookups(config, timetable):
+            raise SystemExit(f"Round trip or lookups differ for factor {factor}.")
+        import_time = best_time(lambda: Timetable.from_json(timetable, slots), args.repeat)
+        dict_time = best_time(lambda: dict_lookups(config, timetable), args.repeat)
+        array_time = best_time(lambda: array_lookups(tt), args.repeat)
+        print(f"{len(config['sections']):>9}{deep_size(timetable) / 1024:>11.1f}{tt.nbytes() / 1024:>13.1f}"
+              f"{1000 * import_time:>13.2f}{1000 * dict_time:>16.2f}{1000 * array_time:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
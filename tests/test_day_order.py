@@ -0,0 +1,44 @@
+"""The day keys of data.json may come in any order; the pre-processing must not depend on it."""
+
+import json
+
+from src.diagnostics.test_unavailability import unavailability_violations
+from src.solver.model_builder import MODEL_BUILDERS, SolutionValues, TimetableProblem, apply_solution, load_data, solve
+
+
+def reversed_days(timetable_data):
+    return {day: json.loads(json.dumps(timetable_data[day])) for day in reversed(list(timetable_data))}
+
+
+def problem_state(problem):
+    return (problem.tba_slots_by_section, problem.available_lab_slots, problem.teacher_busy,
+            problem.theory_room_busy, problem.lab_room_busy, sorted(problem.constant_clashes),
+            problem.theory_domains, problem.lab_domains, problem.lab_room_domains,
+            {s: problem.pre_assigned_counts(s) for s in problem.sections_to_solve},
+            {s: problem.pre_assigned_labs(s) for s in problem.sections_to_solve})
+
+
+def solve_all(config_data, timetable_data):
+    """Every section of `timetable_data` solved with the integer model."""
+    problem = TimetableProblem(config_data, timetable_data, config_data['sections'])
+    built = MODEL_BUILDERS["integer"](problem)
+    solver, status = solve(built, config_data, num_workers=1)
+    assert solver.StatusName(status) in ("OPTIMAL", "FEASIBLE")
+    return apply_solution(problem, *built.extract(SolutionValues(solver)))
+
+
+def test_reordered_days_give_the_same_problem():
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    sections = config_data['sections']
+    for timetable in (timetable_data, solve_all(config_data, timetable_data)):
+        expected = problem_state(TimetableProblem(config_data, timetable, sections))
+        assert problem_state(TimetableProblem(config_data, reversed_days(timetable), sections)) == expected
+
+
+def test_reordered_days_solve_without_violations():
+    config_data, timetable_data = load_data('data/config.json', 'data/data.json')
+    solved = solve_all(config_data, reversed_days(timetable_data))
+    assert unavailability_violations(config_data, solved) == []
+    assert not any(cell[0]['status'] == "To Be Assigned"
+                   for day in solved for section_obj in solved[day]
+                   for key, cell in section_obj.items() if key != 'section')
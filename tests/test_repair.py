@@ -0,0 +1,47 @@
+"""A repair may only change the reopened cells; an infeasible neighbourhood must grow instead."""
+
+import contextlib
+import copy
+import io
+
+from test_day_order import solve_all
+
+from src.diagnostics.test_unavailability import unavailability_violations
+from src.solver.model_builder import load_data, split_names, teacher_unavailability
+from src.solver.solver_repair import changed_slots, find_section_obj, repair, solve_neighbourhood
+
+
+def placed_labs(config_data, base_data, solved, section):
+    """(day, lab slot hours, teachers) of every lab the solver placed for `section`."""
+    labs = []
+    for day in config_data['settings']['days']:
+        solved_obj, base_obj = find_section_obj(solved, day, section), find_section_obj(base_data, day, section)
+        hours = [slot for slot in config_data['settings']['all_slots']
+                 if base_obj[slot][0]['status'] != "Assigned" and "(G-A)" in str(solved_obj[slot][0].get('subject'))]
+        for i in range(0, len(hours), 2):
+            labs.append((day, hours[i:i + 2], split_names(solved_obj[hours[i]][0]['teacher'])))
+    return labs
+
+
+def test_repair_changes_only_reopened_cells():
+    config_data, base_data = load_data('data/config.json', 'data/data.json')
+    with contextlib.redirect_stdout(io.StringIO()):
+        current = solve_all(config_data, base_data)
+
+    # Both teachers of a placed lab become unavailable during it; only that (section, day) is reopened.
+    day, hours, teachers = placed_labs(config_data, base_data, current, "IT-7")[0]
+    config = copy.deepcopy(config_data)
+    config['teacher_unavailability'] = copy.deepcopy(teacher_unavailability(config_data))
+    for teacher in teachers:
+        config['teacher_unavailability'].setdefault(teacher, {}).setdefault(day, []).extend(hours)
+    cells = {("IT-7", day)}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        solver, status, repaired = solve_neighbourhood(config, base_data, current, cells, num_workers=1)
+    if repaired is not None:
+        assert {(section, d) for section, d, _ in changed_slots(config, current, repaired)} <= cells
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        repaired = repair(config, base_data, current, cells, num_workers=1)
+    assert repaired is not None
+    assert unavailability_violations(config, repaired) == []